@@ -1,8 +1,14 @@
 import logging
 import os
-from mistralai import Mistral
-import openai
-from google import genai
+import time
+import asyncio
+import threading
+import concurrent.futures
+from collections import deque
+import ai_clients
+import ai_hedge
+import response_cache
+import context_provider
 from memory_system import load_memory, get_identity_context
 from features import get_system_stats, get_battery_status
 
@@ -10,80 +16,308 @@ logger = logging.getLogger(__name__)
 
 _client = None
 _engine_type = "mistral" # default
+_manager = None  # Pooled, pre-warmed clients for every configured engine (see ai_clients.py)
+_response_cache = None  # Answers to repeated questions (see response_cache.py)
+_context = None  # Background-sampled situational context (see context_provider.py)
+_tracker = ai_hedge.LatencyTracker()  # Time to first token per engine (see ai_hedge.py)
+_hedge_engine = None  # Asked as well when the active engine is slow or fails
+_budget = ai_hedge.BUDGET
+_hedge_percentile = ai_hedge.HEDGE_PERCENTILE
+# Requests in flight at once through ask_ai_async()
+MAX_IN_FLIGHT = 8
+_requests_pool = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT, thread_name_prefix="ai-request")
+_loop = None  # Event loop behind ask_ai_future(), on its own thread
+_loop_lock = threading.Lock()
+
+# Model per engine
+MODELS = {"mistral": "mistral-tiny", "openai": "gpt-3.5-turbo", "gemini": "gemini-pro"}
+NO_LINK_REPLY = "System error: No active neural link. Please check your API keys."
+FAILURE_REPLY = "I'm having trouble connecting to my neural network right now."
+
+# Per-request latency of streamed replies, for ai_stats()
+HISTORY = 100
+_requests = deque(maxlen=HISTORY)
 
 def init_ai(config):
     """
     Initializes the AI brain based on config.
-    Supports: 'mistral', 'openai', 'gemini'
+    Supports: 'mistral', 'openai', 'gemini'. Clients for every engine with an
+    API key are created and warmed up, so set_engine() can switch between them.
     """
-    global _client, _engine_type
+    global _manager, _response_cache, _context, _hedge_engine, _budget, _hedge_percentile
     
-    _engine_type = config.get("ai_engine", "mistral").lower()
-    api_key = config.get(f"{_engine_type.upper()}_API_KEY", "")
+    if _context is None:
+        _context = context_provider.ContextProvider(
+            interval=config.get("context_interval", context_provider.SAMPLE_INTERVAL)).start()
+    if config.get("ai_cache", True):
+        path = response_cache.CACHE_PATH if config.get("ai_cache_disk", True) else None
+        _response_cache = response_cache.ResponseCache(ttl=config.get("ai_cache_ttl", response_cache.DEFAULT_TTL),
+                                                       max_entries=config.get("ai_cache_size", response_cache.DEFAULT_MAX_ENTRIES),
+                                                       path=path)
+    keys = {engine: config.get(f"{engine.upper()}_API_KEY", "") for engine in ai_clients.ENGINES}
+    if _manager is not None:
+        _manager.close()
+    _manager = ai_clients.ClientManager(keys, keepalive=config.get("ai_keepalive", ai_clients.KEEPALIVE)).start()
+    _hedge_engine = (config.get("ai_hedge_engine") or "").lower() or None
+    _budget = config.get("ai_budget", ai_hedge.BUDGET)
+    _hedge_percentile = config.get("ai_hedge_percentile", ai_hedge.HEDGE_PERCENTILE)
+    set_engine(config.get("ai_engine", "mistral"))
+
+def set_engine(engine):
+    """
+    Switches the active engine. Returns False if it has no client (no API key).
+    """
+    global _client, _engine_type
     
-    if not api_key:
+    _engine_type = engine.lower()
+    _client = _manager.get(_engine_type) if _manager else None
+    if not _client:
         logger.warning(f"No API key found for {_engine_type}. AI interactions disabled.")
-        return
+        return False
+    logger.info(f"{_engine_type.capitalize()} Neural Link active.")
+    return True
 
-    try:
-        if _engine_type == "mistral":
-            _client = Mistral(api_key=api_key)
-            logger.info("Mistral Neural Link initialized.")
-        
-        elif _engine_type == "openai":
-            openai.api_key = api_key
-            _client = openai.OpenAI(api_key=api_key)
-            logger.info("OpenAI Neural Link initialized.")
-            
-        elif _engine_type == "gemini":
-            _client = genai.Client(api_key=api_key)
-            logger.info("Gemini Neural Link (v1 SDK) initialized.")
-            
-    except Exception as e:
-        logger.error(f"Neural linkage failure: {e}")
+def prewarm():
+    """
+    Refreshes connections that went cold while idle; call when a query is likely soon.
+    """
+    if _manager:
+        _manager.wake()
 
-def ask_ai(prompt):
-    """Queries the active AI engine with full situational awareness."""
-    global _client, _engine_type
-    if not _client:
-        return "System error: No active neural link. Please check your API keys."
+def link_stats():
+    """
+    Connection reuse and handshake times per engine.
+    """
+    return _manager.stats() if _manager else {}
+
+def context_stats():
+    """
+    Background context sampler: sample count, age of the latest sample and sampling cost.
+    """
+    return _context.stats() if _context else {}
+
+def hedge_stats():
+    """
+    Per engine: time to first token (p50 / p90 / p99, ms), failures, hedges fired and won.
+    """
+    return _tracker.stats()
+
+def _engines():
+    """
+    The active engine, then the hedge engine if it is configured, has a client and differs.
+    """
+    engines = [_engine_type]
+    if _hedge_engine and _hedge_engine != _engine_type and _manager and _manager.get(_hedge_engine):
+        engines.append(_hedge_engine)
+    return engines
+
+def cache_stats():
+    """
+    Response cache hit rate and the LLM time it saved.
+    """
+    return _response_cache.stats() if _response_cache else {}
+
+def _cacheable(prompt):
+    """
+    False if prompt has to be answered fresh (no cache, or a volatile question).
+    """
+    if _response_cache is None:
+        return False
+    if not response_cache.is_cacheable(prompt):
+        _response_cache.excluded += 1
+        return False
+    return True
 
+def _cache_key(prompt, engine):
+    """
+    Response cache key for prompt as answered by engine.
+    """
+    # The identity context is part of the answer, so memory changes start over
+    return _response_cache.key(engine, MODELS[engine], prompt, get_identity_context())
+
+def _build_prompt(prompt):
     # v7.0 Neural Context
-    identity = get_identity_context()
-    stats = get_system_stats()
-    battery = get_battery_status()
+    if _context:
+        identity, stats, battery = _context.snapshot()
+    else:
+        identity, stats, battery = get_identity_context(), get_system_stats(), get_battery_status()
     
+    # Without a recent sample (or a battery), the clause shrinks rather than reading ". ."
+    situation = "".join(f"{part}. " for part in (stats, battery) if part)
     system_instruction = (
         f"{identity} "
-        f"SITUATIONAL_AWARENESS: {stats}. {battery}. "
+        f"{f'SITUATIONAL_AWARENESS: {situation}' if situation else ''}"
         "Your responses should be tactical, efficient, and formatted for a HUD. "
         "Keep them under 50 words unless asked for technical detail."
     )
+    return f"[SYSTEM_INT: {system_instruction}]\nUSER: {prompt}"
+
+def ask_ai(prompt):
+    """Queries the active AI engine with full situational awareness."""
+    return "".join(ReplyStream(prompt))
 
+async def ask_ai_async(prompt, deadline=None):
+    """
+    Coroutine version of ask_ai(); any number may be in flight at once.
+    Cancelling the task cancels the LLM request. With a deadline (seconds)
+    for the whole answer, missing it gives the failure reply.
+    """
+    reply = ReplyStream(prompt, deadline=deadline)
     try:
-        full_prompt = f"[SYSTEM_INT: {system_instruction}]\nUSER: {prompt}"
-
-        if _engine_type == "mistral":
-            response = _client.chat.complete(
-                model="mistral-tiny",
-                messages=[{"role": "user", "content": full_prompt}]
-            )
-            return response.choices[0].message.content
-
-        elif _engine_type == "openai":
-            response = _client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": full_prompt}]
-            )
-            return response.choices[0].message.content
-
-        elif _engine_type == "gemini":
-            response = _client.models.generate_content(
-                model="gemini-pro",
-                contents=full_prompt
-            )
-            return response.text
-
-    except Exception as e:
-        logger.error(f"AI Query failed: {e}")
-        return "I'm having trouble connecting to my neural network right now."
+        text = await asyncio.get_running_loop().run_in_executor(_requests_pool, lambda: "".join(reply))
+    except asyncio.CancelledError:
+        reply.cancel()
+        raise
+    return FAILURE_REPLY if reply.timed_out else text
+
+def ask_ai_future(prompt, deadline=None):
+    """
+    ask_ai_async() for threaded code: returns a concurrent.futures.Future of
+    the answer. Future.cancel() cancels the request.
+    """
+    return asyncio.run_coroutine_threadsafe(ask_ai_async(prompt, deadline), _event_loop())
+
+def _event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ai-async", daemon=True).start()
+        return _loop
+
+def _stream_tokens(engine, full_prompt):
+    """
+    Yields text deltas from the engine's streaming API.
+    """
+    client = _manager.get(engine)
+    messages = [{"role": "user", "content": full_prompt}]
+    if engine == "mistral":
+        for event in client.chat.stream(model=MODELS["mistral"], messages=messages):
+            choices = event.data.choices
+            if choices and choices[0].delta.content:
+                yield choices[0].delta.content
+
+    elif engine == "openai":
+        for chunk in client.chat.completions.create(model=MODELS["openai"], messages=messages, stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    elif engine == "gemini":
+        for chunk in client.models.generate_content_stream(model=MODELS["gemini"], contents=full_prompt):
+            if chunk.text:
+                yield chunk.text
+
+class ReplyStream:
+    """
+    One reply from the active engine, iterated piece by piece as it is
+    generated (for voice_engine.speak_stream). The request is hedged with
+    the hedge engine, if configured, and fails after the latency budget
+    with no first token (see ai_hedge.HedgedStream). Records time to first token
+    as it arrives, and time to first audio when the speech pipeline reports
+    it through heard(). text holds everything received so far.
+
+    cancel() stops it from any thread: iteration ends with what was received
+    so far. A deadline (seconds) cancels it automatically, and the failure
+    reply is given if nothing had arrived.
+    """
+
+    def __init__(self, prompt, deadline=None):
+        self.prompt = prompt
+        self.deadline = deadline
+        self.text = ""
+        self.cancelled = False
+        self.timed_out = False
+        self.started = time.time()
+        self.metrics = {"engine": _engine_type, "hedged": False, "ttft": None, "ttfa": None, "total": None}
+        self._tokens = None
+        self._hedged = None
+        _requests.append(self.metrics)
+
+    def __iter__(self):
+        if not _client:
+            self.text = NO_LINK_REPLY
+            yield self.text
+            return
+        timer = None
+        if self.deadline is not None:
+            timer = threading.Timer(max(0.0, self.started + self.deadline - time.time()), self._expire)
+            timer.daemon = True
+            timer.start()
+        try:
+            engines = _engines()
+            cacheable = _cacheable(self.prompt)
+            # An answer from any engine this request would accept
+            cached = _response_cache.get(*[_cache_key(self.prompt, e) for e in engines]) if cacheable else None
+            if cached:
+                self.metrics["ttft"] = time.time() - self.started
+                self.text = cached
+                yield cached
+                return
+            full_prompt = _build_prompt(self.prompt)
+            hedged = ai_hedge.HedgedStream(engines, lambda engine: _stream_tokens(engine, full_prompt),
+                                           _tracker, budget=_budget, percentile=_hedge_percentile)
+            self._hedged, self._tokens = hedged, iter(hedged)
+            if self.cancelled:
+                hedged.cancel()  # cancel() came before there was a request to stop
+            for piece in self._tokens:
+                if self.metrics["ttft"] is None:
+                    self.metrics["ttft"] = time.time() - self.started
+                    self.metrics["engine"], self.metrics["hedged"] = hedged.winner, hedged.hedged
+                    logger.info(f"AI first token from {hedged.winner} after {1000 * self.metrics['ttft']:.0f} ms")
+                self.text += piece
+                yield piece
+            if self.cancelled:
+                logger.info(f"AI reply {'timed out' if self.timed_out else 'cancelled'} after {len(self.text)} characters")
+            elif cacheable and self.text:
+                _response_cache.put(_cache_key(self.prompt, hedged.winner), self.text, time.time() - self.started)
+        except Exception as e:
+            logger.error(f"AI stream failed: {e}")
+            if not self.text:
+                self.text = FAILURE_REPLY
+                yield self.text
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self.metrics["total"] = time.time() - self.started
+            if self._tokens is not None:
+                self._tokens.close()  # Cancels generation if the listener stopped early
+        if self.timed_out and not self.text:
+            self.text = FAILURE_REPLY
+            yield self.text
+
+    def cancel(self):
+        """
+        Stops the reply (from any thread) and cancels its request.
+        """
+        self.cancelled = True
+        if self._hedged is not None:
+            self._hedged.cancel()
+
+    def _expire(self):
+        self.timed_out = True
+        self.cancel()
+
+    def heard(self, when):
+        """
+        Speech pipeline callback: the reply's first audio started at when.
+        """
+        self.metrics["ttfa"] = when - self.started
+        logger.info(f"AI first audio after {1000 * self.metrics['ttfa']:.0f} ms")
+
+def stream_ai(prompt, deadline=None):
+    """
+    Streaming variant of ask_ai(): returns a ReplyStream yielding the reply as the engine generates it.
+    """
+    return ReplyStream(prompt, deadline=deadline)
+
+def ai_stats():
+    """
+    Time to first token and to first audio (p50 / p90, ms) over recent replies.
+    """
+    stats = {"requests": len(_requests)}
+    for name in ("ttft", "ttfa", "total"):
+        samples = sorted(m[name] for m in list(_requests) if m[name] is not None)
+        if samples:
+            stats[f"{name}_p50_ms"] = 1000 * samples[len(samples) // 2]
+            stats[f"{name}_p90_ms"] = 1000 * samples[min(len(samples) - 1, int(0.9 * len(samples)))]
+    return stats
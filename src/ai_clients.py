@@ -0,0 +1,217 @@
+import time
+import logging
+import threading
+import functools
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("mistral", "openai", "gemini")
+# Keep-alive connections per provider
+POOL_SIZE = 4
+# Idle connections are closed after this long (seconds)...
+KEEPALIVE = 120.0
+# Connections are refreshed at 80% of that; stop once nobody has used the engine for this long
+MAX_IDLE = 30 * 60.0
+CHECK_INTERVAL = 15.0
+HISTORY = 200
+
+class _Trace:
+    """
+    httpcore trace callback for one request: notes whether it opened a new
+    connection and how long DNS, TCP and TLS setup took.
+    """
+
+    def __init__(self):
+        self.connect_started = None
+        self.connected = None
+
+    def __call__(self, event, info):
+        if event == "connection.connect_tcp.started":
+            self.connect_started = time.perf_counter()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            self.connected = time.perf_counter()
+
+class ClientManager:
+    """
+    Holds an SDK client for every engine with an API key, each on its own
+    pooled keep-alive HTTP client, so switching engines is instant and
+    requests reuse warm connections. Connections are warmed (a cheap
+    models.list() call) at start and again before the pool's keep-alive
+    expires while the engine is in use. An httpx request hook traces every
+    request to count new versus reused connections and time handshakes.
+    """
+
+    def __init__(self, keys, keepalive=KEEPALIVE, pool_size=POOL_SIZE):
+        self.keys = {engine: key for engine, key in keys.items() if key}
+        self.keepalive = keepalive
+        self.rewarm_after = 0.8 * keepalive
+        self.pool_size = pool_size
+        self.clients = {}
+        self._http_clients = []  # httpx clients built here; the SDKs do not close one passed in
+        self._metrics = {}
+        self._last_used = {}
+        self._last_warm = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        """
+        Builds the clients and warms them in the background.
+        """
+        for engine in self.keys:
+            self._metrics[engine] = {"requests": 0, "new_connections": 0, "reused": 0,
+                                     "warmups": 0, "handshakes": deque(maxlen=HISTORY)}
+            try:
+                self.clients[engine] = self._build(engine, self.keys[engine])
+            except Exception as e:
+                logger.error(f"Could not create {engine} client: {e}")
+        for engine in self.clients:
+            self._last_used[engine] = time.time()
+            self._warm_in_background(engine)
+        self._running = True
+        threading.Thread(target=self._keep_warm, name="ai-keepalive", daemon=True).start()
+        return self
+
+    def get(self, engine):
+        return self.clients.get(engine)
+
+    def warm(self, engine):
+        """
+        Opens (or refreshes) a pooled connection to the engine's API.
+        """
+        client = self.clients.get(engine)
+        if client is None:
+            return False
+        self._local.warming = True
+        started = time.time()
+        try:
+            models = client.models.list()
+            if engine == "gemini":
+                next(iter(models), None)
+            with self._lock:
+                self._last_warm[engine] = time.time()
+                self._metrics[engine]["warmups"] += 1
+            logger.info(f"{engine} link warmed in {1000 * (time.time() - started):.0f} ms")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not warm {engine} link: {e}")
+            return False
+        finally:
+            self._local.warming = False
+
+    def wake(self):
+        """
+        Re-warms, in the background, every engine whose connections may have
+        expired while idle. Call when a request is likely soon (the user spoke).
+        """
+        for engine in list(self.clients):
+            if self._idle(engine, time.time()):
+                self._warm_in_background(engine)
+
+    def _warm_in_background(self, engine):
+        with self._lock:
+            self._last_warm[engine] = time.time()  # Also keeps a second warm-up from starting meanwhile
+        threading.Thread(target=self.warm, args=(engine,), name=f"warm-{engine}", daemon=True).start()
+
+    def _idle(self, engine, now):
+        """
+        Nothing has touched the engine's connections for long enough that they may be closing.
+        """
+        return now - max(self._last_used.get(engine, 0), self._last_warm.get(engine, 0)) >= self.rewarm_after
+
+    def stats(self):
+        """
+        Per engine: requests, new vs reused connections and handshake time (p50 / max, ms).
+        """
+        stats = {}
+        with self._lock:
+            for engine, m in self._metrics.items():
+                handshakes = sorted(m["handshakes"])
+                opened = m["new_connections"] + m["reused"]
+                stats[engine] = {"requests": m["requests"], "new_connections": m["new_connections"],
+                                 "reused": m["reused"], "warmups": m["warmups"],
+                                 "reuse_rate": m["reused"] / opened if opened else 0.0}
+                if handshakes:
+                    stats[engine].update({"handshake_p50_ms": 1000 * handshakes[len(handshakes) // 2],
+                                          "handshake_max_ms": 1000 * handshakes[-1]})
+        return stats
+
+    def close(self):
+        """
+        Stops keep-warm and closes every connection pool.
+        """
+        self._running = False
+        for http_client in self._http_clients:
+            try:
+                http_client.close()
+            except Exception as e:
+                logger.warning(f"Could not close AI connection pool: {e}")
+        self._http_clients.clear()
+        for engine, client in self.clients.items():
+            # Gemini builds its own httpx client from client_args
+            if engine == "gemini" and hasattr(client, "close"):
+                try:
+                    client.close()
+                except Exception as e:
+                    logger.warning(f"Could not close gemini client: {e}")
+        self.clients.clear()
+
+    def _build(self, engine, key):
+        hooks = {"request": [functools.partial(self._on_request, engine)],
+                 "response": [functools.partial(self._on_response, engine)]}
+        if engine == "mistral":
+            from mistralai import Mistral
+            return Mistral(api_key=key, client=self._http_client(hooks))
+        if engine == "openai":
+            import openai
+            return openai.OpenAI(api_key=key, http_client=self._http_client(hooks))
+        if engine == "gemini":
+            from google import genai
+            try:
+                return genai.Client(api_key=key, http_options={"client_args": {
+                    "limits": self._limits(), "event_hooks": hooks}})
+            except Exception as e:
+                # Older SDKs take no client arguments: pooled by the SDK, but not traced
+                logger.warning(f"Gemini client without connection metrics: {e}")
+                return genai.Client(api_key=key)
+        raise ValueError(f"Unknown AI engine: {engine}")
+
+    def _limits(self):
+        import httpx
+        return httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size,
+                            keepalive_expiry=self.keepalive)
+
+    def _http_client(self, hooks):
+        import httpx
+        http_client = httpx.Client(limits=self._limits(), timeout=httpx.Timeout(60.0, connect=10.0), event_hooks=hooks)
+        self._http_clients.append(http_client)
+        return http_client
+
+    def _on_request(self, engine, request):
+        request.extensions["trace"] = _Trace()
+        if not getattr(self._local, "warming", False):
+            self._last_used[engine] = time.time()
+
+    def _on_response(self, engine, response):
+        trace = response.request.extensions.get("trace")
+        with self._lock:
+            m = self._metrics[engine]
+            m["requests"] += 1
+            if not isinstance(trace, _Trace):
+                return
+            if trace.connect_started is not None and trace.connected is not None:
+                m["new_connections"] += 1
+                m["handshakes"].append(trace.connected - trace.connect_started)
+            else:
+                m["reused"] += 1
+
+    def _keep_warm(self):
+        while self._running:
+            time.sleep(CHECK_INTERVAL)
+            now = time.time()
+            for engine in list(self.clients):
+                # Keep the pool open between requests, but not for an engine nobody uses
+                if self._idle(engine, now) and now - self._last_used.get(engine, 0) < MAX_IDLE:
+                    self.warm(engine)
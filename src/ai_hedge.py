@@ -0,0 +1,194 @@
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Time to first token an engine gets before the hedge fires: this percentile of its recent history...
+HEDGE_PERCENTILE = 90
+# ...or this many seconds until it has MIN_SAMPLES, kept within [MIN_DELAY, half the budget]
+DEFAULT_DELAY = 2.0
+MIN_DELAY = 0.3
+MIN_SAMPLES = 5
+# No first token from any engine within this long and the request fails (seconds)
+BUDGET = 10.0
+WINDOW = 50
+
+_PIECE, _DONE, _ERROR, _CANCEL = "piece", "done", "error", "cancel"
+
+class LatencyTracker:
+    """
+    Rolling time-to-first-token history and failure counts per engine,
+    from which hedge deadlines are derived.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._ttft = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, engine):
+        if engine not in self._ttft:
+            self._ttft[engine] = deque(maxlen=self.window)
+            self._counts[engine] = {"failures": 0, "hedged": 0, "won": 0}
+        return self._ttft[engine], self._counts[engine]
+
+    def record(self, engine, ttft):
+        with self._lock:
+            self._entry(engine)[0].append(ttft)
+
+    def count(self, engine, name):
+        """
+        Bumps a counter: "failures", "hedged" (the hedge fired while this engine
+        was primary) or "won" (this engine answered as the hedge).
+        """
+        with self._lock:
+            self._entry(engine)[1][name] += 1
+
+    def percentile(self, engine, p):
+        """
+        The p-th percentile time to first token, or None with fewer than MIN_SAMPLES.
+        """
+        with self._lock:
+            samples = sorted(self._ttft.get(engine, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+
+    def deadline(self, engine, budget, p=HEDGE_PERCENTILE):
+        """
+        Seconds to wait for engine's first token before hedging.
+        """
+        delay = self.percentile(engine, p)
+        if delay is None:
+            delay = DEFAULT_DELAY
+        return max(MIN_DELAY, min(delay, budget / 2))
+
+    def stats(self):
+        stats = {}
+        with self._lock:
+            engines = {engine: (sorted(samples), dict(self._counts[engine])) for engine, samples in self._ttft.items()}
+        for engine, (samples, counts) in engines.items():
+            stats[engine] = counts
+            if samples:
+                for p in (50, 90, 99):
+                    stats[engine][f"ttft_p{p}_ms"] = 1000 * samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+        return stats
+
+class HedgedStream:
+    """
+    Streams one reply from engines[0], with engines[1] (if any) as the
+    hedge. Each engine runs on its own thread through start(engine), which
+    returns an iterator of text pieces. If the primary has not produced a
+    first token by its deadline, or fails first, the hedge is started with
+    the same prompt; the first engine to produce a token wins and the other
+    is cancelled (its thread stops and closes its stream as soon as it gets
+    control back from the SDK). Raises TimeoutError when no engine produces
+    a token within the budget. cancel() ends the iteration from any thread.
+    """
+
+    def __init__(self, engines, start, tracker, budget=BUDGET, percentile=HEDGE_PERCENTILE):
+        self.engines = list(engines)
+        self.start = start
+        self.tracker = tracker
+        self.budget = budget
+        self.percentile = percentile
+        self.winner = None
+        self.hedged = False
+        self._queue = queue.Queue()
+        self._running = set()
+        self._cancelled = set()
+
+    def __iter__(self):
+        primary = self.engines[0]
+        backups = self.engines[1:]
+        started = time.time()
+        hedge_at = started + self.tracker.deadline(primary, self.budget, self.percentile)
+        give_up_at = started + self.budget
+        error = None
+        self._launch(primary)
+        try:
+            while True:
+                timeout = None
+                if self.winner is None:
+                    timeout = (hedge_at if backups else give_up_at) - time.time()
+                try:
+                    engine, kind, value = self._queue.get(timeout=max(0.0, timeout) if timeout is not None else None)
+                except queue.Empty:
+                    if backups and time.time() >= hedge_at:
+                        self._hedge(primary, backups.pop(0), "slow")
+                        continue
+                    raise TimeoutError(f"no reply within {self.budget:.1f}s")
+                if kind == _CANCEL:
+                    return
+                if engine in self._cancelled:
+                    continue
+                if kind == _PIECE:
+                    if self.winner is None:
+                        self._win(engine, primary)
+                    yield value
+                    continue
+                self._running.discard(engine)
+                if kind == _DONE and self.winner == engine:
+                    return
+                if kind == _DONE:
+                    self.tracker.count(engine, "failures")
+                    value = RuntimeError(f"{engine} returned an empty reply")
+                logger.warning(f"{engine} failed: {value}")
+                error = value
+                if self.winner == engine:
+                    raise value
+                if backups:
+                    self._hedge(primary, backups.pop(0), "failed")
+                elif not self._running:
+                    raise error
+        finally:
+            self._cancelled.update(self._running)
+
+    def cancel(self):
+        """
+        Stops the request: iteration ends without an error and every engine's stream is closed.
+        """
+        self._queue.put((None, _CANCEL, None))
+
+    def _launch(self, engine):
+        self._running.add(engine)
+        threading.Thread(target=self._produce, args=(engine,), name=f"ai-{engine}", daemon=True).start()
+
+    def _hedge(self, primary, engine, reason):
+        logger.info(f"{primary} {reason}, hedging with {engine}")
+        self.hedged = True
+        self.tracker.count(primary, "hedged")
+        self._launch(engine)
+
+    def _win(self, engine, primary):
+        self.winner = engine
+        if engine != primary:
+            self.tracker.count(engine, "won")
+        self._cancelled.update(e for e in self._running if e != engine)
+
+    def _produce(self, engine):
+        started = time.time()
+        tokens = None
+        first = True
+        try:
+            tokens = iter(self.start(engine))
+            for piece in tokens:
+                if first:
+                    # Recorded even for the loser, so slow responses still shape the deadline
+                    self.tracker.record(engine, time.time() - started)
+                    first = False
+                if engine in self._cancelled:
+                    return
+                self._queue.put((engine, _PIECE, piece))
+            self._queue.put((engine, _DONE, None))
+        except Exception as e:
+            if engine not in self._cancelled:
+                self.tracker.count(engine, "failures")
+            self._queue.put((engine, _ERROR, e))
+        finally:
+            if tokens is not None and hasattr(tokens, "close"):
+                tokens.close()  # Ends the HTTP stream of a cancelled request
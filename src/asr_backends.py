@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import uuid
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BACKEND = "google"
+DEFAULT_VOSK_MODEL = "models/vosk-model-small-en-us-0.15"  # relative to src/
+
+class ASRUnavailable(Exception):
+    """
+    The backend could not run at all (network down, model missing), as opposed
+    to running and hearing nothing intelligible.
+    """
+
+class ASRStream:
+    """
+    Incremental recognition of one utterance. feed() never blocks on decoding;
+    it returns the newest partial hypothesis that is ready (or None).
+    """
+
+    def feed(self, pcm):
+        raise NotImplementedError
+
+    def finish(self, timeout=None):
+        """
+        Returns the final transcript (or None) once all fed audio is decoded.
+        """
+        raise NotImplementedError
+
+    def cancel(self):
+        pass
+
+class ASRBackend:
+    """
+    Speech-to-text engine. transcribe() takes 16-bit mono PCM and returns text,
+    or None when nothing was recognized. Backends with streaming=True also
+    provide start_stream() for partial hypotheses while the user is speaking.
+    """
+    name = "base"
+    streaming = False
+
+    def warm(self):
+        """
+        Loads models / opens connections ahead of the first utterance.
+        """
+
+    def transcribe(self, pcm, rate):
+        raise NotImplementedError
+
+    def start_stream(self, rate):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class GoogleBackend(ASRBackend):
+    """
+    speech_recognition's free Google Web Speech endpoint (one network round trip per utterance).
+    """
+    name = "google"
+
+    def __init__(self):
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+
+    def transcribe(self, pcm, rate):
+        sr = self._sr
+        try:
+            return self._recognizer.recognize_google(sr.AudioData(pcm, rate, 2))
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            raise ASRUnavailable(f"Google speech API unavailable: {e}")
+
+# --- Vosk worker process -------------------------------------------------------
+# These run inside the pool processes. The model is loaded once per worker by
+# the pool initializer and stays in memory for the life of the process.
+
+_worker_model = None
+_worker_streams = {}
+
+def _worker_init(model_path):
+    global _worker_model
+    from vosk import Model, SetLogLevel
+    SetLogLevel(-1)
+    _worker_model = Model(model_path)
+
+def _worker_ping():
+    return _worker_model is not None
+
+def _worker_recognizer(rate):
+    from vosk import KaldiRecognizer
+    rec = KaldiRecognizer(_worker_model, rate)
+    rec.SetWords(True)
+    try:
+        rec.SetPartialWords(True)
+    except AttributeError:
+        pass  # Older vosk builds have no per-word partials
+    return rec
+
+def _worker_transcribe(pcm, rate):
+    rec = _worker_recognizer(rate)
+    rec.AcceptWaveform(pcm)
+    return json.loads(rec.FinalResult()).get("text", "")
+
+def _worker_stream_open(stream_id, rate):
+    _worker_streams[stream_id] = {"rec": _worker_recognizer(rate), "done": []}
+
+def _worker_stream_feed(stream_id, pcm):
+    """
+    Returns (partial text, [(word, confidence), ...]) for the audio so far.
+    """
+    state = _worker_streams.get(stream_id)
+    if state is None:
+        return "", []
+    rec = state["rec"]
+    if rec.AcceptWaveform(pcm):
+        # Vosk found an internal pause; keep the finished piece
+        result = json.loads(rec.Result())
+        if result.get("text"):
+            state["done"].append(result)
+        partial = {}
+    else:
+        partial = json.loads(rec.PartialResult())
+
+    words = [(w["word"], w.get("conf", 1.0)) for r in state["done"] for w in r.get("result", [])]
+    words += [(w["word"], w.get("conf", 0.0)) for w in partial.get("partial_result", [])]
+    text = " ".join([r["text"] for r in state["done"]] + [partial.get("partial", "")]).strip()
+    return text, words
+
+def _worker_stream_finish(stream_id):
+    state = _worker_streams.pop(stream_id, None)
+    if state is None:
+        return ""
+    final = json.loads(state["rec"].FinalResult()).get("text", "")
+    return " ".join([r["text"] for r in state["done"]] + [final]).strip()
+
+def _worker_stream_cancel(stream_id):
+    _worker_streams.pop(stream_id, None)
+
+# --- Vosk backend (main process side) -----------------------------------------
+
+class VoskStream(ASRStream):
+    def __init__(self, pool, rate):
+        self._pool = pool
+        self.id = uuid.uuid4().hex
+        self.partial = None
+        self.words = []
+        self._pending = []
+        pool.submit(_worker_stream_open, self.id, rate)
+
+    def feed(self, pcm):
+        self._pending.append(self._pool.submit(_worker_stream_feed, self.id, bytes(pcm)))
+        # Collect whatever the worker has already finished, in order
+        while self._pending and self._pending[0].done():
+            self.partial, self.words = self._pending.pop(0).result()
+        return self.partial
+
+    def finish(self, timeout=None):
+        text = self._pool.submit(_worker_stream_finish, self.id).result(timeout)
+        self._pending.clear()
+        return text or None
+
+    def cancel(self):
+        self._pending.clear()
+        self._pool.submit(_worker_stream_cancel, self.id)
+
+class VoskBackend(ASRBackend):
+    """
+    Offline CPU recognition with a Vosk model. Decoding runs in worker
+    processes (spawned once, model loaded once and kept warm), so neither the
+    network nor the GIL sits on the recognition path. Streaming sessions are
+    pinned to one dedicated worker so their recognizer state stays in one place.
+    """
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path=DEFAULT_VOSK_MODEL, workers=1):
+        try:
+            import vosk  # noqa: F401 - fail here rather than in a worker
+        except ImportError:
+            raise ASRUnavailable("vosk is not installed (pip install vosk)")
+        self.model_path = model_path
+        ctx = multiprocessing.get_context("spawn")
+        self._stream_pool = ProcessPoolExecutor(1, mp_context=ctx, initializer=_worker_init, initargs=(model_path,))
+        if workers > 1:
+            self._pool = ProcessPoolExecutor(workers - 1, mp_context=ctx, initializer=_worker_init, initargs=(model_path,))
+        else:
+            self._pool = self._stream_pool
+
+    def warm(self):
+        start = time.time()
+        pools = {id(p): p for p in (self._stream_pool, self._pool)}.values()
+        for pool in pools:
+            try:
+                loaded = pool.submit(_worker_ping).result()
+            except Exception as e:
+                loaded = False
+                logger.error(f"Vosk worker failed to start: {e}")
+            if not loaded:
+                raise ASRUnavailable(f"Vosk model failed to load from {self.model_path}")
+        logger.info(f"Vosk model warm in {time.time() - start:.2f}s")
+
+    def transcribe(self, pcm, rate):
+        try:
+            return self._pool.submit(_worker_transcribe, bytes(pcm), rate).result() or None
+        except Exception as e:
+            raise ASRUnavailable(f"Vosk decode failed: {e}")
+
+    def start_stream(self, rate):
+        return VoskStream(self._stream_pool, rate)
+
+    def close(self):
+        self._stream_pool.shutdown(wait=False, cancel_futures=True)
+        if self._pool is not self._stream_pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "vosk": VoskBackend,
+}
+
+def create_backend(config, name=None):
+    """
+    Builds the backend named in config["asr_backend"] (or name).
+    Raises ASRUnavailable if it cannot be constructed.
+    """
+    name = (name or config.get("asr_backend", DEFAULT_BACKEND)).lower()
+    if name == "vosk":
+        model_path = os.path.join(BASE_DIR, config.get("vosk_model_path", DEFAULT_VOSK_MODEL))
+        return VoskBackend(model_path, workers=int(config.get("asr_workers", 1)))
+    if name not in BACKENDS:
+        raise ASRUnavailable(f"Unknown ASR backend '{name}'")
+    return BACKENDS[name]()
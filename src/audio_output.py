@@ -0,0 +1,368 @@
+import time
+import wave
+import queue
+import logging
+import threading
+import subprocess
+from collections import deque
+import numpy as np
+from audio_source import SAMPLE_WIDTH
+from audio_utils import no_alsa_error
+
+logger = logging.getLogger(__name__)
+
+# edge-tts delivers 24 kHz mono MP3; everything is decoded to this rate
+OUTPUT_RATE = 24000
+BLOCK = 480            # 20 ms per device callback
+DUCK_GAIN = 0.25       # about -12 dB while the user talks over playback
+HISTORY = 200          # gap samples kept for stats()
+
+class Playback:
+    """
+    One utterance queued on the OutputEngine. The producer write()s int16 PCM
+    as it is decoded and close()s it when there is no more; the engine plays
+    it straight after whatever was queued before it, without a gap.
+    """
+
+    def __init__(self, engine, tag=None):
+        self.engine = engine
+        self.tag = tag              # caller's id (the utterance it belongs to)
+        self.written = 0            # samples written so far
+        self.buffered = 0           # samples written but not yet played
+        self.complete = False
+        self.cancelled = False
+        self.opened_at = time.time()
+        self.start_estimate = None  # when sample 0 should reach the speaker
+        self.started_at = None
+        self.finished_at = None
+        self.on_start = None        # callback(playback), run off the audio thread
+        self.started = threading.Event()
+        self.finished = threading.Event()
+        self._chunks = deque()
+        self._offset = 0
+        self._starved = False
+
+    def write(self, pcm):
+        """
+        Appends int16 samples. Returns False once the playback was flushed.
+        """
+        if self.cancelled:
+            return False
+        if pcm.size:
+            self.engine._append(self, pcm)
+        return True
+
+    def close(self):
+        self.complete = True
+
+    def time_at(self, offset):
+        """
+        Expected speaker time of sample `offset` of this utterance.
+        """
+        base = self.started_at if self.started_at is not None else self.start_estimate
+        return (base or time.time()) + offset / self.engine.rate
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def _read_into(self, out, pos, wanted):
+        """
+        Copies up to wanted samples into out[pos:]; returns how many. Audio thread, engine lock held.
+        """
+        copied = 0
+        while copied < wanted and self._chunks:
+            chunk = self._chunks[0]
+            n = min(wanted - copied, chunk.size - self._offset)
+            out[pos + copied:pos + copied + n] = chunk[self._offset:self._offset + n]
+            copied += n
+            self._offset += n
+            if self._offset == chunk.size:
+                self._chunks.popleft()
+                self._offset = 0
+        self.buffered -= copied
+        return copied
+
+class OutputEngine:
+    """
+    Keeps one output stream open for the life of the process and plays queued
+    Playbacks back to back from the device callback, so consecutive sentences
+    join without the device open / decoder start-up gap of a player per file.
+    Supports flush (barge-in), volume and ducking, and counts underruns (a
+    started utterance running dry) and gaps between queued utterances.
+    """
+
+    def __init__(self, rate=OUTPUT_RATE, block=BLOCK, device_index=None, volume=1.0):
+        self.rate = rate
+        self.block = block
+        self.device_index = device_index
+        self.volume = volume
+        self.latency = 0.0
+        self.underruns = 0
+        self.gaps = deque(maxlen=HISTORY)  # seconds of silence between queued utterances
+        self.played = 0
+        self._duck = 1.0
+        self._gain = volume
+        self._queue = deque()
+        self._last_finish = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._events = queue.Queue()
+        self._pa = None
+        self._stream = None
+
+    def start(self):
+        import pyaudio
+        self._pa = pyaudio.PyAudio()
+        with no_alsa_error():
+            self._stream = self._pa.open(format=pyaudio.paInt16,
+                                         channels=1,
+                                         rate=self.rate,
+                                         output=True,
+                                         output_device_index=self.device_index,
+                                         frames_per_buffer=self.block,
+                                         stream_callback=self._callback)
+        self._continue = pyaudio.paContinue
+        self.latency = self._stream.get_output_latency()
+        self._stream.start_stream()
+        threading.Thread(target=self._event_loop, name="audio-output-events", daemon=True).start()
+        logger.info(f"Audio output open at {self.rate} Hz ({self.latency * 1000:.0f} ms latency)")
+        return self
+
+    def open(self, tag=None):
+        """
+        Queues a new, empty Playback behind everything already queued.
+        """
+        playback = Playback(self, tag)
+        with self._lock:
+            self._queue.append(playback)
+        return playback
+
+    def _append(self, playback, pcm):
+        with self._lock:
+            if playback.start_estimate is None:
+                # Everything queued ahead of it plays first
+                ahead = 0
+                for other in self._queue:
+                    if other is playback:
+                        break
+                    ahead += other.buffered
+                playback.start_estimate = time.time() + self.latency + ahead / self.rate
+            playback._chunks.append(pcm)
+            playback.buffered += pcm.size
+            playback.written += pcm.size
+
+    def flush(self, match=None):
+        """
+        Drops everything queued or playing (or just the Playbacks match(playback)
+        accepts); the device goes silent within one block.
+        """
+        with self._lock:
+            dropped = [p for p in self._queue if match is None or match(p)]
+            if len(dropped) == len(self._queue):
+                self._queue.clear()
+                self._last_finish = None
+            else:
+                for playback in dropped:
+                    self._queue.remove(playback)
+            if not self._queue:
+                self._idle.notify_all()
+        for playback in dropped:
+            playback.cancelled = True
+            playback.finished.set()
+        return len(dropped)
+
+    def set_volume(self, volume):
+        self.volume = min(max(volume, 0.0), 1.0)
+
+    def duck(self, on=True, gain=DUCK_GAIN):
+        """
+        Lowers playback (e.g. while the user may be talking) without stopping it.
+        """
+        self._duck = gain if on else 1.0
+
+    def busy(self):
+        with self._lock:
+            return bool(self._queue)
+
+    def drain(self, timeout=None):
+        """
+        Blocks until everything queued has played.
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._queue, timeout)
+
+    def stats(self):
+        with self._lock:
+            gaps = sorted(self.gaps)
+        stats = {"underruns": self.underruns, "played_seconds": self.played / self.rate, "gaps": len(gaps)}
+        if gaps:
+            stats.update({"gap_p50_ms": 1000 * gaps[len(gaps) // 2],
+                          "gap_max_ms": 1000 * gaps[-1]})
+        return stats
+
+    def close(self):
+        self.flush()
+        try:
+            if self._stream:
+                self._stream.stop_stream()
+                self._stream.close()
+            if self._pa:
+                self._pa.terminate()
+        except Exception as e:
+            logger.error(f"Error closing output device: {e}")
+        finally:
+            self._stream = None
+            self._pa = None
+            self._events.put(None)
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        out = np.zeros(frame_count, dtype=np.int16)
+        filled = 0
+        now = time.time() + self.latency
+        with self._lock:
+            while filled < frame_count and self._queue:
+                playback = self._queue[0]
+                if playback.started_at is None:
+                    if not playback.buffered:
+                        if playback.complete:
+                            self._finish(playback, now + filled / self.rate)
+                            continue
+                        break  # Not started yet: waiting for its first audio is not an underrun
+                    playback.started_at = now + filled / self.rate
+                    if self._last_finish is not None and playback.opened_at <= self._last_finish:
+                        # It was queued in time, so any silence here is a pipeline gap
+                        self.gaps.append(max(0.0, playback.started_at - self._last_finish))
+                    self._events.put(("start", playback))
+
+                filled += playback._read_into(out, filled, frame_count - filled)
+                if playback.buffered:
+                    continue
+                if playback.complete:
+                    self._finish(playback, now + filled / self.rate)
+                    continue
+                if not playback._starved:
+                    playback._starved = True
+                    self.underruns += 1
+                break
+            if self._queue and self._queue[0].buffered:
+                self._queue[0]._starved = False
+            self.played += filled
+
+        target = self.volume * self._duck
+        if filled and (target != 1.0 or self._gain != 1.0):
+            # Ramp across the block so volume changes do not click
+            gain = np.linspace(self._gain, target, frame_count, dtype=np.float32)
+            out = (out * gain).astype(np.int16)
+        self._gain = target
+        return out.tobytes(), self._continue
+
+    def _finish(self, playback, when):
+        """
+        Engine lock held.
+        """
+        self._queue.popleft()
+        playback.finished_at = when
+        self._last_finish = when
+        self._events.put(("finish", playback))
+        if not self._queue:
+            self._idle.notify_all()
+
+    def _event_loop(self):
+        """
+        Runs utterance callbacks outside the audio thread.
+        """
+        while True:
+            event = self._events.get()
+            if event is None:
+                break
+            kind, playback = event
+            if kind == "start":
+                playback.started.set()
+                if playback.on_start:
+                    try:
+                        playback.on_start(playback)
+                    except Exception as e:
+                        logger.error(f"Playback start callback failed: {e}")
+            else:
+                playback.finished.set()
+
+# --- Decoding -----------------------------------------------------------------
+
+def decode_file(path, rate=OUTPUT_RATE):
+    """
+    Decodes an MP3 (or, from the local engine, WAV) file to mono int16 PCM at rate.
+    """
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as wav:
+            channels, src_rate = wav.getnchannels(), wav.getframerate()
+            pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        if channels > 1:
+            pcm = pcm.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return resample(pcm, src_rate, rate)
+    result = subprocess.run(["mpg123", "-q", "-s", "-m", "-r", str(rate), path],
+                            capture_output=True, timeout=30)
+    if result.returncode != 0:
+        raise RuntimeError(f"mpg123 could not decode {path}")
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+class StreamDecoder:
+    """
+    Decodes MP3 fed chunk by chunk (a streamed sentence) and hands PCM to
+    on_pcm(int16 array) as soon as the decoder produces it.
+    """
+
+    def __init__(self, on_pcm, rate=OUTPUT_RATE, block_seconds=0.05):
+        self.on_pcm = on_pcm
+        self.samples = 0
+        self._block = int(rate * block_seconds) * SAMPLE_WIDTH
+        self._decoder = subprocess.Popen(["mpg123", "-q", "-s", "-m", "-r", str(rate), "-"],
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def feed(self, chunk):
+        try:
+            self._decoder.stdin.write(chunk)
+            self._decoder.stdin.flush()
+        except OSError:
+            pass
+
+    def close(self, timeout=10):
+        """
+        Ends the input and waits until all decoded audio has been delivered.
+        """
+        try:
+            self._decoder.stdin.close()
+        except OSError:
+            pass
+        self._reader.join(timeout)
+
+    def kill(self):
+        self._decoder.kill()
+        self._reader.join(1)
+
+    def _read(self):
+        pending = b""
+        stdout = self._decoder.stdout
+        while True:
+            data = stdout.read1(self._block)
+            if not data:
+                break
+            pending += data
+            usable = len(pending) - len(pending) % SAMPLE_WIDTH
+            if usable:
+                pcm = np.frombuffer(pending[:usable], dtype=np.int16)
+                pending = pending[usable:]
+                self.on_pcm(pcm)
+                self.samples += pcm.size
+        self._decoder.wait()
+
+def resample(pcm, src_rate, dst_rate):
+    """
+    Linear-interpolation resample of int16 PCM (good enough for echo references).
+    """
+    if src_rate == dst_rate or pcm.size == 0:
+        return pcm
+    n = int(pcm.size * dst_rate / src_rate)
+    positions = np.arange(n) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(pcm.size), pcm).astype(np.int16)
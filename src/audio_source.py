@@ -0,0 +1,170 @@
+import time
+import wave
+import logging
+import numpy as np
+from audio_utils import no_alsa_error
+
+logger = logging.getLogger(__name__)
+
+# All sources deliver 16-bit mono PCM
+SAMPLE_WIDTH = 2
+DEFAULT_RATE = 16000
+DEFAULT_CHUNK = 1024
+
+class AudioSource:
+    """
+    A stream of 16-bit mono PCM. read() returns raw bytes and b"" at end of stream.
+
+    time() is the stream clock: wall time for a live device, and for replay the
+    open time plus the samples served so far, so detections on a recording get
+    timestamps that match the audio even when it is replayed faster than real time.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, chunk=DEFAULT_CHUNK):
+        self.rate = rate
+        self.chunk = chunk
+        self.position = 0  # samples served since open()
+        self.is_open = False
+        self._t0 = 0.0
+
+    def open(self):
+        self.position = 0
+        self._t0 = time.time()
+        self.is_open = True
+        return self
+
+    def close(self):
+        self.is_open = False
+
+    def read(self, frames):
+        raise NotImplementedError
+
+    @property
+    def started_at(self):
+        return self._t0
+
+    def time(self):
+        return self._t0 + self.position / self.rate
+
+    def identity(self):
+        """
+        Stable name for the capture device behind this source (keys saved noise profiles).
+        """
+        return f"{type(self).__name__}@{self.rate}"
+
+    def __enter__(self):
+        if not self.is_open:
+            self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class DeviceSource(AudioSource):
+    """
+    Live capture from a PyAudio input device.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, chunk=DEFAULT_CHUNK, device_index=None):
+        super().__init__(rate, chunk)
+        self.device_index = device_index
+        self.device_name = None
+        self._pa = None
+        self._stream = None
+
+    def open(self):
+        if self.is_open:
+            return self
+        import pyaudio
+        super().open()
+        self._pa = pyaudio.PyAudio()
+        with no_alsa_error():
+            self._stream = self._pa.open(format=pyaudio.paInt16,
+                                         channels=1,
+                                         rate=self.rate,
+                                         input=True,
+                                         input_device_index=self.device_index,
+                                         frames_per_buffer=self.chunk)
+        try:
+            if self.device_index is None:
+                info = self._pa.get_default_input_device_info()
+            else:
+                info = self._pa.get_device_info_by_index(self.device_index)
+            self.device_name = info.get("name")
+        except Exception:
+            self.device_name = None
+        return self
+
+    def close(self):
+        try:
+            if self._stream:
+                self._stream.stop_stream()
+                self._stream.close()
+            if self._pa:
+                self._pa.terminate()
+        except Exception as e:
+            logger.error(f"Error closing input device: {e}")
+        finally:
+            self._stream = None
+            self._pa = None
+            super().close()
+
+    def read(self, frames):
+        data = self._stream.read(frames, exception_on_overflow=False)
+        self.position += len(data) // SAMPLE_WIDTH
+        return data
+
+    def time(self):
+        return time.time()
+
+    def identity(self):
+        name = self.device_name or (f"index {self.device_index}" if self.device_index is not None else "default")
+        return f"device:{name}@{self.rate}"
+
+class ArraySource(AudioSource):
+    """
+    Replays an in-memory int16 array. With realtime=True reads are paced to the
+    sample rate like a microphone; otherwise they return as fast as possible.
+    """
+
+    def __init__(self, samples, rate=DEFAULT_RATE, chunk=DEFAULT_CHUNK, realtime=False):
+        super().__init__(rate, chunk)
+        samples = np.asarray(samples)
+        if samples.dtype != np.int16:
+            samples = np.clip(samples, -32768, 32767).astype(np.int16)
+        self.samples = samples
+        self.realtime = realtime
+
+    @property
+    def duration(self):
+        return self.samples.size / self.rate
+
+    def read(self, frames):
+        start = self.position
+        if start >= self.samples.size:
+            return b""
+        end = min(start + frames, self.samples.size)
+        self.position = end
+
+        if self.realtime:
+            delay = self._t0 + end / self.rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        return self.samples[start:end].tobytes()
+
+class WavFileSource(ArraySource):
+    """
+    Replays a 16-bit PCM WAV file. Multi-channel files are mixed down to mono.
+    """
+
+    def __init__(self, path, chunk=DEFAULT_CHUNK, realtime=False):
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+            rate = wav.getframerate()
+            channels = wav.getnchannels()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        super().__init__(samples, rate=rate, chunk=chunk, realtime=realtime)
+        self.path = path
@@ -68,7 +68,7 @@ def run_sequence(config):
         except Exception as e:
             logger.error(f"Failed to launch {app}: {e}")
 
-def get_time_string():
+def get_time_string(now=None):
     import datetime
-    now = datetime.datetime.now()
+    now = now or datetime.datetime.now()
     return now.strftime("The time is %I:%M %p")
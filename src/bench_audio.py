@@ -0,0 +1,222 @@
+"""
+Micro-benchmarks for the audio path. Runs headless, no microphone needed.
+
+    python bench_audio.py onset
+    python bench_audio.py claps [--wav session.wav]
+    python bench_audio.py vad [--wav utterance.wav ...]
+"""
+import argparse
+import math
+import time
+import numpy as np
+
+from onset_detector import OnsetDetector
+from audio_source import ArraySource, WavFileSource
+from clap_detector import ClapDetector
+from vad import Endpointer, listen_segment
+
+def _synthetic_session(rate, seconds, claps, seed=0):
+    """
+    Background noise with short broadband bursts at the given clap times.
+    """
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 300, int(rate * seconds))
+    burst_len = int(rate * 0.01)
+    decay = np.exp(-np.linspace(0, 6, burst_len))
+    for t in claps:
+        start = int(t * rate)
+        audio[start:start + burst_len] += rng.normal(0, 12000, burst_len) * decay
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+def _time_per_sample(fn, chunks, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for chunk in chunks:
+            fn(chunk)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / sum(c.size for c in chunks)
+
+def bench_onset(args):
+    rate, chunk = args.rate, args.chunk
+    claps = [1.0, 1.3, 3.0, 3.35, 6.2]
+    audio = _synthetic_session(rate, args.seconds, claps)
+    chunks = [audio[i:i + chunk] for i in range(0, audio.size - chunk + 1, chunk)]
+
+    detector = OnsetDetector(rate)
+    clock = {"t": 0.0}
+    found = []
+
+    def legacy(c):
+        clock["t"] += c.size / rate
+        if np.average(np.abs(c)) > 3000:
+            found.append((clock["t"], 0.0))
+
+    def onset(c):
+        clock["t"] += c.size / rate
+        found.extend(detector.process(c, clock["t"]))
+
+    legacy_ns = _time_per_sample(legacy, chunks, args.repeat)
+    onset_ns = _time_per_sample(onset, chunks, args.repeat)
+
+    # Accuracy on a single clean pass
+    detector.reset()
+    clock["t"] = 0.0
+    found.clear()
+    for c in chunks:
+        onset(c)
+    errors = [min(abs(t - c) for c in claps) * 1000 for t, _ in found]
+
+    print(f"chunk={chunk} rate={rate} samples={audio.size}")
+    print(f"legacy chunk average : {legacy_ns:8.2f} ns/sample")
+    print(f"onset detector       : {onset_ns:8.2f} ns/sample")
+    print(f"onsets found         : {len(found)}/{len(claps)}"
+          + (f", max timing error {max(errors):.1f} ms" if errors else ""))
+
+def bench_claps(args):
+    if args.wav:
+        source = WavFileSource(args.wav, chunk=args.chunk, realtime=args.realtime)
+        claps = None
+    else:
+        claps = [1.0, 1.3, 3.0, 3.35, 6.2]
+        audio = _synthetic_session(args.rate, args.seconds, claps)
+        source = ArraySource(audio, rate=args.rate, chunk=args.chunk, realtime=args.realtime)
+
+    detector = ClapDetector(source=source)
+    detections = []
+    detector.subscribe(lambda t, rms: detections.append((t, source.time(), rms)))
+
+    source.open()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    while detector.scan(n=2, timeout=source.duration):
+        pass
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    duration = source.position / source.rate
+
+    print(f"source={getattr(source, 'path', 'synthetic')} duration={duration:.2f}s")
+    print(f"cpu {cpu * 1000:.1f} ms ({cpu / duration * 100:.2f}% of real time), wall {wall * 1000:.1f} ms")
+    for onset, detected, rms in detections:
+        t = onset - source.started_at
+        print(f"  clap at {t:7.3f}s  rms {rms:7.0f}  detection latency {(detected - onset) * 1000:5.1f} ms")
+    if claps:
+        print(f"claps found: {len(detections)}/{len(claps)}")
+
+def _synthetic_utterance(rate, seed):
+    """
+    Harmonic "speech" with syllable-rate modulation and short inner pauses,
+    padded with room noise. Returns (samples, true end of speech in seconds).
+    """
+    rng = np.random.default_rng(seed)
+    lead, speech, trail = 0.5, rng.uniform(0.8, 2.5), 2.0
+    t = np.arange(int(rate * speech)) / rate
+    f0 = rng.uniform(95, 220)
+    voiced = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 16))
+    envelope = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0.15, None)
+    # A couple of word gaps shorter than any sensible hangover
+    for gap in rng.uniform(0.2, speech - 0.3, 2):
+        envelope[int(gap * rate):int((gap + 0.12) * rate)] = 0.0
+    voice = voiced * envelope * rng.uniform(2000, 5000)
+
+    audio = rng.normal(0, 60, int(rate * (lead + speech + trail)))
+    start = int(lead * rate)
+    audio[start:start + voice.size] += voice
+    return np.clip(audio, -32768, 32767).astype(np.int16), lead + speech
+
+def _reference_end(samples, rate):
+    """
+    Oracle end of speech for a recording: the last 10 ms frame well above the noise floor.
+    """
+    frame = rate // 100
+    n = samples.size // frame
+    rms = np.sqrt((samples[:n * frame].astype(np.float64).reshape(n, frame) ** 2).mean(axis=1))
+    loud = np.flatnonzero(rms > max(4 * np.percentile(rms, 10), 100))
+    return (loud[-1] + 1) * frame / rate if loud.size else None
+
+def _legacy_endpoint(samples, rate, chunk=1024, energy_threshold=300, pause_threshold=0.8):
+    """
+    Replays speech_recognition's Recognizer.listen endpointing (fixed energy
+    threshold, pause_threshold of silence) and returns when it would hand off.
+    """
+    seconds_per_buffer = chunk / rate
+    pause_buffers = int(math.ceil(pause_threshold / seconds_per_buffer))
+    started, pause_count = False, 0
+    for i in range(samples.size // chunk):
+        buf = samples[i * chunk:(i + 1) * chunk].astype(np.float64)
+        energy = math.sqrt((buf * buf).mean())
+        if not started:
+            started = energy > energy_threshold
+            continue
+        pause_count = pause_count + 1 if energy <= energy_threshold else 0
+        if pause_count > pause_buffers:
+            return (i + 1) * seconds_per_buffer
+    return samples.size / rate
+
+def bench_vad(args):
+    cases = []
+    if args.wav:
+        for path in args.wav:
+            source = WavFileSource(path)
+            cases.append((path, source.samples, source.rate, _reference_end(source.samples, source.rate)))
+    else:
+        for seed in range(args.count):
+            samples, end = _synthetic_utterance(args.rate, seed)
+            cases.append((f"synthetic-{seed}", samples, args.rate, end))
+
+    vad_delays, legacy_delays = [], []
+    for name, samples, rate, end in cases:
+        if end is None:
+            print(f"{name}: no speech found, skipped")
+            continue
+        source = ArraySource(samples, rate=rate, chunk=160)
+        source.open()
+        endpointer = Endpointer(rate, hangover_ms=args.hangover)
+        endpointer.vad.calibrate(samples[:rate // 4])
+        segment, _ = listen_segment(source, endpointer=endpointer)
+        if segment is None:
+            print(f"{name}: VAD found no utterance")
+            continue
+        vad_delays.append((source.position / rate - end) * 1000)
+        legacy_delays.append((_legacy_endpoint(samples, rate) - end) * 1000)
+
+    def report(label, delays):
+        p50, p90, p99 = np.percentile(delays, [50, 90, 99])
+        print(f"{label:28s} p50 {p50:6.0f} ms   p90 {p90:6.0f} ms   p99 {p99:6.0f} ms")
+
+    print(f"utterances: {len(vad_delays)}  (endpoint delay after the end of speech)")
+    if vad_delays:
+        report(f"local VAD ({args.hangover} ms hangover)", vad_delays)
+        report("speech_recognition listen", legacy_delays)
+
+def main():
+    parser = argparse.ArgumentParser(description="ZADE audio micro-benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("onset", help="clap onset detection cost and accuracy")
+    p.add_argument("--rate", type=int, default=44100)
+    p.add_argument("--chunk", type=int, default=1024)
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_onset)
+
+    p = sub.add_parser("claps", help="clap detection latency and CPU cost on a replayed session")
+    p.add_argument("--wav", help="16-bit PCM recording to replay (default: synthetic session)")
+    p.add_argument("--rate", type=int, default=44100)
+    p.add_argument("--chunk", type=int, default=1024)
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--realtime", action="store_true", help="pace replay like a live microphone")
+    p.set_defaults(func=bench_claps)
+
+    p = sub.add_parser("vad", help="end-of-utterance delay: local VAD vs speech_recognition")
+    p.add_argument("--wav", nargs="*", help="16-bit PCM recordings, one utterance each (default: synthetic)")
+    p.add_argument("--rate", type=int, default=16000)
+    p.add_argument("--count", type=int, default=50)
+    p.add_argument("--hangover", type=int, default=300, help="VAD hangover in ms")
+    p.set_defaults(func=bench_vad)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import time
+import logging
+import threading
+import numpy as np
+from audio_source import AudioSource, DeviceSource
+
+logger = logging.getLogger(__name__)
+
+# One device, one format for every consumer
+HUB_RATE = 16000
+BLOCK = 160             # 10 ms per capture read
+CAPACITY_SECONDS = 10   # Ring buffer length shared by all subscribers
+
+class Subscription:
+    """
+    A reader cursor into the hub's ring buffer. read() returns NumPy views into
+    the ring (a copy is only made when a read wraps around its end), so data must
+    be consumed or copied before the writer laps it.
+    """
+
+    def __init__(self, hub, name):
+        self.hub = hub
+        self.name = name
+        self.active = False
+        self.overruns = 0        # times the writer lapped this reader
+        self.dropped = 0         # samples lost to overruns
+        self._read_pos = 0
+
+    @property
+    def lag(self):
+        """
+        Samples written but not yet read.
+        """
+        return self.hub.write_pos - self._read_pos if self.active else 0
+
+    def resume(self, preroll=0.0):
+        """
+        Starts (or restarts) reading at the live edge, optionally rewound by
+        preroll seconds of already-captured audio.
+        """
+        with self.hub._cond:
+            back = min(int(preroll * self.hub.rate), self.hub.write_pos, self.hub.capacity - self.hub.block)
+            self._read_pos = self.hub.write_pos - back
+            self.active = True
+
+    def pause(self):
+        """
+        Stops tracking the writer, so an idle consumer does not count overruns.
+        """
+        self.active = False
+
+    def read(self, frames, timeout=None):
+        """
+        Blocks until frames samples are available and returns them as an int16
+        view. Returns an empty array if the hub stops or the timeout expires.
+        """
+        hub = self.hub
+        deadline = None if timeout is None else time.time() + timeout
+        with hub._cond:
+            while hub.write_pos - self._read_pos < frames:
+                if not hub.running:
+                    return hub._ring[:0]
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return hub._ring[:0]
+                hub._cond.wait(remaining)
+
+            behind = hub.write_pos - self._read_pos
+            if behind > hub.capacity:
+                # The writer overwrote unread data; skip to the oldest valid sample
+                lost = behind - hub.capacity
+                self.overruns += 1
+                self.dropped += lost
+                self._read_pos += lost
+                logger.warning(f"Capture subscriber '{self.name}' overrun, dropped {lost} samples")
+
+            start = self._read_pos % hub.capacity
+            self._read_pos += frames
+
+        end = start + frames
+        if end <= hub.capacity:
+            return hub._ring[start:end]
+        return np.concatenate((hub._ring[start:], hub._ring[:end - hub.capacity]))
+
+    def as_source(self, copy=False, preroll=0.0):
+        return HubSource(self, copy=copy, preroll=preroll)
+
+class HubSource(AudioSource):
+    """
+    AudioSource over a hub subscription. open() joins the live stream and close()
+    leaves it. With copy=False reads are zero-copy memoryviews into the ring;
+    consumers that keep buffers around (the recognizer) should use copy=True.
+    """
+
+    def __init__(self, subscription, copy=False, preroll=0.0):
+        super().__init__(subscription.hub.rate, subscription.hub.block)
+        self.subscription = subscription
+        self.copy = copy
+        self.preroll = preroll
+
+    def open(self):
+        super().open()
+        self.subscription.resume(self.preroll)
+        return self
+
+    def close(self):
+        self.subscription.pause()
+        super().close()
+
+    def read(self, frames):
+        samples = self.subscription.read(frames)
+        self.position += samples.size
+        if self.copy:
+            return samples.tobytes()
+        return memoryview(samples).cast("B")
+
+    def time(self):
+        return time.time()
+
+    def identity(self):
+        return self.subscription.hub.source.identity()
+
+class CaptureHub:
+    """
+    Owns the only input stream. A single capture thread reads the device into a
+    shared ring buffer and fans each block out to pull subscribers (recognizer,
+    clap detector, VAD) and push listeners (level meter) without copying.
+    """
+
+    def __init__(self, source=None, rate=HUB_RATE, block=BLOCK, capacity_seconds=CAPACITY_SECONDS):
+        self.source = source or DeviceSource(rate=rate, chunk=block)
+        self.rate = self.source.rate
+        self.block = block
+        # Whole number of blocks, so block-sized reads never straddle the end
+        self.capacity = max(2, int(capacity_seconds * self.rate) // block) * block
+        self.write_pos = 0  # total samples captured since start
+        self.running = False
+
+        self._ring = np.zeros(self.capacity, dtype=np.int16)
+        self._cond = threading.Condition()
+        self._subscriptions = {}
+        self._listeners = []
+        self._thread = None
+
+    def start(self):
+        if self.running:
+            return
+        if not self.source.is_open:
+            self.source.open()
+        self.running = True
+        self._thread = threading.Thread(target=self._capture_loop, name="capture-hub", daemon=True)
+        self._thread.start()
+        logger.info(f"Capture hub started at {self.rate} Hz.")
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.source.close()
+
+    def subscribe(self, name):
+        """
+        Returns the named pull subscription, creating it on first use. It starts
+        paused; call resume() or open its as_source() to begin reading.
+        """
+        with self._cond:
+            if name not in self._subscriptions:
+                self._subscriptions[name] = Subscription(self, name)
+            return self._subscriptions[name]
+
+    def add_listener(self, callback):
+        """
+        Registers callback(block, end_time), called on the capture thread with a
+        read-only view of every block. Keep it short; it delays the next read.
+        """
+        with self._cond:
+            self._listeners.append(callback)
+        return callback
+
+    def remove_listener(self, callback):
+        with self._cond:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def stats(self):
+        """
+        Per-subscriber lag (ms), overruns and dropped samples.
+        """
+        with self._cond:
+            return {
+                name: {
+                    "active": sub.active,
+                    "lag_ms": sub.lag * 1000.0 / self.rate,
+                    "overruns": sub.overruns,
+                    "dropped": sub.dropped,
+                }
+                for name, sub in self._subscriptions.items()
+            }
+
+    def _capture_loop(self):
+        while self.running:
+            try:
+                data = self.source.read(self.block)
+            except Exception as e:
+                logger.error(f"Capture hub read failed: {e}")
+                time.sleep(0.05)
+                continue
+            if not data:
+                break
+
+            samples = np.frombuffer(data, dtype=np.int16)
+            now = time.time()
+            with self._cond:
+                start = self.write_pos % self.capacity
+                end = start + samples.size
+                if end <= self.capacity:
+                    self._ring[start:end] = samples
+                else:
+                    split = self.capacity - start
+                    self._ring[start:] = samples[:split]
+                    self._ring[:end - self.capacity] = samples[split:]
+                self.write_pos += samples.size
+                listeners = list(self._listeners)
+                self._cond.notify_all()
+
+            if listeners:
+                # The whole block, read-only (frombuffer over bytes), even when it wrapped the ring
+                for callback in listeners:
+                    try:
+                        callback(samples, now)
+                    except Exception as e:
+                        logger.error(f"Capture listener failed: {e}")
+
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+
+# Shared hub for the life of the process
+_hub = None
+
+def get_hub(source=None):
+    """
+    Returns the process-wide CaptureHub, creating it on first use.
+    """
+    global _hub
+    if _hub is None:
+        _hub = CaptureHub(source=source)
+    return _hub
@@ -1,72 +1,222 @@
-import pyaudio
 import numpy as np
 import time
 import logging
-from audio_utils import no_alsa_error
+import threading
+from collections import deque
+from audio_source import DeviceSource
+from onset_detector import OnsetDetector
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Constants for audio stream
-FORMAT = pyaudio.paInt16
-CHANNELS = 1
 RATE = 44100
 CHUNK = 1024
-THRESHOLD = 3000  # Adjust based on mic sensitivity
+MIN_RMS = 2500   # Absolute onset gate, adjust based on mic sensitivity
 CLAP_GAP = 0.5    # Max time between two claps (seconds)
+DEBOUNCE = 0.2    # Ignore noise detected immediately after a clap (seconds)
+HISTORY_SECONDS = 2.0  # Length of the recent-frames ring buffer
 
-def detect_claps(required_claps=2, timeout=5):
+class ClapDetector:
     """
-    Listens for a sequence of loud noises (claps).
+    Long-lived clap listener. Opens its AudioSource once and keeps reading
+    on a background thread, so confirmations start detecting immediately.
+    Defaults to the live microphone; pass a replay source to run headless.
     """
-    
-    p = pyaudio.PyAudio()
-    
-    with no_alsa_error():
-        stream = p.open(format=FORMAT,
-                        channels=CHANNELS,
-                        rate=RATE,
-                        input=True,
-                        frames_per_buffer=CHUNK)
-    
-    logger.info(f"Listening for {required_claps} claps within {timeout} seconds...")
-    
-    claps = 0
-    start_time = time.time()
-    last_clap_time = 0
-    
-    try:
-        while time.time() - start_time < timeout:
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            audio_data = np.frombuffer(data, dtype=np.int16)
-            peak = np.average(np.abs(audio_data))
-            
-            if peak > THRESHOLD:
-                current_time = time.time()
-                # Debounce: ignore noise detected immediately after a clap
-                if current_time - last_clap_time > 0.2: 
-                    claps += 1
-                    last_clap_time = current_time
-                    logger.info(f"Clap {claps} detected! (Peak: {peak})")
-                
-                if claps >= required_claps:
+
+    def __init__(self, source=None, min_rms=MIN_RMS, history_seconds=HISTORY_SECONDS):
+        self.source = source or DeviceSource(rate=RATE, chunk=CHUNK)
+        self.onsets = OnsetDetector(self.source.rate, min_rms=min_rms, refractory=DEBOUNCE)
+        self._thread = None
+        self._running = False
+
+        # Ring buffer of (timestamp, int16 frame) for the last few seconds
+        chunks = history_seconds * self.source.rate / self.source.chunk
+        self._frames = deque(maxlen=max(1, int(chunks)))
+        self._clap_times = deque(maxlen=64)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._clap_event = threading.Condition(self._lock)
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """
+        Opens the audio source and starts the reader thread. Safe to call twice.
+        """
+        if self._running:
+            return
+        if not self.source.is_open:
+            self.source.open()
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name="clap-detector", daemon=True)
+        self._thread.start()
+        logger.info("Clap detector stream opened.")
+
+    def follow(self, worker):
+        """
+        Takes claps from a DSPWorker's onset detection instead of reading the
+        source on a thread of this process.
+        """
+        self._running = True
+        worker.subscribe("clap", self._on_clap)
+
+    def stop(self):
+        """
+        Stops the reader thread and releases the audio source.
+        """
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.source.close()
+
+    def subscribe(self, callback):
+        """
+        Registers callback(timestamp, peak), called from the reader thread on every clap.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def recent_frames(self):
+        """
+        Returns a snapshot of the ring buffer as a list of (timestamp, frame).
+        """
+        with self._lock:
+            return list(self._frames)
+
+    def wait_for_claps(self, n=2, timeout=5):
+        """
+        Blocks until n claps, each within CLAP_GAP of the previous one, have been
+        heard since the call, or timeout expires.
+        """
+        if not self._running:
+            self.start()
+
+        logger.info(f"Listening for {n} claps within {timeout} seconds...")
+        start_time = time.time()
+        deadline = start_time + timeout
+        with self._clap_event:
+            while True:
+                if _longest_run([t for t in self._clap_times if t >= start_time]) >= n:
                     return True
-            
-            # Small sleep to prevent CPU hogging - though reading stream blocks usually
-            # time.sleep(0.01) 
-            
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._running:
+                    return False
+                self._clap_event.wait(remaining)
+
+    def scan(self, n=2, timeout=5):
+        """
+        Synchronous variant of wait_for_claps for replay sources: reads on the
+        caller's thread and measures the timeout on the stream clock, so a
+        recording replayed faster than real time behaves like the live mic.
+        """
+        if not self.source.is_open:
+            self.source.open()
+        start_time = self.source.time()
+        heard = []
+        while self.source.time() - start_time < timeout:
+            data = self.source.read(self.source.chunk)
+            if not data:
+                break
+            heard.extend(t for t in self._process(data) if t >= start_time)
+            if _longest_run(heard) >= n:
+                return True
+        return False
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                data = self.source.read(self.source.chunk)
+            except Exception as e:
+                logger.error(f"Error in clap detection: {e}")
+                time.sleep(0.05)
+                continue
+
+            if not data:
+                # Replay source ran out; wake any waiter so it can give up
+                with self._clap_event:
+                    self._running = False
+                    self._clap_event.notify_all()
+                break
+            self._process(data)
+
+    def _process(self, data):
+        now = self.source.time()
+        audio_data = np.frombuffer(data, dtype=np.int16)
+
+        with self._lock:
+            self._frames.append((now, audio_data))
+
+        # Onset times are placed inside the chunk, so the debounce and
+        # CLAP_GAP work on the actual transients rather than read times
+        onsets = self.onsets.process(audio_data, now)
+        for onset_time, rms in onsets:
+            self._on_clap(onset_time, rms)
+        return [onset_time for onset_time, _ in onsets]
+
+    def _on_clap(self, timestamp, peak):
+        with self._clap_event:
+            self._clap_times.append(timestamp)
+            subscribers = list(self._subscribers)
+            self._clap_event.notify_all()
+        logger.info(f"Clap detected! (RMS: {peak:.0f})")
+        for callback in subscribers:
+            try:
+                callback(timestamp, peak)
+            except Exception as e:
+                logger.error(f"Clap subscriber failed: {e}")
+
+def _longest_run(times):
+    """
+    Length of the longest sequence of claps spaced no more than CLAP_GAP apart.
+    """
+    best = run = 0
+    previous = None
+    for t in times:
+        run = run + 1 if previous is not None and t - previous <= CLAP_GAP else 1
+        best = max(best, run)
+        previous = t
+    return best
+
+# Shared detector for the life of the process
+_detector = None
+
+def get_detector(source=None):
+    """
+    Returns the process-wide ClapDetector, creating it on first use
+    (on the given source, e.g. a capture hub feed, or the microphone).
+    """
+    global _detector
+    if _detector is None:
+        _detector = ClapDetector(source=source)
+    return _detector
+
+def detect_claps(required_claps=2, timeout=5, source=None):
+    """
+    Listens for a sequence of loud noises (claps). Uses the shared microphone
+    detector unless an AudioSource (e.g. a WAV replay) is given.
+    """
+    try:
+        if source is not None:
+            return ClapDetector(source=source).scan(required_claps, timeout)
+        return get_detector().wait_for_claps(required_claps, timeout)
     except Exception as e:
         logger.error(f"Error in clap detection: {e}")
-    finally:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-        
-    return False
+        return False
 
 if __name__ == "__main__":
     if detect_claps():
         print("Double clap confirmed!")
     else:
         print("Clap detection timed out.")
+    get_detector().stop()
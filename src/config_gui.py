@@ -55,6 +55,7 @@ class ConfigGUI:
 
         self.red_alert = False
         self.scan_y = 0
+        self.last_telemetry = 0
         self.viz_data = [random.randint(5, 40) for _ in range(50)]
         
         self.style = ttk.Style()
@@ -363,8 +364,10 @@ class ConfigGUI:
             pts.extend([x, 1000 - self.viz_data[i]])
         if len(pts) > 4: self.canvas.create_line(pts, fill=accent_pulse, width=pulse_w, smooth=True, tags="fx")
         
-        # 3. Telemetry Visualizers
-        self.update_telemetry()
+        # 3. Telemetry Visualizers (psutil is slow; refresh twice a second)
+        if time.time() - self.last_telemetry > 0.5:
+            self.last_telemetry = time.time()
+            self.update_telemetry()
 
         # 4. Red Alert Shaker
         if self.red_alert:
@@ -375,7 +378,8 @@ class ConfigGUI:
             self.canvas.move("all", dx, dy)
             self.root.after(50, lambda: self.canvas.move("all", -dx, -dy))
 
-        self.root.after(40, self.animate)
+        # ~60 fps so the HUD follows the live level meter closely
+        self.root.after(16, self.animate)
 
     def update_telemetry(self):
         self.tele_canvas.delete("bar")
@@ -0,0 +1,86 @@
+import time
+import logging
+import threading
+from memory_system import get_identity_context
+from features import get_system_stats, get_battery_status
+
+logger = logging.getLogger(__name__)
+
+# How often system load and battery are sampled (seconds)
+SAMPLE_INTERVAL = 5.0
+# Samples older than this (sampler stalled) are left out of prompts rather than passed off as current
+MAX_AGE = 30.0
+HISTORY = 100
+
+class ContextProvider:
+    """
+    Situational context for LLM prompts without blocking the request on it.
+    System load (which takes 100 ms to measure) and battery state are
+    sampled by a background thread; the identity line comes from
+    memory_system's in-memory copy. snapshot() only reads what is already
+    there.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, max_age=MAX_AGE):
+        self.interval = interval
+        self.max_age = max_age
+        self.samples = 0
+        self.sample_times = []
+        self._system = ""
+        self._battery = ""
+        self._sampled_at = None
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        threading.Thread(target=self._loop, name="context-sampler", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def snapshot(self):
+        """
+        (identity, system stats, battery) strings. The first call samples in the
+        foreground if the sampler has not yet; the last two are empty if
+        sampling has stalled.
+        """
+        identity = get_identity_context()
+        if self._sampled_at is None:
+            self.sample()
+        with self._lock:
+            if self._sampled_at is None or time.time() - self._sampled_at > self.max_age:
+                return identity, "", ""
+            return identity, self._system, self._battery
+
+    def sample(self):
+        started = time.time()
+        system = get_system_stats()
+        battery = get_battery_status()
+        elapsed = time.time() - started
+        with self._lock:
+            self._system, self._battery = system, battery
+            self._sampled_at = time.time()
+            self.samples += 1
+            self.sample_times.append(elapsed)
+            del self.sample_times[:-HISTORY]
+
+    def stats(self):
+        with self._lock:
+            stats = {"samples": self.samples}
+            if self._sampled_at is not None:
+                stats["age"] = time.time() - self._sampled_at
+            if self.sample_times:
+                stats["sample_mean_ms"] = 1000 * sum(self.sample_times) / len(self.sample_times)
+        return stats
+
+    def _loop(self):
+        while self._running:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Context sampling error: {e}")
+            time.sleep(self.interval)
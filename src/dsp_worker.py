@@ -0,0 +1,442 @@
+import os
+import sys
+import time
+import queue
+import logging
+import threading
+import contextlib
+import multiprocessing
+import numpy as np
+from multiprocessing import shared_memory
+from audio_source import AudioSource, SAMPLE_WIDTH
+from onset_detector import MIN_RMS, REFRACTORY
+
+logger = logging.getLogger(__name__)
+
+# Same format as the in-process capture hub
+RATE = 16000
+BLOCK = 160             # 10 ms per device callback
+CAPACITY_SECONDS = 10   # Shared ring length; a reader this far behind starts losing audio
+EVENT_QUEUE = 256       # Events buffered for this process before the worker drops them
+STATS_INTERVAL = 1.0
+START_TIMEOUT = 5.0
+
+# Ring header layout (float64): sequence, samples written, time of the newest sample, device overflows
+_SEQ, _WRITTEN, _TIME, _OVERFLOWS = range(4)
+_HEADER_BYTES = 8 * 8
+
+class FrameRing:
+    """
+    Single-writer ring of int16 samples in shared memory. The header is a
+    seqlock like the level slot's, so readers in any process get a consistent
+    (samples written, time of newest sample) pair without ever blocking the
+    writer. Readers keep their own position and notice when they are lapped.
+    """
+
+    def __init__(self, name, capacity, create=False):
+        self.name = name
+        self.capacity = capacity
+        self.writer = create
+        size = _HEADER_BYTES + capacity * SAMPLE_WIDTH
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            # Attached from a child process: it shares the parent's resource
+            # tracker, so the segment stays registered to the parent
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._header = np.ndarray((_HEADER_BYTES // 8,), dtype=np.float64, buffer=self._shm.buf)
+        self._data = np.ndarray((capacity,), dtype=np.int16, buffer=self._shm.buf, offset=_HEADER_BYTES)
+        if create:
+            self._header[:] = 0.0
+
+    def write(self, samples, end_time, overflow=False):
+        header = self._header
+        written = int(header[_WRITTEN])
+        start = written % self.capacity
+        end = start + samples.size
+        if end <= self.capacity:
+            self._data[start:end] = samples
+        else:
+            split = self.capacity - start
+            self._data[start:] = samples[:split]
+            self._data[:end - self.capacity] = samples[split:]
+        header[_SEQ] += 1
+        header[_WRITTEN] = written + samples.size
+        header[_TIME] = end_time
+        if overflow:
+            header[_OVERFLOWS] += 1
+        header[_SEQ] += 1
+
+    def state(self):
+        """
+        Returns (samples written, time of the newest sample, device overflows).
+        """
+        header = self._header
+        while True:
+            for _ in range(8):
+                seq = header[_SEQ]
+                if seq % 2:
+                    continue
+                written, stamp, overflows = header[_WRITTEN], header[_TIME], header[_OVERFLOWS]
+                if header[_SEQ] == seq:
+                    return int(written), float(stamp), int(overflows)
+            time.sleep(0)
+
+    def copy(self, position, frames):
+        start = position % self.capacity
+        end = start + frames
+        if end <= self.capacity:
+            return self._data[start:end].copy()
+        return np.concatenate((self._data[start:], self._data[:end - self.capacity]))
+
+    def close(self):
+        self._header = None
+        self._data = None
+        self._shm.close()
+        if self.writer:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+class RingReader:
+    """
+    A reader position in a FrameRing, starting at the live edge. Like a hub
+    subscription, a reader the writer laps skips to the oldest valid sample and
+    counts the overrun.
+    """
+
+    def __init__(self, ring, rate, name):
+        self.ring = ring
+        self.rate = rate
+        self.name = name
+        self.overruns = 0
+        self.dropped = 0
+        self.position = ring.state()[0]
+
+    @property
+    def lag(self):
+        return self.ring.state()[0] - self.position
+
+    def read(self, frames, timeout=None):
+        """
+        Blocks until frames samples are available. Returns (int16 copy, time of
+        its last sample), or (None, None) if the timeout expires.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            written, stamp, _ = self.ring.state()
+            missing = self.position + frames - written
+            if missing <= 0:
+                break
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return None, None
+            # Nothing to wake us across processes; sleep about as long as the audio takes to arrive
+            wait = missing / self.rate
+            time.sleep(wait if remaining is None else min(wait, remaining))
+
+        self._skip_lapped(written)
+        samples = self.ring.copy(self.position, frames)
+        # The writer may have lapped us while we copied
+        if self._skip_lapped(self.ring.state()[0]):
+            return self.read(frames, timeout)
+        self.position += frames
+        return samples, stamp - (written - self.position) / self.rate
+
+    def _skip_lapped(self, written):
+        behind = written - self.position
+        if behind <= self.ring.capacity:
+            return False
+        lost = behind - self.ring.capacity
+        self.overruns += 1
+        self.dropped += lost
+        self.position += lost
+        logger.warning(f"Shared ring reader '{self.name}' overrun, dropped {lost} samples")
+        return True
+
+class RingSource(AudioSource):
+    """
+    AudioSource over the worker's ring, for the capture hub in this process.
+    time() is the worker's capture time of the last sample read, so timestamps
+    stay right even when this process falls behind.
+    """
+
+    def __init__(self, worker):
+        super().__init__(worker.rate, worker.block)
+        self.worker = worker
+        self.reader = None
+        self._end_time = None
+
+    def open(self):
+        super().open()
+        self.reader = RingReader(self.worker.ring, self.rate, "hub")
+        return self
+
+    def read(self, frames):
+        while self.worker.alive():
+            samples, end_time = self.reader.read(frames, timeout=0.5)
+            if samples is not None:
+                self.position += samples.size
+                self._end_time = end_time
+                return samples.tobytes()
+        return b""
+
+    def time(self):
+        return self._end_time if self._end_time is not None else time.time()
+
+    def identity(self):
+        # Matches DeviceSource, so saved noise profiles carry over
+        return f"device:{self.worker.device_name or 'default'}@{self.rate}"
+
+class DSPWorker:
+    """
+    Owns the microphone in a separate process. The worker's device callback
+    writes every block into a shared FrameRing and a DSP thread there runs the
+    always-on analysis (clap onsets, level meter), so Tk, HTTP calls, TTS and
+    the SDK clients in this interpreter can no longer starve capture of the GIL.
+    This process reads audio through source(), gets detections over an event
+    queue (subscribe()) and levels through the shared level slot as before.
+    """
+
+    def __init__(self, rate=RATE, block=BLOCK, capacity_seconds=CAPACITY_SECONDS, device_index=None,
+                 min_rms=MIN_RMS, refractory=REFRACTORY):
+        self.rate = rate
+        self.block = block
+        self.capacity = max(2, int(capacity_seconds * rate) // block) * block
+        self.device_index = device_index
+        self.min_rms = min_rms
+        self.refractory = refractory
+        self.device_name = None
+        self.ring = None
+        self.worker_stats = {}
+        self._process = None
+        self._events = None
+        self._stop = None
+        self._source = None
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Spawns the worker and waits until it is capturing. Raises RuntimeError if it cannot.
+        """
+        if self._process is not None:
+            return self
+        ctx = multiprocessing.get_context("spawn")
+        self.ring = FrameRing(f"zade_capture_{os.getpid()}", self.capacity, create=True)
+        self._events = ctx.Queue(EVENT_QUEUE)
+        self._stop = ctx.Event()
+        self._process = ctx.Process(target=_worker_main, name="dsp-worker", daemon=True,
+                                    args=(self.ring.name, self.capacity, self.rate, self.block,
+                                          self.device_index, self.min_rms, self.refractory,
+                                          self._events, self._stop))
+        with _slim_main():
+            self._process.start()
+        try:
+            event = self._events.get(timeout=START_TIMEOUT)
+        except queue.Empty:
+            event = ("error", "no response from the DSP worker")
+        if event[0] != "ready":
+            self.stop()
+            raise RuntimeError(f"DSP worker failed to start: {event[1]}")
+        self.device_name = event[1]
+        threading.Thread(target=self._event_loop, name="dsp-events", daemon=True).start()
+        logger.info(f"DSP worker capturing at {self.rate} Hz (pid {self._process.pid}).")
+        return self
+
+    def alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def source(self):
+        """
+        The AudioSource for this process (one per worker; feed it to the capture hub).
+        """
+        if self._source is None:
+            self._source = RingSource(self)
+        return self._source
+
+    def subscribe(self, kind, callback):
+        """
+        Registers callback(*args) for worker events of one kind ("clap": timestamp, rms).
+        """
+        with self._lock:
+            self._subscribers.setdefault(kind, []).append(callback)
+        return callback
+
+    def unsubscribe(self, kind, callback):
+        with self._lock:
+            if callback in self._subscribers.get(kind, []):
+                self._subscribers[kind].remove(callback)
+
+    def stats(self):
+        """
+        Device overflows, worker-side DSP overruns and dropped events, and this
+        process's lag and overruns on the shared ring.
+        """
+        stats = dict(self.worker_stats, alive=self.alive())
+        if self.ring is None:
+            return stats
+        stats["device_overflows"] = self.ring.state()[2]
+        reader = self._source.reader if self._source else None
+        if reader is not None:
+            stats.update({"hub_lag_ms": reader.lag * 1000.0 / self.rate,
+                          "hub_overruns": reader.overruns, "hub_dropped": reader.dropped})
+        return stats
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+        if self._process is not None:
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def _event_loop(self):
+        while self.alive():
+            try:
+                kind, *args = self._events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if kind == "stats":
+                self.worker_stats = args[0]
+                continue
+            if kind == "error":
+                logger.error(f"DSP worker: {args[0]}")
+            with self._lock:
+                callbacks = list(self._subscribers.get(kind, []))
+            for callback in callbacks:
+                try:
+                    callback(*args)
+                except Exception as e:
+                    logger.error(f"DSP event subscriber failed: {e}")
+        if self._stop is not None and not self._stop.is_set():
+            logger.error("DSP worker exited unexpectedly.")
+
+# --- Worker process -------------------------------------------------------------
+
+def _worker_main(ring_name, capacity, rate, block, device_index, min_rms, refractory, events, stop):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    import pyaudio
+    from audio_utils import no_alsa_error
+    from level_meter import LevelMeter, LevelSlot
+    from onset_detector import OnsetDetector
+
+    dropped_events = 0
+
+    def post(*event):
+        nonlocal dropped_events
+        try:
+            events.put_nowait(event)
+        except queue.Full:
+            dropped_events += 1  # This process is not draining events; never block capture on it
+
+    ring = FrameRing(ring_name, capacity)
+    pa = stream = slot = None
+    try:
+        try:
+            slot = LevelSlot(create=True)
+        except Exception as e:
+            logger.warning(f"Level slot unavailable, HUD will not see levels: {e}")
+        meter = LevelMeter(rate, slot=slot)
+        onsets = OnsetDetector(rate, min_rms=min_rms, refractory=refractory)
+
+        def callback(in_data, frame_count, time_info, status):
+            ring.write(np.frombuffer(in_data, dtype=np.int16), time.time(),
+                       overflow=bool(status & pyaudio.paInputOverflow))
+            return None, pyaudio.paContinue
+
+        pa = pyaudio.PyAudio()
+        with no_alsa_error():
+            stream = pa.open(format=pyaudio.paInt16,
+                             channels=1,
+                             rate=rate,
+                             input=True,
+                             input_device_index=device_index,
+                             frames_per_buffer=block,
+                             stream_callback=callback)
+        if device_index is None:
+            info = pa.get_default_input_device_info()
+        else:
+            info = pa.get_device_info_by_index(device_index)
+        stream.start_stream()
+        post("ready", info.get("name"))
+
+        # Analysis runs on its own thread, so the device callback only ever copies into the ring
+        reader = RingReader(ring, rate, "dsp")
+
+        def analyse():
+            while not stop.is_set():
+                samples, end_time = reader.read(block, timeout=0.5)
+                if samples is None:
+                    continue
+                meter.process(samples, end_time)
+                for onset_time, rms in onsets.process(samples, end_time):
+                    post("clap", onset_time, rms)
+
+        dsp = threading.Thread(target=analyse, name="dsp", daemon=True)
+        dsp.start()
+
+        parent = multiprocessing.parent_process()
+        while not stop.wait(STATS_INTERVAL):
+            if parent is not None and not parent.is_alive():
+                break
+            written, _, overflows = ring.state()
+            post("stats", {"captured_seconds": written / rate, "device_overflows": overflows,
+                           "dsp_lag_ms": (written - reader.position) * 1000.0 / rate,
+                           "dsp_overruns": reader.overruns, "dsp_dropped": reader.dropped,
+                           "dropped_events": dropped_events})
+        stop.set()
+        dsp.join(timeout=1.0)
+    except Exception as e:
+        post("error", str(e))
+    finally:
+        try:
+            if stream:
+                stream.stop_stream()
+                stream.close()
+            if pa:
+                pa.terminate()
+        except Exception:
+            pass
+        if slot:
+            slot.close()
+        ring.close()
+
+# Process-wide worker, when capture runs out of process
+_worker = None
+
+@contextlib.contextmanager
+def _slim_main():
+    """
+    A spawned child re-imports the parent's __main__ (main.py, and with it every
+    SDK) before it runs anything. While the worker starts, this module stands
+    in as __main__, so the child imports only what capture needs.
+    """
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = sys.modules[__name__]
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+def start_worker(device_index=None):
+    """
+    Starts the process-wide DSPWorker. Returns None (capture stays in-process) if it cannot run.
+    """
+    global _worker
+    if _worker is None:
+        try:
+            _worker = DSPWorker(device_index=device_index).start()
+        except Exception as e:
+            logger.warning(f"DSP worker unavailable, capturing in-process: {e}")
+    return _worker
+
+def get_worker():
+    return _worker
@@ -0,0 +1,168 @@
+import threading
+from collections import deque
+import numpy as np
+
+# Speaker-to-mic delay we allow for (device buffers + air), seconds
+MAX_DELAY = 0.35
+# Mic must exceed the expected echo level by this factor (~6 dB) to count as the user
+DOUBLE_TALK_MARGIN = 4.0
+# Waveform correlation with the aligned reference above which a loud frame is still echo
+ECHO_CORRELATION = 0.6
+# Starting guess for speaker-to-mic energy coupling, refined while ZADE talks
+INITIAL_COUPLING = 0.25
+# Mic history used to track the playback delay
+LAG_HISTORY = 1.5
+# Playback references older than this are dropped
+HISTORY = 30.0
+
+class EchoGate:
+    """
+    Tells the VAD which mic frames are just ZADE hearing itself.
+
+    Playback registers the PCM it is about to play with its start time. The
+    gate tracks the speaker-to-mic delay by correlating the mic and reference
+    energy envelopes, then for each mic frame compares its energy with the
+    expected echo (coupling x delayed reference energy). Frames that are not
+    clearly louder, or whose waveform correlates with the delayed reference,
+    are echo; anything else is the user talking over playback.
+    """
+
+    def __init__(self, rate, frame):
+        self.rate = rate
+        self.frame = frame
+        self.frame_seconds = frame / rate
+        self.coupling = INITIAL_COUPLING
+        self.lag_frames = 0
+        self._max_lag = int(round(MAX_DELAY / self.frame_seconds))
+        self._segments = []  # (start_time, float32 samples, per-frame energies)
+        self._mic = deque(maxlen=int(LAG_HISTORY / self.frame_seconds))  # (time, energy, was echo)
+        self._since_lag_update = 0
+        self._lock = threading.Lock()
+
+    def add_reference(self, samples, start_time):
+        """
+        Registers int16 PCM (at the gate's rate) that starts playing at start_time.
+        """
+        n = samples.size // self.frame
+        if n == 0:
+            return
+        audio = samples[:n * self.frame].astype(np.float32)
+        energies = np.einsum("ij,ij->i", audio.reshape(n, self.frame), audio.reshape(n, self.frame)) / self.frame
+        with self._lock:
+            self._segments = [s for s in self._segments
+                              if s[0] + len(s[2]) * self.frame_seconds > start_time - HISTORY]
+            self._segments.append((start_time, audio, energies))
+
+    def clear(self):
+        """
+        Forgets all references, e.g. after playback was interrupted.
+        """
+        with self._lock:
+            self._segments = []
+            self._mic.clear()
+
+    def is_playing(self, t):
+        with self._lock:
+            return any(start - 0.05 <= t <= start + len(e) * self.frame_seconds + MAX_DELAY
+                       for start, _, e in self._segments)
+
+    def echo_mask(self, frames, frame_times):
+        """
+        frames: float32 (n, frame) mic audio; frame_times: end time of each frame.
+        Returns a bool array, True where the frame is explained by playback.
+        """
+        mask = np.zeros(len(frame_times), dtype=bool)
+        with self._lock:
+            segments = list(self._segments)
+        if not segments:
+            return mask
+
+        energies = np.einsum("ij,ij->i", frames, frames) / self.frame
+        for i, t in enumerate(frame_times):
+            self._since_lag_update += 1
+            if self._since_lag_update >= 10:
+                self._update_lag(segments)
+
+            aligned = t - self.lag_frames * self.frame_seconds
+            ref_energy = self._reference_energy(segments, aligned, slack=2)
+            if ref_energy <= 0:
+                continue
+            ratio = energies[i] / ref_energy
+            if ratio <= self.coupling * DOUBLE_TALK_MARGIN:
+                mask[i] = True
+                # Echo-only frame: refine the coupling estimate
+                self.coupling = 0.98 * self.coupling + 0.02 * ratio
+            elif self._correlation(segments, frames[i], aligned) >= ECHO_CORRELATION:
+                mask[i] = True
+            self._mic.append((t, float(energies[i]), bool(mask[i])))
+        return mask
+
+    def _frames_at(self, segments, t):
+        """
+        Yields (segment, frame index) for the reference frame playing at time t.
+        """
+        for seg in segments:
+            idx = int((t - seg[0]) / self.frame_seconds) - 1
+            if 0 <= idx < len(seg[2]):
+                yield seg, idx
+
+    def _reference_energy(self, segments, t, slack):
+        best = 0.0
+        for seg, idx in self._frames_at(segments, t):
+            lo, hi = max(idx - slack, 0), min(idx + slack + 1, len(seg[2]))
+            best = max(best, float(seg[2][lo:hi].max()))
+        return best
+
+    def _reference_series(self, segments, times):
+        """
+        Reference energy playing at each of times (vectorized _reference_energy without slack).
+        """
+        out = np.zeros(times.size)
+        for start, _, energies in segments:
+            idx = ((times - start) / self.frame_seconds).astype(np.int64) - 1
+            valid = (idx >= 0) & (idx < energies.size)
+            out[valid] = np.maximum(out[valid], energies[idx[valid]])
+        return out
+
+    def _correlation(self, segments, mic_frame, t):
+        """
+        Peak normalized cross-correlation of a mic frame against the reference
+        around its aligned position (a couple of frames of slack either way).
+        """
+        best = 0.0
+        mic = mic_frame - mic_frame.mean()
+        mic_norm = np.linalg.norm(mic) + 1e-9
+        for seg, idx in self._frames_at(segments, t):
+            lo = max((idx - 2) * self.frame, 0)
+            hi = min((idx + 3) * self.frame, seg[1].size)
+            ref = seg[1][lo:hi]
+            if ref.size < mic.size:
+                continue
+            corr = np.correlate(ref, mic, mode="valid")
+            window = np.lib.stride_tricks.sliding_window_view(ref, mic.size)
+            norms = np.linalg.norm(window - window.mean(axis=1, keepdims=True), axis=1) + 1e-9
+            best = max(best, float((np.abs(corr) / (norms * mic_norm)).max()))
+        return best
+
+    def _update_lag(self, segments):
+        """
+        Picks the delay that best lines up the mic energy envelope with the reference's.
+        """
+        self._since_lag_update = 0
+        if len(self._mic) < self._mic.maxlen // 2:
+            return
+        # Only re-estimate while the mic mostly hears playback, not the user
+        if sum(echo for _, _, echo in self._mic) < len(self._mic) // 2:
+            return
+        times = np.array([t for t, _, _ in self._mic])
+        mic = np.log10(np.array([e for _, e, _ in self._mic]) + 1.0)
+        best_lag, best_score = self.lag_frames, -1.0
+        for lag in range(self._max_lag + 1):
+            ref = np.log10(self._reference_series(segments, times - lag * self.frame_seconds) + 1.0)
+            if ref.std() < 1e-3:
+                continue
+            score = float(np.corrcoef(mic, ref)[0, 1])
+            if score > best_score:
+                best_lag, best_score = lag, score
+        if best_score > 0.5:
+            self.lag_frames = best_lag
@@ -8,13 +8,13 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_greeting():
+def get_greeting(now=None):
     """
-    Returns a time-based greeting.
+    Returns a time-based greeting (for now, or the given datetime).
     """
     # Use astimezone() to ensure we get the local machine's hourly time, 
     # even if the environment defaults to UTC.
-    hour = datetime.now().astimezone().hour
+    hour = (now or datetime.now()).astimezone().hour
     if hour < 12:
         return "Good morning"
     elif 12 <= hour < 18:
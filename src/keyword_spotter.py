@@ -0,0 +1,104 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Spoken word -> command word that main.py matches on. Only words that are
+# unambiguous as the opening of an utterance; "start" or "sleep" also turn up
+# in ordinary questions, so those still wait for the full transcript.
+COMMAND_WORDS = {
+    "ignite": "ignite",
+    "ignited": "ignite",
+    "shutdown": "shutdown",
+    "reboot": "reboot",
+    "terminate": "terminate",
+    "abort": "abort",
+}
+# Words allowed before the command ("zade ignite")
+WAKE_WORDS = {"zade", "jade", "hey", "okay", "ok"}
+
+MIN_CONFIDENCE = 0.85   # Per-word confidence, when the recognizer reports one
+STABLE_PARTIALS = 2     # Otherwise: consecutive partials that must agree
+
+class KeywordSpotter:
+    """
+    Watches streaming partial hypotheses for a command word at the start of the
+    utterance and fires as soon as it is trustworthy, without waiting for the
+    endpoint and final transcript. Records how much earlier each command was
+    dispatched than the full transcript arrived.
+    """
+
+    def __init__(self, commands=COMMAND_WORDS, min_confidence=MIN_CONFIDENCE, stable_partials=STABLE_PARTIALS):
+        self.commands = commands
+        self.min_confidence = min_confidence
+        self.stable_partials = stable_partials
+        self.wins = {}  # command -> [seconds saved, ...]
+        self.reset()
+
+    def reset(self):
+        self.fired = None
+        self.fired_at = None
+        self._candidate = None
+        self._seen = 0
+
+    def update(self, partial, words=None):
+        """
+        Feeds one partial hypothesis (and optional [(word, confidence)]).
+        Returns the command word the first time one is accepted, else None.
+        """
+        if self.fired or not partial:
+            return None
+
+        command, confidence = self._leading_command(partial, words)
+        if command is None:
+            self._candidate, self._seen = None, 0
+            return None
+
+        self._seen = self._seen + 1 if command == self._candidate else 1
+        self._candidate = command
+        trusted = confidence >= self.min_confidence if confidence is not None else self._seen >= self.stable_partials
+        if not trusted:
+            return None
+
+        self.fired = command
+        self.fired_at = time.time()
+        logger.info(f"Keyword fast path: '{command}' from partial '{partial}'")
+        return command
+
+    def record_final(self, final_text, final_at=None):
+        """
+        Called when the full transcript for a fired utterance arrives; logs the latency win.
+        """
+        if not self.fired:
+            return None
+        win = (final_at or time.time()) - self.fired_at
+        self.wins.setdefault(self.fired, []).append(win)
+        if final_text and self.fired not in final_text.split():
+            logger.warning(f"Keyword '{self.fired}' fired but final transcript was '{final_text}'")
+        logger.info(f"Keyword '{self.fired}' dispatched {win * 1000:.0f} ms before the full transcript")
+        return win
+
+    def stats(self):
+        """
+        Per-command dispatch count and mean/max latency saved (ms).
+        """
+        return {
+            cmd: {
+                "count": len(wins),
+                "mean_win_ms": 1000 * sum(wins) / len(wins),
+                "max_win_ms": 1000 * max(wins),
+            }
+            for cmd, wins in self.wins.items()
+        }
+
+    def _leading_command(self, partial, words):
+        tokens = partial.lower().split()
+        for i, token in enumerate(tokens[:2]):
+            if token in self.commands:
+                confidence = None
+                if words and i < len(words) and words[i][0] == token:
+                    confidence = words[i][1]
+                return self.commands[token], confidence
+            if token not in WAKE_WORDS:
+                break
+        return None, None
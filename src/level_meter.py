@@ -0,0 +1,148 @@
+import time
+import logging
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+logger = logging.getLogger(__name__)
+
+# Shared-memory slot read by the HUD (a separate process from main.py)
+SLOT_NAME = "zade_vocal_level"
+FRAME_MS = 10
+# Smoothing per frame: rise quickly on speech, fall back gently
+ATTACK = 0.6
+RELEASE = 0.15
+# Scales normalized RMS so ordinary speech lands around 0.2 - 0.7
+LEVEL_GAIN = 8.0
+
+# Slot layout (float64): sequence, level, peak, timestamp
+_SEQ, _LEVEL, _PEAK, _TIME = range(4)
+
+class LevelSlot:
+    """
+    Single-writer, lock-free slot in shared memory (a seqlock). The writer bumps
+    the sequence to odd, writes, then bumps it to even; readers retry if the
+    sequence was odd or changed underneath them. Nothing ever blocks the writer.
+    """
+
+    def __init__(self, name=SLOT_NAME, create=False):
+        self.name = name
+        self.writer = create
+        if create:
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=4 * 8)
+            except FileExistsError:
+                # Left behind by a crashed run; take it over
+                self._shm = shared_memory.SharedMemory(name=name)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            # Readers must not unlink the writer's segment when they exit
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._values = np.ndarray((4,), dtype=np.float64, buffer=self._shm.buf)
+        if create:
+            self._values[:] = 0.0
+
+    def write(self, level, peak, timestamp):
+        values = self._values
+        values[_SEQ] += 1
+        values[_LEVEL] = level
+        values[_PEAK] = peak
+        values[_TIME] = timestamp
+        values[_SEQ] += 1
+
+    def read(self, retries=8):
+        """
+        Returns (level, peak, timestamp), or None if the writer kept it busy.
+        """
+        values = self._values
+        for _ in range(retries):
+            seq = values[_SEQ]
+            if seq % 2:
+                continue
+            level, peak, stamp = values[_LEVEL], values[_PEAK], values[_TIME]
+            if values[_SEQ] == seq:
+                return float(level), float(peak), float(stamp)
+        return None
+
+    def close(self):
+        self._values = None
+        self._shm.close()
+        if self.writer:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+class LevelMeter:
+    """
+    Computes smoothed RMS and peak per ~10 ms frame from the live capture
+    stream and publishes them to a LevelSlot. Runs as a capture hub listener,
+    so the level follows the microphone with one frame of delay.
+    """
+
+    def __init__(self, rate, frame_ms=FRAME_MS, slot=None):
+        self.frame = max(1, int(rate * frame_ms / 1000))
+        self.slot = slot
+        self.level = 0.0
+        self.peak = 0.0
+        self._remainder = np.zeros(0, dtype=np.int16)
+
+    def process(self, block, end_time):
+        samples = np.concatenate((self._remainder, block)) if self._remainder.size else block
+        n_frames = samples.size // self.frame
+        used = n_frames * self.frame
+        self._remainder = samples[used:].copy()
+        if n_frames == 0:
+            return
+
+        frames = samples[:used].astype(np.float32).reshape(n_frames, self.frame) / 32768.0
+        rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / self.frame) * LEVEL_GAIN
+        peaks = np.abs(frames).max(axis=1)
+
+        level, peak = self.level, self.peak
+        for r, p in zip(rms.tolist(), peaks.tolist()):
+            level += (ATTACK if r > level else RELEASE) * (r - level)
+            peak = p if p > peak else peak + RELEASE * (p - peak)
+        self.level, self.peak = min(level, 1.0), peak
+
+        if self.slot:
+            self.slot.write(self.level, self.peak, end_time)
+
+# Process-wide meter (writer side, in main.py) and reader slot (HUD side)
+_meter = None
+_reader = None
+
+def start_meter(hub):
+    """
+    Attaches a LevelMeter to the capture hub and publishes to the shared slot.
+    """
+    global _meter
+    if _meter is None:
+        try:
+            slot = LevelSlot(create=True)
+        except Exception as e:
+            logger.warning(f"Level slot unavailable, HUD will not see levels: {e}")
+            slot = None
+        _meter = LevelMeter(hub.rate, slot=slot)
+        hub.add_listener(_meter.process)
+    return _meter
+
+def read_level(max_age=0.5):
+    """
+    Latest smoothed level (0.0 - 1.0). Reads the in-process meter when there is
+    one, otherwise the shared slot written by main.py. Stale values read as 0.
+    """
+    global _reader
+    if _meter is not None:
+        return _meter.level
+    if _reader is None:
+        try:
+            _reader = LevelSlot()
+        except FileNotFoundError:
+            return 0.0
+    sample = _reader.read()
+    if not sample or time.time() - sample[2] > max_age:
+        # The writer may have restarted on a fresh segment; reattach next time
+        _reader.close()
+        _reader = None
+        return 0.0
+    return sample[0]
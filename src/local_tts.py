@@ -0,0 +1,130 @@
+import io
+import re
+import time
+import wave
+import shutil
+import logging
+import threading
+import subprocess
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+# eSpeak's speaking rate at edge-tts "+0%"
+ESPEAK_WPM = 175
+DEFAULT_ESPEAK_VOICE = "en-us"
+HISTORY = 200
+
+class LocalSynthesizer:
+    """
+    Offline CPU text-to-speech used when edge-tts is slow or unreachable.
+    Uses Piper when the piper package and a voice model are available (the
+    model is loaded once and stays in memory), otherwise the espeak-ng or
+    espeak command line. Like SynthesisEngine.submit(), submit() renders to a
+    file and returns a Future[bool]; jobs run one at a time on a worker
+    thread, since they are CPU bound. Output files are WAV.
+    """
+
+    def __init__(self, piper_model=None, espeak_voice=DEFAULT_ESPEAK_VOICE):
+        self.piper_model = piper_model
+        self.espeak_voice = espeak_voice
+        self.backend = None
+        self.timings = []
+        self.failures = 0
+        self._voice = None
+        self._espeak = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Loads the Piper model (or finds eSpeak) and renders a short phrase so the
+        first real request does not pay for warm-up. Raises RuntimeError if no
+        local engine is installed.
+        """
+        if self.backend:
+            return self
+        if self.piper_model:
+            try:
+                from piper.voice import PiperVoice
+                self._voice = PiperVoice.load(self.piper_model)
+                self.backend = "piper"
+            except Exception as e:
+                logger.warning(f"Piper voice unavailable ({e}), trying eSpeak")
+        if self.backend is None:
+            self._espeak = shutil.which("espeak-ng") or shutil.which("espeak")
+            if self._espeak is None:
+                raise RuntimeError("neither Piper nor eSpeak is installed")
+            self.backend = "espeak"
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-tts")
+        self._pool.submit(self._warm)
+        logger.info(f"Local TTS ready ({self.backend}).")
+        return self
+
+    def submit(self, text, output_file, rate="+0%"):
+        """
+        Queues one sentence for synthesis to output_file (WAV). The future
+        resolves to True on success and False on failure.
+        """
+        return self._pool.submit(self._job, text, output_file, rate)
+
+    def stats(self):
+        with self._lock:
+            timings = sorted(self.timings)
+            stats = {"backend": self.backend, "jobs": len(timings), "failures": self.failures}
+        if timings:
+            stats.update({"synth_mean": sum(timings) / len(timings),
+                          "synth_p90": timings[min(len(timings) - 1, int(0.9 * len(timings)))]})
+        return stats
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _warm(self):
+        try:
+            self._render("Ready.", None, "+0%")
+        except Exception as e:
+            logger.warning(f"Local TTS warm-up failed: {e}")
+
+    def _job(self, text, output_file, rate):
+        started = time.time()
+        try:
+            self._render(text, output_file, rate)
+        except Exception as e:
+            logger.error(f"Local TTS generation failed: {e}")
+            with self._lock:
+                self.failures += 1
+            return False
+        elapsed = time.time() - started
+        with self._lock:
+            self.timings.append(elapsed)
+            del self.timings[:-HISTORY]
+        logger.info(f"Synthesized locally in {elapsed:.2f}s: {text[:40]}")
+        return True
+
+    def _render(self, text, output_file, rate):
+        """
+        Worker thread. output_file None renders and discards (warm-up).
+        """
+        speed = 1 + _percent(rate) / 100
+        if self.backend == "piper":
+            with wave.open(output_file or io.BytesIO(), "wb") as wav:
+                # Piper's length_scale is duration, the inverse of speed
+                settings = {"length_scale": 1 / speed} if speed > 0 else {}
+                if hasattr(self._voice, "synthesize_wav"):
+                    from piper import SynthesisConfig
+                    self._voice.synthesize_wav(text, wav, syn_config=SynthesisConfig(**settings))
+                else:
+                    self._voice.synthesize(text, wav, **settings)
+            return
+        command = [self._espeak, "-v", self.espeak_voice, "-s", str(int(ESPEAK_WPM * speed))]
+        command += ["-w", output_file] if output_file else ["-q"]
+        subprocess.run(command + ["--", text], check=True, capture_output=True, timeout=30)
+
+def _percent(rate):
+    """
+    "+20%" -> 20.0, as edge-tts rates are written.
+    """
+    match = re.fullmatch(r"\s*([+-]?\d+(?:\.\d+)?)\s*%\s*", rate or "")
+    return float(match.group(1)) if match else 0.0
@@ -7,16 +7,22 @@ import os
 import logging
 import time
 import signal
+import datetime
 import voice_engine
 import clap_detector
+import capture_hub
+import dsp_worker
+import level_meter
 import automator
 import features
 import ai_brain
 import webbrowser
 import subprocess
+import uuid
 import concurrent.futures
 
 from secure_io import load_secure_config
+from speech_scheduler import PRIORITY_LOW
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,6 +30,45 @@ logger = logging.getLogger(__name__)
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
 
+# The answer being generated and spoken off the listening loop
+_current_answer = None  # (ReplyStream, utterance id) of the latest answer
+
+# Spoken on every run; pre-rendered into the TTS cache while idle
+FIXED_PROMPTS = [
+    "System online. Listening.",
+    "Startup complete.",
+    "Confirm shutdown?",
+    "Shutting down.",
+    "Confirm reboot?",
+    "Rebooting system.",
+    "Entering sleep mode.",
+    "Goodbye, sir. Deactivating protocols.",
+    "Engaging conversational mode. Say 'exit' to stop.",
+    "Exiting chat mode.",
+    "Opening code",
+    "Opening firefox",
+    "Opening terminal",
+]
+
+def ignite_greeting(now=None):
+    """
+    The ignite command's first line, e.g. "Good morning. The time is 07:45 AM."
+    """
+    return f"{features.get_greeting(now)}. {automator.get_time_string(now)}."
+
+def predicted_phrases(tts_response):
+    """
+    What ZADE is likely to say next, as (text, expires_at) for the pre-renderer:
+    the ignite greeting for this minute and the next, then the fixed prompts.
+    """
+    minute = datetime.datetime.now().replace(second=0, microsecond=0)
+    phrases = []
+    for start in (minute, minute + datetime.timedelta(minutes=1)):
+        end = start + datetime.timedelta(minutes=1)
+        phrases.append((ignite_greeting(start), end.timestamp()))
+    phrases += [(text, None) for text in FIXED_PROMPTS + [tts_response]]
+    return phrases
+
 def load_config():
     try:
         config = load_secure_config(CONFIG_PATH)
@@ -44,15 +89,34 @@ def main():
     
     logger.info("Initializing Zade Ignite Protocol...")
     
-    # Calibrate Audio
-    time.sleep(2) # Wait for system audio to settle
-    voice_engine.calibrate_mic()
+    # Capture, clap onsets and the level meter run in their own process when possible
+    dsp = dsp_worker.start_worker() if config.get("dsp_worker", True) else None
+    
+    # One capture stream shared by the recognizer and the clap detector
+    hub = capture_hub.get_hub(source=dsp.source() if dsp else None)
+    hub.start()
+    voice_engine.use_capture_hub(hub)
+    if dsp is None:
+        level_meter.start_meter(hub)
+    
+    # Noise floor from the saved profile; refined in the background while we listen
+    voice_engine.restore_noise_profile(hub)
     voice_engine.start_processing()
+    # Renders the fixed prompts, the greeting and time for the next minute while we
+    # wait for input, never ahead of live speech
+    voice_engine.start_prerender(lambda: predicted_phrases(tts_response))
+    
+    # Keep the clap feed open so confirmations start detecting immediately
+    clap_sensor = clap_detector.get_detector(source=hub.subscribe("claps").as_source())
+    if dsp:
+        clap_sensor.follow(dsp)
+    else:
+        clap_sensor.start()
     
     # Initialize AI
     ai_brain.init_ai(config)
     
-    voice_engine.speak("System online. Listening.")
+    voice_engine.queue_speak("System online. Listening.")
     print("System Ready - Listening...", flush=True)
 
     while True:
@@ -62,6 +126,8 @@ def main():
         if user_text:
             logger.info(f"User said: {user_text}")
             words = user_text.split()
+            # Any of these may end in an AI query; reopen cold connections meanwhile
+            ai_brain.prewarm()
             
             # --- COMMANDS ---
             
@@ -74,9 +140,7 @@ def main():
                 automator.set_system_volume(startup_volume)
                 
                 # Immediate Response (Greeting & Time)
-                greeting = features.get_greeting()
-                time_str = automator.get_time_string()
-                voice_engine.queue_speak(f"{greeting}. {time_str}.")
+                voice_engine.queue_speak(ignite_greeting())
                 
                 # Start parallel fetching immediately
                 location = config.get("location", "Nagpur")
@@ -89,30 +153,32 @@ def main():
                     future_quote = executor.submit(features.get_quote)
                     
                     # Speak quick-available results first
-                    voice_engine.queue_speak(future_battery.result())
-                    voice_engine.queue_speak(future_sys.result())
+                    voice_engine.queue_speak(future_battery.result(), priority=PRIORITY_LOW)
+                    voice_engine.queue_speak(future_sys.result(), priority=PRIORITY_LOW)
                     # Wait for network and weather which might be slower
-                    voice_engine.queue_speak(future_net.result())
-                    voice_engine.queue_speak(future_weather.result())
-                    voice_engine.queue_speak(future_quote.result())
+                    voice_engine.queue_speak(future_net.result(), priority=PRIORITY_LOW)
+                    voice_engine.queue_speak(future_weather.result(), priority=PRIORITY_LOW)
+                    voice_engine.queue_speak(future_quote.result(), priority=PRIORITY_LOW)
 
                 # Finalize
-                voice_engine.queue_speak(tts_response)
+                voice_engine.queue_speak(tts_response, priority=PRIORITY_LOW)
                 automator.run_sequence(config)
-                voice_engine.queue_speak("Startup complete.")
+                voice_engine.queue_speak("Startup complete.", priority=PRIORITY_LOW)
             
             # 2. SHUTDOWN
             elif "shutdown" in words:
-                voice_engine.speak("Confirm shutdown?")
-                if clap_detector.detect_claps(required_claps=2):
-                    voice_engine.speak("Shutting down.")
+                supersede_answer()
+                voice_engine.speak("Confirm shutdown?", priority=voice_engine.PRIORITY_URGENT)
+                if clap_sensor.wait_for_claps(2, timeout=5):
+                    voice_engine.speak("Shutting down.", priority=voice_engine.PRIORITY_URGENT)
                     automator.system_shutdown()
                     
             # 3. REBOOT
             elif "reboot" in words or "restart" in words:
-                voice_engine.speak("Confirm reboot?")
-                if clap_detector.detect_claps(required_claps=2):
-                    voice_engine.speak("Rebooting system.")
+                supersede_answer()
+                voice_engine.speak("Confirm reboot?", priority=voice_engine.PRIORITY_URGENT)
+                if clap_sensor.wait_for_claps(2, timeout=5):
+                    voice_engine.speak("Rebooting system.", priority=voice_engine.PRIORITY_URGENT)
                     automator.system_reboot()
                     
             # 4. SLEEP
@@ -122,6 +188,7 @@ def main():
                 
             # 5. CANCEL / TERMINATE
             elif "terminate" in words or "abort" in words or (("cancel" in words or "stop" in words) and any(w in words for w in ["system", "protocol", "process", "program", "listening"])):
+                supersede_answer()
                 voice_engine.speak("Goodbye, sir. Deactivating protocols.")
                 # Just wait for speech to finish, then exit.
                 voice_engine.wait_for_completion()
@@ -135,11 +202,16 @@ def main():
                 
                 break
                 
-            # 6. SMART COMMANDS (Open / Search)
+            # 6. STOP TALKING
+            elif user_text.strip().lower() in ("stop", "quiet", "silence", "be quiet", "stop talking", "that's enough"):
+                supersede_answer()
+                voice_engine.stop_speaking()
+
+            # 7. SMART COMMANDS (Open / Search)
             elif process_smart_commands(user_text):
                 pass # Command handled by function
 
-            # 7. CONTINUOUS CHAT MODE
+            # 8. CONTINUOUS CHAT MODE
             elif "chat mode" in user_text or "lets chat" in user_text:
                 voice_engine.speak("Engaging conversational mode. Say 'exit' to stop.")
                 while True:
@@ -148,6 +220,7 @@ def main():
                         continue
                     
                     if "exit" in chat_text or "stop" in chat_text or "cancel" in chat_text:
+                        supersede_answer()
                         voice_engine.speak("Exiting chat mode.")
                         break
                     
@@ -156,27 +229,59 @@ def main():
                         continue
                         
                     # Direct conversation
-                    response = ai_brain.ask_ai(chat_text)
-                    if response:
-                        voice_engine.speak(response)
+                    answer(chat_text)
 
             # --- AI FALLBACK ---
             else:
                 # Chat with JARVIS (One-off)
                 if "zade" in words or len(words) > 1: # Avoid responding to ambient noise single words
-                    response = ai_brain.ask_ai(user_text)
-                    if response:
-                         voice_engine.speak(response)
+                    answer(user_text)
         
         time.sleep(0.1)
 
+def answer(prompt):
+    """
+    Speaks the AI's reply sentence by sentence while it is still being
+    generated. Runs in the background, so with barge-in the loop keeps
+    listening and a newer question supersedes it; without, the next
+    listen_for_input() waits for the answer to be spoken.
+    """
+    global _current_answer
+    supersede_answer()
+    reply = ai_brain.stream_ai(prompt)
+    utterance_id = uuid.uuid4().hex[:8]
+    voice_engine.speak_stream_async(reply, on_first_audio=reply.heard, utterance_id=utterance_id)
+    _current_answer = (reply, utterance_id)
+
+def supersede_answer():
+    """
+    Cancels the answer still being generated or spoken, if any.
+    """
+    global _current_answer
+    if _current_answer is None:
+        return
+    reply, utterance_id = _current_answer
+    _current_answer = None
+    # Utterance first, so speech of the reply stops before its half-finished sentence is flushed
+    voice_engine.cancel_utterance(utterance_id)
+    reply.cancel()
+
 def process_smart_commands(text):
     """
-    Processes 'Open' and 'Search' commands.
+    Processes 'Open', 'Search' and engine switch commands.
     Returns True if a command was executed, False otherwise.
     """
     text = text.lower()
     
+    # SWITCH AI ENGINE
+    for engine in ("mistral", "openai", "gemini"):
+        if text in (f"switch to {engine}", f"use {engine}"):
+            if ai_brain.set_engine(engine):
+                voice_engine.speak(f"Switched to {engine}.")
+            else:
+                voice_engine.speak(f"No key configured for {engine}.")
+            return True
+    
     # OPEN APPS
     if "open" in text:
         parts = text.split("open", 1)
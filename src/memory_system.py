@@ -1,6 +1,7 @@
 import json
 import os
 import logging
+import threading
 from secure_io import load_secure_config, save_secure_config
 
 logger = logging.getLogger(__name__)
@@ -9,6 +10,11 @@ logger = logging.getLogger(__name__)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MEMORY_PATH = os.path.join(BASE_DIR, "memory.json")
 
+# Decrypted identity line, kept until memory is written or memory.json changes on disk
+_identity = None
+_identity_stamp = None
+_identity_lock = threading.Lock()
+
 def load_memory():
     """Loads long-term memory for the AI."""
     mem = load_secure_config(MEMORY_PATH)
@@ -30,12 +36,35 @@ def update_memory(data):
         current = load_memory()
         current.update(data)
         save_secure_config(MEMORY_PATH, current)
+        invalidate_identity()
         return True
     except Exception as e:
         logger.error(f"Memory sync failure: {e}")
         return False
 
+def invalidate_identity():
+    """Drops the cached identity line; the next get_identity_context() reads memory again."""
+    global _identity
+    with _identity_lock:
+        _identity = None
+
+def _memory_stamp():
+    try:
+        st = os.stat(MEMORY_PATH)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
 def get_identity_context():
-    """Returns a string describing the current user identity."""
+    """Returns a string describing the current user identity (cached in memory)."""
+    global _identity, _identity_stamp
+    # A stat() is cheap next to decrypting the file, and catches edits made outside update_memory()
+    stamp = _memory_stamp()
+    with _identity_lock:
+        if _identity is not None and stamp == _identity_stamp:
+            return _identity
     mem = load_memory()
-    return f"You are speaking with {mem['user_name']}. Your name is {mem['zade_name']}. Your personality is {mem['preferences']['personality']}."
+    identity = f"You are speaking with {mem['user_name']}. Your name is {mem['zade_name']}. Your personality is {mem['preferences']['personality']}."
+    with _identity_lock:
+        _identity, _identity_stamp = identity, stamp
+    return identity
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+import vad
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_PATH = os.path.join(BASE_DIR, "noise_profile.json")
+# Profiles older than this are still used at boot, but refreshed right away
+MAX_AGE = 7 * 24 * 3600
+# Background refinement: how much audio per pass, and when a drifted profile is written back
+REFINE_SECONDS = 1.0
+SAVE_INTERVAL = 60.0
+SAVE_DRIFT_DB = 1.0
+# speech_recognition's energy threshold (RMS) for the non-VAD listen path
+MIN_ENERGY_THRESHOLD = 300
+
+def load_profile(device, rate, path=PROFILE_PATH):
+    """
+    Returns the saved profile for this capture device and rate, or None.
+    """
+    try:
+        with open(path, "r") as f:
+            profile = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable noise profile: {e}")
+        return None
+
+    if profile.get("device") != device or profile.get("rate") != rate:
+        logger.info(f"Noise profile is for {profile.get('device')}, not {device}; recalibrating")
+        return None
+    return profile
+
+def save_profile(profile, path=PROFILE_PATH):
+    """
+    Writes the profile atomically, so a crash never leaves half a file behind.
+    """
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(profile, f)
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.error(f"Could not save noise profile: {e}")
+
+def snapshot(detector, device):
+    """
+    Profile dict from a VoiceActivityDetector's current noise estimates.
+    """
+    rms = 10.0 ** (detector.noise_db / 20.0)
+    return {
+        "device": device,
+        "rate": detector.rate,
+        "saved_at": time.time(),
+        "noise_db": detector.noise_db,
+        "noise_spectrum": detector.noise_spectrum.tolist() if detector.noise_spectrum is not None else None,
+        "energy_threshold": max(MIN_ENERGY_THRESHOLD, 1.5 * rms),
+    }
+
+def apply_profile(detector, profile):
+    """
+    Seeds a VoiceActivityDetector from a saved profile.
+    """
+    detector.noise_db = profile["noise_db"]
+    spectrum = profile.get("noise_spectrum")
+    if spectrum is not None and len(spectrum) == detector.frame // 2 + 1:
+        detector.noise_spectrum = np.array(spectrum)
+
+def is_stale(profile):
+    return time.time() - profile.get("saved_at", 0) > MAX_AGE
+
+class ProfileRefiner:
+    """
+    Keeps the saved noise profile current while ZADE runs. Reads the capture
+    hub in the background with its own VAD, which only updates its floor on
+    non-speech frames, and writes the profile back when it has drifted. The
+    first pass on a device without a usable profile calibrates from scratch.
+    Every calibrated or refined profile is also handed to on_update (the live
+    endpointer's VAD). Audio read while is_quiet() is False (ZADE talking) is
+    skipped, so its own voice never ends up in the floor.
+    """
+
+    def __init__(self, hub, device, profile=None, on_update=None, is_quiet=None, path=PROFILE_PATH):
+        self.hub = hub
+        self.device = device
+        self.path = path
+        self.on_update = on_update
+        self.is_quiet = is_quiet or (lambda: True)
+        self.detector = vad.VoiceActivityDetector(hub.rate)
+        self.saved_db = None
+        self.fresh = profile is not None and not is_stale(profile)
+        if profile is not None:
+            apply_profile(self.detector, profile)
+            self.saved_db = profile["noise_db"]
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="noise-profile", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        subscription = self.hub.subscribe("noise-profile")
+        subscription.resume()
+        block = int(REFINE_SECONDS * self.hub.rate)
+        last_save = time.time()
+        try:
+            calibrated = self.fresh
+            while self.running:
+                quiet = self.is_quiet()
+                samples = np.array(subscription.read(block))
+                if samples.size == 0:
+                    break  # Hub stopped
+                if not (quiet and self.is_quiet()):
+                    continue  # Overlapped ZADE's own speech
+                if not calibrated:
+                    self.detector.calibrate(samples)
+                    calibrated = True
+                    self._save()
+                    last_save = time.time()
+                    continue
+                self.detector.classify(samples)
+                if (time.time() - last_save >= SAVE_INTERVAL
+                        and abs(self.detector.noise_db - self.saved_db) >= SAVE_DRIFT_DB):
+                    self._save()
+                    last_save = time.time()
+        except Exception as e:
+            logger.error(f"Noise profile refinement stopped: {e}")
+        finally:
+            subscription.pause()
+
+    def _save(self):
+        profile = snapshot(self.detector, self.device)
+        save_profile(profile, self.path)
+        self.saved_db = self.detector.noise_db
+        logger.info(f"Noise profile saved ({self.saved_db:.1f} dB floor)")
+        if self.on_update:
+            self.on_update(profile)
@@ -0,0 +1,102 @@
+import time
+import logging
+import threading
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+# How often an idle system checks for something to render (seconds)
+IDLE_POLL = 1.0
+# Stale renders are evicted this long after their phrase stops being current
+GRACE = 60.0
+# A render still running after this long is abandoned (seconds)
+RENDER_TIMEOUT = 10.0
+
+class PreRenderer:
+    """
+    Renders likely next utterances while the system waits for input, so they
+    play from the TTS cache with no synthesis delay. predict() returns
+    (text, expires_at) pairs, expires_at None for phrases that never go stale;
+    render(text) starts synthesis of the phrase (or the next part of it not
+    cached yet) and returns a future, or None once it is all cached;
+    evict(text, live) drops its renders from the cache, except those the
+    still-current phrases in live share. Only one render runs at a time,
+    for at most render_timeout seconds, and only while is_idle() says
+    nothing else is using the pipeline.
+    """
+
+    def __init__(self, predict, render, evict, is_idle, poll=IDLE_POLL, render_timeout=RENDER_TIMEOUT):
+        self.predict = predict
+        self.render = render
+        self.evict = evict
+        self.is_idle = is_idle
+        self.poll = poll
+        self.render_timeout = render_timeout
+        self.rendered = 0
+        self.evicted = 0
+        self.failures = 0
+        self._expiry = {}  # text -> expires_at for phrases this renderer put in the cache
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="presynth", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def stats(self):
+        return {"tracked": len(self._expiry), "rendered": self.rendered,
+                "evicted": self.evicted, "failures": self.failures}
+
+    def _loop(self):
+        while self._running:
+            time.sleep(self.poll)
+            try:
+                phrases = self._current(self.predict())
+                self._evict_stale(phrases)
+                if self.is_idle():
+                    self._render_next(phrases)
+            except Exception as e:
+                logger.error(f"Pre-synthesis error: {e}")
+
+    def _current(self, phrases):
+        now = time.time()
+        return [(text, expires) for text, expires in phrases if expires is None or expires > now]
+
+    def _evict_stale(self, phrases):
+        now = time.time()
+        live = [text for text, _ in phrases]
+        for text, expires in list(self._expiry.items()):
+            if expires is not None and now > expires + GRACE and text not in live:
+                del self._expiry[text]
+                if self.evict(text, live):
+                    self.evicted += 1
+
+    def _render_next(self, phrases):
+        """
+        Starts on the first predicted phrase that is not cached yet, if any, and
+        waits for it. One render per idle check, so speech never queues behind a batch.
+        """
+        for text, expires in phrases:
+            self._expiry[text] = expires
+            future = self.render(text)
+            if future is None:
+                continue  # Already cached
+            try:
+                ok = future.result(timeout=self.render_timeout)
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                logger.warning(f"Pre-rendering timed out: {text}")
+                ok = False
+            if ok:
+                self.rendered += 1
+                logger.info(f"Pre-rendered: {text}")
+            else:
+                self.failures += 1
+            return
@@ -0,0 +1,136 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from secure_io import load_secure_config, save_secure_config
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(BASE_DIR, "response_cache.json")
+DEFAULT_TTL = 6 * 3600
+DEFAULT_MAX_ENTRIES = 256
+
+# Dropped before matching, so "Hey ZADE, who are you?" and "who are you" share an answer.
+# Only words that never change a question's meaning ("like" and "so" can)
+FILLER_WORDS = {
+    "um", "uh", "er", "erm", "ah", "hmm", "hey", "hi", "hello", "please", "zade", "jarvis",
+}
+# Answers to these depend on the situational data ask_ai puts in the prompt
+# (system stats, battery) or on the moment, so they are never cached
+VOLATILE_WORDS = {
+    "time", "date", "day", "today", "tonight", "tomorrow", "yesterday", "now", "current",
+    "currently", "latest", "news", "weather", "temperature", "battery", "charge", "charging",
+    "cpu", "ram", "memory", "disk", "storage", "network", "wifi", "internet", "uptime",
+    "status", "stats", "load", "usage", "running",
+}
+
+def normalize(prompt):
+    """
+    Lowercase, punctuation and filler words stripped: "Um, who ARE you?" -> "who are you".
+    """
+    words = re.sub(r"[^\w\s]", " ", prompt.lower()).split()
+    return " ".join(w for w in words if w not in FILLER_WORDS)
+
+def is_cacheable(prompt):
+    """
+    Policy: prompts asking about anything volatile are answered fresh every time.
+    """
+    words = normalize(prompt).split()
+    return bool(words) and not any(w in VOLATILE_WORDS or w.isdigit() for w in words)
+
+class ResponseCache:
+    """
+    LLM answers keyed by engine, model, normalized prompt and the identity
+    context they were generated with, each valid for ttl seconds. The
+    in-memory index is bounded in least-recently-used order; with a path,
+    entries are also kept on disk, encrypted like the config and memory
+    files, and reloaded at startup. Tracks hit rate and the LLM time hits saved.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.excluded = 0     # prompts the volatility policy kept out
+        self.saved_seconds = 0.0
+        self._entries = OrderedDict()  # key -> (answer, expires_at, seconds it took to generate)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if path:
+            self._load()
+
+    @staticmethod
+    def key(engine, model, prompt, context=""):
+        return hashlib.sha256(json.dumps([engine, model, normalize(prompt), context]).encode("utf-8")).hexdigest()
+
+    def get(self, *keys):
+        """
+        The answer cached under the first of keys that has one (marked most
+        recently used), or None. Counts one hit or miss.
+        """
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] <= time.time():
+                    del self._entries[key]
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_seconds += entry[2]
+                    return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, answer, cost):
+        """
+        Stores an answer that took cost seconds to generate.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (answer, time.time() + self.ttl, cost)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.path:
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            self._save()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "excluded": self.excluded, "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "saved_seconds": self.saved_seconds}
+
+    def _load(self):
+        data = load_secure_config(self.path) or {}
+        now = time.time()
+        for key, answer, expires, cost in data.get("entries", []):
+            if expires > now:
+                self._entries[key] = (answer, expires, cost)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info(f"Response cache: {len(self._entries)} answers")
+
+    def _save(self):
+        with self._lock:
+            entries = [[key, *entry] for key, entry in self._entries.items()]
+        tmp = f"{self.path}.tmp"
+        try:
+            with self._save_lock:
+                save_secure_config(tmp, {"entries": entries})
+                os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"Could not save response cache: {e}")
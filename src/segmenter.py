@@ -0,0 +1,110 @@
+import re
+
+# Longest piece sent to TTS in one go; longer sentences are split at clause boundaries
+MAX_SEGMENT_CHARS = 160
+
+# Words that end in a period without ending the sentence (compared lowercased, without the dot)
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc", "approx",
+    "no", "fig", "inc", "ltd", "co", "dept", "est", "min", "max", "avg",
+    "e.g", "i.e", "a.m", "p.m", "u.s", "u.k", "jan", "feb", "mar", "apr", "jun",
+    "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+
+# Sentence punctuation (plus closing quotes/brackets) followed by whitespace
+_BOUNDARY = re.compile(r"[.!?…]+[\"')\]”’]*(?=\s)")
+# Clause breaks for over-long sentences, strongest first. "1,000" has no space after the comma.
+_CLAUSE_BREAKS = [re.compile(r"[;:]\s"), re.compile(r"\s[–—-]\s"), re.compile(r",\s")]
+
+def split_sentences(text, max_chars=MAX_SEGMENT_CHARS):
+    """
+    Splits text into speakable segments: sentences, with over-long ones broken
+    at clause boundaries. Periods in abbreviations ("Dr.", "e.g."), initials
+    and numbers ("3.5", "v2.0") do not end a sentence.
+    """
+    segments = []
+    for block in re.split(r"\n\s*\n|\n(?=\s*[-*•\d]+[.)]?\s)", text or ""):
+        block = " ".join(block.split())
+        for sentence in _sentences(block):
+            segments.extend(_clauses(sentence, max_chars))
+    return segments
+
+def _sentences(text):
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        end = match.end()
+        if match.group().startswith(".") and len(match.group().rstrip("\"')]”’")) == 1:
+            if text[start:match.start()].strip().isdigit() or not _ends_sentence(text, match.start(), end):
+                continue  # A list number ("2. Second item"), abbreviation or initial
+        sentence = text[start:end].strip()
+        if sentence:
+            yield sentence
+        start = end
+    tail = text[start:].strip()
+    if tail:
+        yield tail
+
+def _ends_sentence(text, dot, after):
+    """
+    Whether the single period at text[dot] ends a sentence.
+    """
+    word = text[:dot].rsplit(" ", 1)[-1].lstrip("\"'([“‘")
+    if word.lower() in ABBREVIATIONS:
+        return False
+    if len(word) == 1 and word.isalpha():
+        return False  # An initial: "J. R. R. Tolkien"
+    following = text[after:].lstrip()[:1]
+    # "approx. five" - a lowercase continuation means the period was not the end
+    return not following.islower()
+
+def _clauses(sentence, max_chars):
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = None
+        for pattern in _CLAUSE_BREAKS:
+            breaks = [m.end() for m in pattern.finditer(sentence, 0, max_chars + 1)]
+            breaks = [b for b in breaks if b >= max_chars // 4]
+            if breaks:
+                cut = breaks[-1]
+                break
+        if cut is None:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                break
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+class SentenceBuffer:
+    """
+    Collects streamed text (LLM tokens) and hands out segments as soon as they
+    are complete. The last segment is held back until more text shows where it
+    ends: its period may still turn out to be an abbreviation, or a long
+    sentence may still reach a clause break.
+    """
+
+    def __init__(self, max_chars=MAX_SEGMENT_CHARS):
+        self.max_chars = max_chars
+        self._text = ""
+
+    def feed(self, piece):
+        """
+        Adds text; returns the segments it completed.
+        """
+        self._text += piece
+        segments = split_sentences(self._text, self.max_chars)
+        if len(segments) < 2:
+            return []
+        # Keep the unfinished segment, and the whitespace after it (a newline may start a list item)
+        self._text = segments[-1] + self._text[len(self._text.rstrip()):]
+        return segments[:-1]
+
+    def flush(self):
+        """
+        Returns whatever is left once the stream has ended.
+        """
+        segments = split_sentences(self._text, self.max_chars)
+        self._text = ""
+        return segments
@@ -0,0 +1,187 @@
+import re
+import time
+import heapq
+import queue
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+PRIORITY_URGENT = 0    # confirmations and warnings ("Confirm shutdown?")
+PRIORITY_NORMAL = 1    # answers and acknowledgements
+PRIORITY_LOW = 2       # briefings and other filler that can wait
+PRIORITY_NAMES = {PRIORITY_URGENT: "urgent", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+# Adjacent fragments of one utterance shorter than this are merged into one request...
+MIN_FRAGMENT_CHARS = 40
+# ...as long as the merged text stays under this
+COALESCE_CHARS = 120
+HISTORY = 200
+# Utterances whose last segment is remembered for the duplicate check
+TRACKED_UTTERANCES = 64
+
+_SPEAKABLE = re.compile(r"\w")
+
+class SpeechScheduler:
+    """
+    Drop-in replacement for the FIFO generation queue. Segments (dicts with
+    "text", "utterance" and "priority") come out most urgent first, FIFO within
+    a priority. Empty segments, and a segment repeating the one its utterance
+    queued just before, are dropped on put(); tiny adjacent fragments of the
+    same utterance are merged into one synthesis request on get(). Keeps queue.Queue's task_done()/join()
+    accounting, so callers can still wait for everything queued to be spoken.
+    """
+
+    def __init__(self):
+        self.unfinished_tasks = 0
+        self.dropped_empty = 0
+        self.dropped_duplicate = 0
+        self.coalesced = 0
+        self.waits = {p: deque(maxlen=HISTORY) for p in PRIORITY_NAMES}
+        self._last = {}  # utterance -> normalized text of its last segment
+        self._heap = []
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+
+    @property
+    def queue(self):
+        """
+        Snapshot of waiting segments in the order they will come out.
+        """
+        with self._lock:
+            return [entry[2] for entry in sorted(self._heap)]
+
+    def put(self, segment):
+        """
+        Queues a segment; returns False if it was dropped. None is a sentinel that
+        comes out after everything else.
+        """
+        with self._lock:
+            if segment is None:
+                priority = max(PRIORITY_NAMES) + 1
+            else:
+                text = segment["text"]
+                if not text or not _SPEAKABLE.search(text):
+                    self.dropped_empty += 1
+                    return False
+                normalized = _normalize(text)
+                utterance = segment.get("utterance")
+                if self._last.get(utterance) == normalized:
+                    self.dropped_duplicate += 1
+                    logger.info(f"Dropped duplicate speech: {text}")
+                    return False
+                self._last.pop(utterance, None)
+                self._last[utterance] = normalized
+                if len(self._last) > TRACKED_UTTERANCES:
+                    del self._last[next(iter(self._last))]
+                priority = segment.setdefault("priority", PRIORITY_NORMAL)
+                segment.setdefault("queued_at", time.time())
+            self._seq += 1
+            heapq.heappush(self._heap, (priority, self._seq, segment))
+            self.unfinished_tasks += 1
+            self._not_empty.notify()
+        return True
+
+    def get(self, timeout=None):
+        """
+        Returns the most urgent segment, with following tiny fragments of the
+        same utterance merged into it. Raises queue.Empty on timeout.
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._heap, timeout):
+                raise queue.Empty
+            priority, _, segment = heapq.heappop(self._heap)
+            if segment is None:
+                return None
+            segment = self._coalesce(segment)
+            now = time.time()
+            self.waits[priority].append(now - segment["queued_at"])
+            return segment
+
+    def get_nowait(self):
+        with self._lock:
+            if not self._heap:
+                raise queue.Empty
+        return self.get(timeout=0)
+
+    def _coalesce(self, segment):
+        """
+        Lock held.
+        """
+        text = segment["text"]
+        while len(text) < MIN_FRAGMENT_CHARS and self._heap:
+            priority, _, following = self._heap[0]
+            if (following is None or priority != segment["priority"]
+                    or following["utterance"] != segment["utterance"]
+                    or len(text) + 1 + len(following["text"]) > COALESCE_CHARS):
+                break
+            heapq.heappop(self._heap)
+            text = f"{text} {following['text']}"
+            self.coalesced += 1
+            self._done_locked()  # the merged segment is settled with the one it joined
+        if text != segment["text"]:
+            segment = dict(segment, text=text)
+        return segment
+
+    def cancel(self, utterance_id=None):
+        """
+        Removes waiting segments of one utterance (or all of them). Returns how many.
+        """
+        with self._lock:
+            keep = [e for e in self._heap
+                    if e[2] is None or (utterance_id is not None and e[2]["utterance"] != utterance_id)]
+            removed = len(self._heap) - len(keep)
+            self._heap = keep
+            heapq.heapify(self._heap)
+            for _ in range(removed):
+                self._done_locked()
+        return removed
+
+    def task_done(self):
+        with self._lock:
+            self._done_locked()
+
+    def _done_locked(self):
+        if self.unfinished_tasks <= 0:
+            raise ValueError("task_done() called too many times")
+        self.unfinished_tasks -= 1
+        if self.unfinished_tasks == 0:
+            self._all_done.notify_all()
+
+    def join(self):
+        with self._all_done:
+            self._all_done.wait_for(lambda: self.unfinished_tasks == 0)
+
+    def stats(self):
+        """
+        Queue wait per priority class (p50 / p90, ms) and drop / merge counters.
+        """
+        with self._lock:
+            stats = {"waiting": len(self._heap), "dropped_empty": self.dropped_empty,
+                     "dropped_duplicate": self.dropped_duplicate, "coalesced": self.coalesced}
+            for priority, name in PRIORITY_NAMES.items():
+                waits = sorted(self.waits[priority])
+                if waits:
+                    stats[f"wait_{name}_p50_ms"] = 1000 * waits[len(waits) // 2]
+                    stats[f"wait_{name}_p90_ms"] = 1000 * waits[min(len(waits) - 1, int(0.9 * len(waits)))]
+        return stats
+
+def merge_fragments(texts):
+    """
+    The synthesis requests a run of one utterance's segments becomes when they
+    are all waiting at once, merged the way get() merges them.
+    """
+    merged = []
+    for text in texts:
+        if merged and len(merged[-1]) < MIN_FRAGMENT_CHARS and len(merged[-1]) + 1 + len(text) <= COALESCE_CHARS:
+            merged[-1] = f"{merged[-1]} {text}"
+        else:
+            merged.append(text)
+    return merged
+
+def _normalize(text):
+    return " ".join(text.lower().split())
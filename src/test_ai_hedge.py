@@ -0,0 +1,96 @@
+import time
+import unittest
+
+import ai_hedge
+from ai_hedge import HedgedStream, LatencyTracker
+
+def engine(delay, pieces=("a", "b"), error=None, closed=None, name=None):
+    def tokens():
+        try:
+            time.sleep(delay)
+            if error:
+                raise error
+            yield from pieces
+        finally:
+            if closed is not None:
+                closed.append(name)
+    return tokens
+
+def stream(engines, tracker=None, budget=2.0):
+    return HedgedStream(list(engines), lambda name: engines[name](), tracker or LatencyTracker(), budget=budget)
+
+class LatencyTrackerTest(unittest.TestCase):
+
+    def test_default_deadline_until_enough_samples(self):
+        tracker = LatencyTracker()
+        self.assertEqual(tracker.deadline("mistral", budget=10), ai_hedge.DEFAULT_DELAY)
+        for _ in range(ai_hedge.MIN_SAMPLES):
+            tracker.record("mistral", 0.8)
+        self.assertAlmostEqual(tracker.deadline("mistral", budget=10), 0.8)
+
+    def test_deadline_is_clamped(self):
+        tracker = LatencyTracker()
+        for _ in range(ai_hedge.MIN_SAMPLES):
+            tracker.record("fast", 0.01)
+            tracker.record("slow", 9.0)
+        self.assertEqual(tracker.deadline("fast", budget=10), ai_hedge.MIN_DELAY)
+        self.assertEqual(tracker.deadline("slow", budget=10), 5.0)
+
+    def test_percentile(self):
+        tracker = LatencyTracker()
+        for t in range(1, 11):
+            tracker.record("e", t / 10)
+        self.assertEqual(tracker.percentile("e", 90), 1.0)
+        self.assertEqual(tracker.percentile("e", 50), 0.6)
+
+class HedgedStreamTest(unittest.TestCase):
+
+    def test_fast_primary_never_hedges(self):
+        hedged = stream({"p": engine(0.01), "h": engine(0.01, ("x",))})
+        self.assertEqual("".join(hedged), "ab")
+        self.assertEqual(hedged.winner, "p")
+        self.assertFalse(hedged.hedged)
+
+    def test_slow_primary_loses_to_hedge_and_is_closed(self):
+        closed = []
+        tracker = LatencyTracker()
+        for _ in range(ai_hedge.MIN_SAMPLES):
+            tracker.record("p", 0.01)  # Usually fast: hedge after MIN_DELAY
+        hedged = stream({"p": engine(1.0, closed=closed, name="p"), "h": engine(0.01, ("x",))}, tracker)
+        started = time.time()
+        self.assertEqual("".join(hedged), "x")
+        self.assertLess(time.time() - started, 0.9)
+        self.assertEqual((hedged.winner, hedged.hedged), ("h", True))
+        time.sleep(1.2)
+        self.assertEqual(closed, ["p"])
+        stats = tracker.stats()
+        self.assertEqual((stats["p"]["hedged"], stats["h"]["won"]), (1, 1))
+        self.assertIn("ttft_p50_ms", stats["p"])  # The loser's latency still counts
+
+    def test_failed_primary_fails_over_at_once(self):
+        hedged = stream({"p": engine(0.01, error=RuntimeError("503")), "h": engine(0.01, ("x",))})
+        started = time.time()
+        self.assertEqual("".join(hedged), "x")
+        self.assertLess(time.time() - started, ai_hedge.MIN_DELAY)
+
+    def test_all_failing_raises(self):
+        hedged = stream({"p": engine(0.01, error=RuntimeError("p down")),
+                         "h": engine(0.01, error=RuntimeError("h down"))})
+        with self.assertRaises(RuntimeError):
+            "".join(hedged)
+
+    def test_empty_reply_is_a_failure(self):
+        with self.assertRaises(RuntimeError):
+            "".join(stream({"p": engine(0.01, pieces=())}))
+
+    def test_budget(self):
+        with self.assertRaises(TimeoutError):
+            "".join(stream({"p": engine(1.0)}, budget=0.2))
+
+    def test_cancel_ends_iteration(self):
+        hedged = stream({"p": engine(1.0)})
+        hedged.cancel()
+        self.assertEqual(list(hedged), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from onset_detector import OnsetDetector, WINDOW
+
+RATE = 44100
+CHUNK = 1024
+
+def noise(n, level=200, seed=0):
+    return (np.random.default_rng(seed).standard_normal(n) * level).astype(np.int16)
+
+def clap(n=400, level=20000, seed=1):
+    """
+    A broadband burst decaying over a few milliseconds.
+    """
+    burst = np.random.default_rng(seed).standard_normal(n) * level * np.exp(-np.arange(n) / 80)
+    return np.clip(burst, -32768, 32767).astype(np.int16)
+
+def run(detector, signal, chunk=CHUNK):
+    onsets = []
+    for i in range(0, signal.size - chunk + 1, chunk):
+        onsets += detector.process(signal[i:i + chunk], (i + chunk) / RATE)
+    return onsets
+
+class OnsetDetectorTest(unittest.TestCase):
+
+    def test_quiet_room_has_no_onsets(self):
+        self.assertEqual(run(OnsetDetector(RATE), noise(RATE)), [])
+
+    def test_finds_clap_with_window_resolution(self):
+        signal = noise(RATE)
+        at = 20000
+        signal[at:at + 400] = clap()
+        onsets = run(OnsetDetector(RATE), signal)
+        self.assertEqual(len(onsets), 1)
+        self.assertAlmostEqual(onsets[0][0], at / RATE, delta=2 * WINDOW / RATE)
+        self.assertGreater(onsets[0][1], 2500)
+
+    def test_two_claps_outside_refractory(self):
+        signal = noise(RATE)
+        for at in (5000, 5000 + int(0.3 * RATE)):
+            signal[at:at + 400] = clap(seed=at)
+        self.assertEqual(len(run(OnsetDetector(RATE), signal)), 2)
+
+    def test_refractory_merges_echo(self):
+        signal = noise(RATE)
+        for at in (5000, 5000 + int(0.05 * RATE)):
+            signal[at:at + 400] = clap(seed=at)
+        self.assertEqual(len(run(OnsetDetector(RATE), signal)), 1)
+
+    def test_chunk_size_does_not_matter(self):
+        signal = noise(RATE)
+        signal[20000:20400] = clap()
+        whole = run(OnsetDetector(RATE), signal, chunk=CHUNK)
+        odd = run(OnsetDetector(RATE), signal, chunk=1000)  # Not a multiple of the window
+        self.assertEqual(len(odd), 1)
+        self.assertAlmostEqual(odd[0][0], whole[0][0], delta=1.5 * WINDOW / RATE)
+
+    def test_steady_tone_triggers_at_most_once(self):
+        t = np.arange(RATE) / RATE
+        tone = (np.sin(2 * np.pi * 440 * t) * 20000).astype(np.int16)
+        signal = np.concatenate((noise(RATE // 2), tone))
+        self.assertLessEqual(len(run(OnsetDetector(RATE), signal)), 1)
+
+if __name__ == "__main__":
+    unittest.main()
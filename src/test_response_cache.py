@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import response_cache
+from response_cache import ResponseCache, normalize, is_cacheable
+
+class NormalizeTest(unittest.TestCase):
+
+    def test_strips_case_punctuation_and_fillers(self):
+        self.assertEqual(normalize("Um, hey ZADE... who ARE you?"), "who are you")
+
+    def test_keeps_words_that_carry_meaning(self):
+        self.assertEqual(normalize("What do you like?"), "what do you like")
+        self.assertEqual(normalize("So, is it well built?"), "so is it well built")
+
+    def test_volatile_questions_are_not_cacheable(self):
+        self.assertTrue(is_cacheable("Who are you?"))
+        for prompt in ("What time is it?", "How is my battery", "Tell me the news", "What is 12 times 7"):
+            self.assertFalse(is_cacheable(prompt), prompt)
+        self.assertFalse(is_cacheable("um, uh"))
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_key_covers_engine_model_and_context(self):
+        key = ResponseCache.key("mistral", "m", "Who are you?", "ctx")
+        self.assertEqual(key, ResponseCache.key("mistral", "m", "um who are you", "ctx"))
+        self.assertNotEqual(key, ResponseCache.key("openai", "m", "who are you", "ctx"))
+        self.assertNotEqual(key, ResponseCache.key("mistral", "m", "who are you", "other"))
+
+    def test_hit_miss_and_saved_time(self):
+        cache = ResponseCache()
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "answer", 1.5)
+        self.assertEqual(cache.get("missing", "k"), "answer")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["saved_seconds"], 1.5)
+
+    def test_entries_expire_after_ttl(self):
+        cache = ResponseCache(ttl=10)
+        with mock.patch.object(response_cache.time, "time", return_value=1000.0):
+            cache.put("k", "answer", 1.0)
+        with mock.patch.object(response_cache.time, "time", return_value=1009.0):
+            self.assertEqual(cache.get("k"), "answer")
+        with mock.patch.object(response_cache.time, "time", return_value=1011.0):
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", "1", 0)
+        cache.put("b", "2", 0)
+        cache.get("a")
+        cache.put("c", "3", 0)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+
+    def test_survives_restart_on_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.json")
+            ResponseCache(path=path).put("k", "answer", 1.0)
+            self.assertEqual(ResponseCache(path=path).get("k"), "answer")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from segmenter import split_sentences, SentenceBuffer
+
+class SplitSentencesTest(unittest.TestCase):
+
+    def test_splits_at_sentence_punctuation(self):
+        self.assertEqual(split_sentences("Hello there. How are you? Great!"),
+                         ["Hello there.", "How are you?", "Great!"])
+
+    def test_abbreviations_initials_and_numbers_do_not_split(self):
+        text = "Dr. Smith met J. R. R. Tolkien at 3.5 p.m. on Monday. It went well."
+        self.assertEqual(split_sentences(text),
+                         ["Dr. Smith met J. R. R. Tolkien at 3.5 p.m. on Monday.", "It went well."])
+
+    def test_lowercase_continuation_is_not_a_boundary(self):
+        self.assertEqual(split_sentences("It costs approx. five dollars. Cheap."),
+                         ["It costs approx. five dollars.", "Cheap."])
+
+    def test_list_items_are_segments(self):
+        text = "Steps:\n1. Open the box.\n2. Plug it in."
+        self.assertEqual(split_sentences(text), ["Steps:", "1. Open the box.", "2. Plug it in."])
+
+    def test_long_sentence_breaks_at_clause(self):
+        first = "This opening clause is long enough to be worth splitting off by itself"
+        text = f"{first}; and the rest of the sentence keeps going for quite a while longer."
+        segments = split_sentences(text, max_chars=80)
+        self.assertEqual(segments[0], f"{first};")
+        self.assertTrue(all(len(s) <= 80 for s in segments))
+
+    def test_thousands_separator_is_not_a_clause_break(self):
+        text = "The total came to 1,000 units and then " + "more " * 20
+        self.assertNotIn("1,", [s[-2:] for s in split_sentences(text, max_chars=60)])
+
+    def test_empty(self):
+        self.assertEqual(split_sentences(""), [])
+        self.assertEqual(split_sentences(None), [])
+
+class SentenceBufferTest(unittest.TestCase):
+
+    def test_hands_out_sentences_as_they_complete(self):
+        buffer = SentenceBuffer()
+        out = []
+        for piece in ["Hel", "lo there", ". How", " are you", "? Fine"]:
+            out.append(buffer.feed(piece))
+        self.assertEqual(out, [[], [], ["Hello there."], [], ["How are you?"]])
+        self.assertEqual(buffer.flush(), ["Fine"])
+        self.assertEqual(buffer.flush(), [])
+
+    def test_holds_back_a_period_that_may_be_an_abbreviation(self):
+        buffer = SentenceBuffer()
+        self.assertEqual(buffer.feed("Ask Dr. "), [])
+        self.assertEqual(buffer.feed("Smith today. Then"), ["Ask Dr. Smith today."])
+
+    def test_matches_split_of_the_whole_text(self):
+        text = "First point. Second, with a clause: here. 1,000 items ship on Jan. 5. Done"
+        buffer = SentenceBuffer(max_chars=30)
+        streamed = []
+        for i in range(0, len(text), 3):
+            streamed += buffer.feed(text[i:i + 3])
+        streamed += buffer.flush()
+        self.assertEqual(streamed, split_sentences(text, max_chars=30))
+
+if __name__ == "__main__":
+    unittest.main()
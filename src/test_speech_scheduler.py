@@ -0,0 +1,99 @@
+import queue
+import unittest
+
+from speech_scheduler import (SpeechScheduler, merge_fragments, PRIORITY_URGENT, PRIORITY_NORMAL,
+                              PRIORITY_LOW, MIN_FRAGMENT_CHARS)
+
+LONG = "This sentence is comfortably longer than the fragment limit."
+
+def segment(text, utterance="a", priority=PRIORITY_NORMAL):
+    return {"text": text, "utterance": utterance, "priority": priority}
+
+class SpeechSchedulerTest(unittest.TestCase):
+
+    def test_most_urgent_first_fifo_within_priority(self):
+        scheduler = SpeechScheduler()
+        scheduler.put(segment(f"Low. {LONG}", "l", PRIORITY_LOW))
+        scheduler.put(segment(f"First. {LONG}", "n1"))
+        scheduler.put(segment(f"Second. {LONG}", "n2"))
+        scheduler.put(segment(f"Urgent. {LONG}", "u", PRIORITY_URGENT))
+        order = [scheduler.get_nowait()["utterance"] for _ in range(4)]
+        self.assertEqual(order, ["u", "n1", "n2", "l"])
+
+    def test_drops_empty_segments(self):
+        scheduler = SpeechScheduler()
+        self.assertFalse(scheduler.put(segment("")))
+        self.assertFalse(scheduler.put(segment(" ... ")))
+        self.assertEqual(scheduler.dropped_empty, 2)
+        self.assertEqual(scheduler.unfinished_tasks, 0)
+
+    def test_drops_only_adjacent_repeat_in_same_utterance(self):
+        scheduler = SpeechScheduler()
+        self.assertTrue(scheduler.put(segment("Yes.", "a")))
+        self.assertFalse(scheduler.put(segment("yes. ", "a")))
+        self.assertTrue(scheduler.put(segment("Yes.", "b")))
+        self.assertTrue(scheduler.put(segment("No.", "a")))
+        self.assertTrue(scheduler.put(segment("Yes.", "a")))
+        self.assertEqual(scheduler.dropped_duplicate, 1)
+
+    def test_repeat_after_hand_out_is_kept(self):
+        scheduler = SpeechScheduler()
+        scheduler.put(segment("Opening firefox", "a"))
+        scheduler.get_nowait()
+        scheduler.task_done()
+        self.assertTrue(scheduler.put(segment("Opening firefox", "b")))
+
+    def test_coalesces_tiny_fragments_of_one_utterance(self):
+        scheduler = SpeechScheduler()
+        for text in ("Sure.", "Done.", "Anything else?"):
+            scheduler.put(segment(text, "a"))
+        scheduler.put(segment("Hi.", "b"))
+        merged = scheduler.get_nowait()
+        self.assertEqual(merged["text"], "Sure. Done. Anything else?")
+        self.assertEqual(scheduler.coalesced, 2)
+        self.assertEqual(scheduler.get_nowait()["text"], "Hi.")
+        # Merged fragments are settled with the segment they joined
+        self.assertEqual(scheduler.unfinished_tasks, 2)
+
+    def test_does_not_coalesce_across_priorities(self):
+        scheduler = SpeechScheduler()
+        scheduler.put(segment("Sure.", "a"))
+        scheduler.put(segment("Later.", "a", PRIORITY_LOW))
+        self.assertEqual(scheduler.get_nowait()["text"], "Sure.")
+
+    def test_cancel_one_utterance(self):
+        scheduler = SpeechScheduler()
+        scheduler.put(segment(LONG, "a"))
+        scheduler.put(segment(f"Other. {LONG}", "b"))
+        scheduler.put(None)
+        self.assertEqual(scheduler.cancel("a"), 1)
+        self.assertEqual(scheduler.get_nowait()["utterance"], "b")
+        self.assertIsNone(scheduler.get_nowait())
+        self.assertEqual(scheduler.cancel(), 0)
+
+    def test_join_accounting(self):
+        scheduler = SpeechScheduler()
+        scheduler.put(segment(LONG))
+        scheduler.get_nowait()
+        scheduler.task_done()
+        scheduler.join()  # Returns at once: nothing unfinished
+        with self.assertRaises(ValueError):
+            scheduler.task_done()
+
+    def test_get_times_out_when_empty(self):
+        with self.assertRaises(queue.Empty):
+            SpeechScheduler().get(timeout=0.01)
+
+    def test_merge_fragments_matches_get(self):
+        texts = ["Sure.", "Done.", LONG, "Ok."]
+        scheduler = SpeechScheduler()
+        for text in texts:
+            scheduler.put(segment(text))
+        handed_out = []
+        while scheduler.queue:
+            handed_out.append(scheduler.get_nowait()["text"])
+        self.assertEqual(merge_fragments(texts), handed_out)
+        self.assertLess(len("Sure."), MIN_FRAGMENT_CHARS)
+
+if __name__ == "__main__":
+    unittest.main()
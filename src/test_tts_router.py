@@ -0,0 +1,34 @@
+import unittest
+from unittest import mock
+
+import tts_router
+from tts_router import TTSRouter, EDGE, LOCAL
+
+class TTSRouterTest(unittest.TestCase):
+
+    def test_recovers_on_first_good_probe_after_outage(self):
+        router = TTSRouter()
+        for _ in range(router._results.maxlen):
+            router.record(None, False)
+        self.assertFalse(router.healthy())
+
+        with mock.patch.object(tts_router.time, "time", return_value=1000.0):
+            self.assertEqual(router.choose(), EDGE)  # The probe
+            self.assertEqual(router.choose(), LOCAL)
+        router.record(0.4, True)
+
+        self.assertTrue(router.healthy())
+        self.assertEqual(router.choose(), EDGE)
+
+    def test_slow_probe_keeps_local(self):
+        router = TTSRouter()
+        for _ in range(router._results.maxlen):
+            router.record(None, False)
+        router.record(router.deadline + 1.0, True)
+        self.assertFalse(router.healthy())
+
+    def test_critical_always_local(self):
+        self.assertEqual(TTSRouter().choose(critical=True), LOCAL)
+
+if __name__ == "__main__":
+    unittest.main()
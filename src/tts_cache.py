@@ -0,0 +1,131 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "tts_cache")
+DEFAULT_MAX_MB = 50
+
+class TTSCache:
+    """
+    Synthesized speech on disk, keyed by a hash of (text, voice, rate, pitch).
+    The index lives in memory in least-recently-used order and is rebuilt from
+    file modification times at startup; hits touch the file so the order
+    survives restarts. Files are synthesized to a temporary name and renamed
+    into place, so a crash never leaves a truncated entry behind.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._index = OrderedDict()  # key -> size, oldest first
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key(text, voice, rate, pitch):
+        return hashlib.sha256(json.dumps([text, voice, rate, pitch]).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            full = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                os.remove(full)  # Interrupted write from an earlier run
+            elif name.endswith(".mp3"):
+                st = os.stat(full)
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self.total_bytes += size
+        self._evict()
+        logger.info(f"TTS cache: {len(self._index)} phrases, {self.total_bytes / 1e6:.1f} MB")
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._index
+
+    def get(self, key):
+        """
+        Path of the cached audio (marked most recently used), or None. Counts a hit or miss.
+        """
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed behind our back
+            with self._lock:
+                self.total_bytes -= self._index.pop(key, 0)
+            return None
+        return path
+
+    def temp_path(self, key):
+        """
+        Where to synthesize a new entry before commit() moves it into place.
+        """
+        return os.path.join(self.directory, f"{key}.{uuid.uuid4().hex}.tmp")
+
+    def commit(self, key, temp_path):
+        """
+        Atomically publishes a finished temp file under key. Returns the final path.
+        """
+        path = self.path(key)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self.total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self._evict()
+        return path
+
+    def discard(self, key):
+        """
+        Removes an entry (e.g. a render that went stale). Returns whether there was one.
+        """
+        with self._lock:
+            if key not in self._index:
+                return False
+            self.total_bytes -= self._index.pop(key)
+            self.evictions += 1
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._index), "bytes": self.total_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,211 @@
+import time
+import queue
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import edge_tts
+
+logger = logging.getLogger(__name__)
+
+# Sentences synthesized at once; edge-tts is network bound, so a few in flight hide the round trips
+DEFAULT_CONCURRENCY = 3
+# Recent jobs kept for stats()
+HISTORY = 200
+
+class SynthesisEngine:
+    """
+    Runs edge-tts jobs on one long-lived event loop in a background thread.
+    submit() is callable from any thread and returns a concurrent.futures.Future;
+    up to `concurrency` jobs synthesize at the same time, the rest wait their
+    turn on a semaphore. Callers that need playback order keep their futures in
+    order and wait on them one by one.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY):
+        self.concurrency = max(1, int(concurrency))
+        self.loop = None
+        self.pending = 0           # submitted but not finished (queue depth)
+        self.max_pending = 0
+        self.timings = []          # (synthesis seconds, queue wait seconds)
+        self.failures = 0
+        self.monitor = None        # record(latency, ok) per finished stream, e.g. a TTSRouter
+        self._semaphore = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run_loop, name="tts-loop", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._ready.set()
+        self.loop.run_forever()
+
+    def run(self, coro):
+        """
+        Schedules any coroutine on the engine's loop; returns a concurrent.futures.Future.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def submit(self, text, output_file, voice, rate, pitch):
+        """
+        Queues one sentence for synthesis to output_file. The future resolves to
+        True on success and False on failure; cancel() abandons the job.
+        """
+        return self._submit(text, lambda: _synthesize(text, output_file, voice, rate, pitch))
+
+    def submit_stream(self, text, voice, rate, pitch):
+        """
+        Queues one sentence for streaming synthesis. Returns a SpeechStream whose
+        chunks() yield MP3 data as edge-tts delivers it.
+        """
+        stream = SpeechStream(text)
+        stream.future = self._submit(text, lambda: _stream(text, voice, rate, pitch, stream),
+                                     first_audio=lambda: stream.first_chunk_at)
+        return stream
+
+    def _submit(self, text, work, first_audio=None):
+        with self._lock:
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+            depth = self.pending
+        logger.debug(f"TTS queue depth {depth}")
+        return self.run(self._job(text, work, time.time(), first_audio))
+
+    async def _job(self, text, work, queued_at, first_audio=None):
+        try:
+            async with self._semaphore:
+                started = time.time()
+                ok = await work()
+                elapsed = time.time() - started
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+        if self.monitor is not None and first_audio is not None:
+            # Only live streams: a file job's whole synthesis time (warm-up, pre-rendering)
+            # is not a time to first audio
+            first = first_audio()
+            self.monitor.record(first - started if ok and first else None, ok)
+
+        with self._lock:
+            if ok:
+                self.timings.append((elapsed, started - queued_at))
+                del self.timings[:-HISTORY]
+            else:
+                self.failures += 1
+        if ok:
+            logger.info(f"Synthesized in {elapsed:.2f}s after {started - queued_at:.2f}s queued "
+                        f"({self.pending} pending): {text[:40]}")
+        return ok
+
+    def stats(self):
+        """
+        Synthesis time and queue wait (mean / p90, seconds) over recent jobs, plus queue depth.
+        """
+        with self._lock:
+            timings = list(self.timings)
+            stats = {"jobs": len(timings), "failures": self.failures,
+                     "pending": self.pending, "max_pending": self.max_pending}
+        if timings:
+            synth = sorted(t for t, _ in timings)
+            wait = sorted(w for _, w in timings)
+            p90 = int(0.9 * (len(timings) - 1))
+            stats.update({"synth_mean": sum(synth) / len(synth), "synth_p90": synth[p90],
+                          "wait_mean": sum(wait) / len(wait), "wait_p90": wait[p90]})
+        return stats
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+class SpeechStream:
+    """
+    MP3 audio of one sentence, handed from the event loop to a playback thread
+    chunk by chunk. data accumulates everything received so far.
+    """
+    _END = object()
+
+    def __init__(self, text):
+        self.text = text
+        self.future = None
+        self.created_at = time.time()
+        self.data = bytearray()
+        self.first_chunk_at = None
+        self.error = None
+        self._chunks = queue.Queue()
+
+    def _put(self, chunk):
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.time()
+        self.data += chunk
+        self._chunks.put(chunk)
+
+    def _finish(self, error=None):
+        self.error = error
+        self._chunks.put(self._END)
+
+    def chunks(self, timeout=None, first_timeout=None):
+        """
+        Yields audio chunks until the sentence is complete. Raises the synthesis
+        error, or queue.Empty if nothing arrives within timeout (first_timeout
+        for the first chunk, if given).
+        """
+        wait = timeout if first_timeout is None else first_timeout
+        while True:
+            chunk = self._chunks.get(timeout=wait)
+            wait = timeout
+            if chunk is self._END:
+                if self.error is not None:
+                    raise self.error
+                return
+            yield chunk
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+        # Wake a reader even if the job never got past the semaphore
+        self._finish(concurrent.futures.CancelledError())
+
+async def _stream(text, voice, rate, pitch, stream):
+    """
+    One edge-tts request delivered chunk by chunk into stream.
+    """
+    try:
+        communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                stream._put(chunk["data"])
+        if not stream.data:
+            raise RuntimeError("no audio received")
+        stream._finish()
+        return True
+    except asyncio.CancelledError:
+        stream._finish(concurrent.futures.CancelledError())
+        raise
+    except Exception as e:
+        logger.error(f"EdgeTTS streaming failed: {e}")
+        stream._finish(e)
+        return False
+
+async def _synthesize(text, output_file, voice, rate, pitch):
+    """
+    One edge-tts request written to output_file.
+    """
+    try:
+        communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch)
+        await communicate.save(output_file)
+        return True
+    except Exception as e:
+        logger.error(f"EdgeTTS generation failed: {e}")
+        return False
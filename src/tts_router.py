@@ -0,0 +1,91 @@
+import time
+import threading
+from collections import deque
+
+# Time to first audio edge-tts must keep to (seconds); slower than this, speech goes local
+DEADLINE = 1.5
+# Recent edge-tts requests the latency and error rate are measured over
+WINDOW = 20
+MIN_SAMPLES = 3
+MAX_ERROR_RATE = 0.3
+# While routed local, one request in this many seconds still goes to edge-tts to see if it recovered
+PROBE_INTERVAL = 30.0
+
+EDGE = "edge"
+LOCAL = "local"
+
+class TTSRouter:
+    """
+    Chooses edge-tts or the local engine for each sentence. Tracks the rolling
+    latency (to first audio) and error rate of edge-tts requests; once the p90
+    latency would miss the deadline or too many requests fail, sentences go to
+    the local engine, with an occasional probe to notice when the service is
+    back. A probe that succeeds in time clears the outage's results, so
+    sentences go back to edge-tts at once. Critical sentences never wait
+    on the network.
+    """
+
+    def __init__(self, deadline=DEADLINE, window=WINDOW, max_error_rate=MAX_ERROR_RATE):
+        self.deadline = deadline
+        self.max_error_rate = max_error_rate
+        self.routed = {EDGE: 0, LOCAL: 0}
+        self._results = deque(maxlen=window)  # (latency seconds or None, ok)
+        self._last_probe = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        """
+        Outcome of one edge-tts request: seconds to first audio, and whether it succeeded.
+        """
+        with self._lock:
+            if ok and latency is not None and latency <= self.deadline and not self._healthy_locked():
+                # The service is back: results from the outage no longer describe it
+                self._results.clear()
+            self._results.append((latency, ok))
+
+    def choose(self, critical=False):
+        """
+        Returns EDGE or LOCAL for the next sentence.
+        """
+        with self._lock:
+            if critical:
+                route = LOCAL
+            elif self._healthy_locked():
+                route = EDGE
+            elif time.time() - self._last_probe >= PROBE_INTERVAL:
+                self._last_probe = time.time()
+                route = EDGE
+            else:
+                route = LOCAL
+            self.routed[route] += 1
+        return route
+
+    def healthy(self):
+        with self._lock:
+            return self._healthy_locked()
+
+    def _healthy_locked(self):
+        if len(self._results) < MIN_SAMPLES:
+            return True
+        if self._error_rate_locked() > self.max_error_rate:
+            return False
+        latency = self._p90_locked()
+        return latency is None or latency <= self.deadline
+
+    def _error_rate_locked(self):
+        return sum(1 for _, ok in self._results if not ok) / len(self._results) if self._results else 0.0
+
+    def _p90_locked(self):
+        latencies = sorted(t for t, ok in self._results if ok and t is not None)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.9 * len(latencies)))]
+
+    def stats(self):
+        with self._lock:
+            stats = {"healthy": self._healthy_locked(), "error_rate": self._error_rate_locked(),
+                     "routed_edge": self.routed[EDGE], "routed_local": self.routed[LOCAL]}
+            latency = self._p90_locked()
+            if latency is not None:
+                stats["edge_p90_ms"] = 1000 * latency
+        return stats
@@ -0,0 +1,223 @@
+import logging
+from collections import deque
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 10
+# Speech must clear the adaptive noise floor by this much (dB)
+ENERGY_MARGIN_DB = 9.0
+# Quiet room floor so digital silence does not make every click "speech"
+MIN_ENERGY_DB = 30.0
+# Spectral shape: voiced speech is peaky (low flatness) and sits in 80-4000 Hz
+MAX_FLATNESS = 0.45
+MIN_BAND_RATIO = 0.6
+# Unvoiced consonants: weaker and noise-like but with a high zero-crossing rate
+FRICATIVE_ZCR = 0.25
+
+# Endpointing defaults
+ONSET_MS = 30       # Consecutive speech needed to open an utterance
+HANGOVER_MS = 300   # Silence needed to close it
+PREROLL_MS = 250    # Audio kept from before the onset
+TAIL_MS = 100       # Silence kept after the last speech frame
+
+class VoiceActivityDetector:
+    """
+    Frame-level speech/non-speech decisions from energy, zero-crossing rate and
+    spectral shape. A block of frames is classified in one vectorized pass.
+    """
+
+    def __init__(self, rate, frame_ms=FRAME_MS, margin_db=ENERGY_MARGIN_DB):
+        self.rate = rate
+        self.frame = int(rate * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.noise_db = None
+        self.noise_spectrum = None  # per-bin noise power, subtracted before the shape tests
+
+        freqs = np.fft.rfftfreq(self.frame, 1.0 / rate)
+        self._band = (freqs >= 80) & (freqs <= 4000)
+        self._window = np.hanning(self.frame).astype(np.float32)
+
+    def calibrate(self, samples):
+        """
+        Sets the noise floor from a stretch of background audio.
+        """
+        n_frames = samples.size // self.frame
+        if n_frames == 0:
+            return
+        frames = samples[:n_frames * self.frame].astype(np.float32).reshape(n_frames, self.frame)
+        energy_db = 10.0 * np.log10(np.einsum("ij,ij->i", frames, frames) / self.frame + 1e-9)
+        self.noise_db = float(np.median(energy_db))
+        self.noise_spectrum = np.median(self._power(frames), axis=0)
+        logger.info(f"VAD noise floor set to {self.noise_db:.1f} dB")
+
+    def _power(self, frames):
+        return np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-12
+
+    def classify(self, samples):
+        """
+        Returns (is_speech, energy_db) arrays, one entry per whole frame in samples.
+        """
+        n_frames = samples.size // self.frame
+        frames = samples[:n_frames * self.frame].astype(np.float32).reshape(n_frames, self.frame)
+
+        energy_db = 10.0 * np.log10(np.einsum("ij,ij->i", frames, frames) / self.frame + 1e-9)
+        zcr = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1) / self.frame
+
+        power = self._power(frames)
+        # Stationary hum and fan noise would otherwise flatten the spectrum of quiet speech
+        clean = power if self.noise_spectrum is None else np.maximum(power - self.noise_spectrum, 0.05 * power)
+        flatness = np.exp(np.log(clean).mean(axis=1)) / clean.mean(axis=1)
+        band_ratio = clean[:, self._band].sum(axis=1) / clean.sum(axis=1)
+
+        if self.noise_db is None:
+            self.noise_db = float(np.percentile(energy_db, 20))
+        gate = max(self.noise_db + self.margin_db, MIN_ENERGY_DB)
+
+        voiced = (energy_db > gate) & (flatness < MAX_FLATNESS) & (band_ratio > MIN_BAND_RATIO)
+        fricative = (energy_db > gate - self.margin_db / 2) & (zcr > FRICATIVE_ZCR)
+        is_speech = voiced | fricative
+
+        # Track the floor on non-speech frames only
+        quiet = energy_db[~is_speech]
+        if quiet.size:
+            self.noise_db = 0.95 * self.noise_db + 0.05 * float(quiet.mean())
+            quiet_power = power[~is_speech].mean(axis=0)
+            if self.noise_spectrum is None:
+                self.noise_spectrum = quiet_power
+            else:
+                self.noise_spectrum = 0.95 * self.noise_spectrum + 0.05 * quiet_power
+        return is_speech, energy_db
+
+class Endpointer:
+    """
+    Turns frame decisions into utterances: opens after ONSET_MS of speech,
+    closes after HANGOVER_MS of silence and returns the trimmed segment
+    (with a little pre-roll and tail) instead of waiting out a long pause.
+    """
+
+    def __init__(self, rate, hangover_ms=HANGOVER_MS, onset_ms=ONSET_MS,
+                 preroll_ms=PREROLL_MS, tail_ms=TAIL_MS, vad=None):
+        self.vad = vad or VoiceActivityDetector(rate)
+        self.rate = rate
+        self.echo_gate = None  # optional echo_gate.EchoGate: frames it explains are not speech
+        frame_ms = 1000.0 * self.vad.frame / rate
+        self.onset_frames = max(1, int(round(onset_ms / frame_ms)))
+        self.hangover_frames = max(1, int(round(hangover_ms / frame_ms)))
+        self.tail_frames = min(self.hangover_frames, int(round(tail_ms / frame_ms)))
+        self._preroll = deque(maxlen=max(1, int(round(preroll_ms / frame_ms))) + self.onset_frames)
+        self.reset()
+
+    def reset(self):
+        self.in_speech = False
+        self.speech_run = 0
+        self.silence_run = 0
+        self.frames = []
+        self._preroll.clear()
+        self._pending = np.zeros(0, dtype=np.int16)
+        self.samples_seen = 0
+        self.forwarded = 0         # utterance frames already passed to on_speech
+        self.speech_start = None   # sample index where the utterance opened
+        self.last_speech = None    # sample index just after the last speech frame
+
+    def feed(self, samples, end_time=None):
+        """
+        Consumes int16 samples (ending at end_time, needed for echo gating).
+        Returns the finished utterance as an int16 array once the hangover has
+        elapsed, otherwise None.
+        """
+        if self._pending.size:
+            samples = np.concatenate((self._pending, samples))
+        frame = self.vad.frame
+        n_frames = samples.size // frame
+        self._pending = samples[n_frames * frame:].copy()
+        if n_frames == 0:
+            return None
+
+        is_speech, _ = self.vad.classify(samples)
+        if self.echo_gate is not None and end_time is not None and is_speech.any():
+            # Playback picked up by the mic is not the user speaking
+            frames = samples[:n_frames * frame].astype(np.float32).reshape(n_frames, frame)
+            tail = (samples.size - n_frames * frame) / self.rate
+            times = end_time - tail - (n_frames - 1 - np.arange(n_frames)) * frame / self.rate
+            is_speech &= ~self.echo_gate.echo_mask(frames, times)
+        for i, speech in enumerate(is_speech.tolist()):
+            chunk = samples[i * frame:(i + 1) * frame]
+            self.samples_seen += frame
+            if not self.in_speech:
+                self._preroll.append(chunk)
+                self.speech_run = self.speech_run + 1 if speech else 0
+                if self.speech_run >= self.onset_frames:
+                    self.in_speech = True
+                    self.frames = list(self._preroll)
+                    self.speech_start = self.samples_seen - len(self.frames) * frame
+                    self.last_speech = self.samples_seen
+                    self.silence_run = 0
+                continue
+
+            self.frames.append(chunk)
+            if speech:
+                self.silence_run = 0
+                self.last_speech = self.samples_seen
+            else:
+                self.silence_run += 1
+                if self.silence_run >= self.hangover_frames:
+                    keep = len(self.frames) - self.silence_run + self.tail_frames
+                    return np.concatenate(self.frames[:keep])
+        return None
+
+    @property
+    def duration(self):
+        """
+        Seconds of audio in the open utterance.
+        """
+        return len(self.frames) * self.vad.frame / self.rate if self.in_speech else 0.0
+
+def listen_segment(source, timeout=10, phrase_time_limit=15, endpointer=None, on_speech=None, resume=False):
+    """
+    Reads an AudioSource until one utterance has been endpointed.
+    Returns (int16 segment or None, stats dict). Timeouts use the stream clock.
+
+    on_speech(samples), if given, receives the utterance audio as it is
+    captured (pre-roll first), e.g. to drive a streaming recognizer. If it
+    returns True the listen stops right away with the audio so far and
+    stats["stopped_early"] set; call again with resume=True to carry on with
+    the same utterance.
+    """
+    endpointer = endpointer or Endpointer(source.rate)
+    if not resume:
+        endpointer.reset()
+    started = source.time()
+    segment = None
+    stopped_early = False
+
+    while True:
+        data = source.read(source.chunk)
+        if not data:
+            # Stream ended mid-utterance (end of a recording): hand over what we have
+            if endpointer.in_speech:
+                segment = np.concatenate(endpointer.frames)
+            break
+        segment = endpointer.feed(np.frombuffer(data, dtype=np.int16), source.time())
+        if on_speech and endpointer.in_speech and endpointer.forwarded < len(endpointer.frames):
+            new_audio = np.concatenate(endpointer.frames[endpointer.forwarded:])
+            endpointer.forwarded = len(endpointer.frames)
+            if on_speech(new_audio) and segment is None:
+                segment = np.concatenate(endpointer.frames)
+                stopped_early = True
+        if segment is not None:
+            break
+        if endpointer.in_speech:
+            if endpointer.duration >= phrase_time_limit:
+                segment = np.concatenate(endpointer.frames)
+                break
+        elif source.time() - started >= timeout:
+            break
+
+    stats = {}
+    if endpointer.last_speech is not None:
+        # How long after the last speech frame the utterance was handed off
+        delay = (endpointer.samples_seen - endpointer.last_speech) / endpointer.rate
+        stats = {"endpoint_delay": delay, "speech_seconds": endpointer.duration,
+                 "stopped_early": stopped_early}
+    return segment, stats
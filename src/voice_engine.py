@@ -1,28 +1,39 @@
 import speech_recognition as sr
-import edge_tts
-import asyncio
 import os
 import logging
+import threading
 from audio_utils import no_alsa_error
+from audio_source import SAMPLE_WIDTH
+import numpy as np
+import level_meter
+import vad
+import asr_backends
+from asr_backends import ASRUnavailable
+from keyword_spotter import KeywordSpotter
+from echo_gate import EchoGate
+import noise_profile
+import tts_engine
+import tts_cache
+import tts_router
+import local_tts
+import presynth
+import audio_output
+import segmenter
+import speech_scheduler
+from speech_scheduler import PRIORITY_URGENT, PRIORITY_NORMAL
+import concurrent.futures
+import itertools
+import subprocess
+import time
+from collections import deque
 
 # Shared state for GUI reactivity
-vocal_level = 0.0
-
 def get_vocal_level():
-    global vocal_level
-    return vocal_level
+    """
+    Smoothed microphone level (0.0 - 1.0) from the real-time level meter.
+    """
+    return level_meter.read_level()
 
-def _on_audio_data(recognizer, audio):
-    """Callback to update volume level for UI reactivity."""
-    global vocal_level
-    try:
-        # Calculate simple RMS energy from raw data
-        raw = audio.get_raw_data()
-        if raw:
-            import audioop
-            vocal_level = audioop.rms(raw, 2) / 32768.0 # Normalize 0.0 to 1.0ish
-    except Exception:
-        vocal_level = 0.0
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -31,130 +42,942 @@ current_config = {}
 
 # Global objects to reuse connection
 recognizer = sr.Recognizer()
+recognizer.dynamic_energy_threshold = True
+recognizer.energy_threshold = noise_profile.MIN_ENERGY_THRESHOLD # Base starting point
+# Breathing room
+recognizer.pause_threshold = 0.8
+recognizer.non_speaking_duration = 0.4
 microphone = None
+capture_source = None  # HubSource from the shared capture hub, when attached
+
+# Audio kept from just before listen_for_input starts, so clipped first words survive
+LISTEN_PREROLL = 0.3
+
+# Local endpointing (see vad.py); created on first use for the source's sample rate
+endpointer = None
+
+# Keeps the saved ambient-noise profile up to date (see noise_profile.py)
+profile_refiner = None
+
+# Speech-to-text backends (see asr_backends.py), chosen by config
+asr_backend = None
+asr_fallback = None
+
+# Barge-in: playback reference for echo gating, and the running player
+echo_gate = None
+_player = None
+_player_utterance = None
+_player_lock = threading.Lock()
+_speech_epoch = 0  # bumped by interrupt_speech(); older queued items are dropped
+_cancelled_utterances = deque(maxlen=64)  # ids passed to cancel_utterance()
+
+# Speech over playback ducks it at once and interrupts after this much (seconds)
+BARGE_IN_CONFIRM = 0.25
+
+# Command words dispatched from streaming partials (see keyword_spotter.py)
+spotter = KeywordSpotter()
+_drain_done = threading.Event()
+_drain_done.set()
 
 # Pipeline Queues
 import queue
-import threading
 import uuid
 
-generation_queue = queue.Queue()
+generation_queue = speech_scheduler.SpeechScheduler()
 playback_queue = queue.Queue()
 processing_started = False
 
+# Sentences synthesize concurrently on one event loop (see tts_engine.py);
+# their futures wait here in queue order until each is ready to play
+synth_engine = None
+_synth_order = queue.Queue()
+# Sentences taken from the scheduler but not yet played. Keeping this small
+# leaves the rest in the scheduler, where urgent speech can overtake them.
+_pipeline_slots = None
+
+# Phrases already synthesized, on disk (see tts_cache.py)
+speech_cache = None
+
+# Idle-time rendering of predictable speech (see presynth.py)
+prerenderer = None
+
+# Offline engine (see local_tts.py) and the router deciding when to use it (tts_router.py)
+local_engine = None
+router = tts_router.TTSRouter()
+
+# Persistent output stream (see audio_output.py); None means a player process per sentence
+output = None
+
+# Streaming playback: longest wait for the next audio chunk before giving up
+STREAM_TIMEOUT = 10
+# Longest wait for a fully streamed sentence's job to settle before caching it
+CACHE_WAIT = 2.0
+# Time to first audio per sentence: (seconds, "stream" | "file" | "cache" | "local")
+_ttfa = deque(maxlen=200)
+# utterance id -> callback(time), run when the utterance's first audio is heard
+_first_audio_callbacks = {}
+# Streamed replies being fed to the pipeline in the background (see speak_stream_async)
+_stream_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="speak-stream")
+_streams_active = 0
+_streams_idle = threading.Condition()
+
 def configure_engine(config):
     global current_config
     current_config = config
-    
+    _init_asr(config)
+
+def _init_asr(config):
+    """
+    Builds the configured ASR backend (and optional fallback) and warms them in the background.
+    """
+    global asr_backend, asr_fallback
+    try:
+        asr_backend = asr_backends.create_backend(config)
+    except ASRUnavailable as e:
+        logger.error(f"ASR backend unavailable, using Google: {e}")
+        asr_backend = asr_backends.GoogleBackend()
+
+    fallback = config.get("asr_fallback", "")
+    asr_fallback = None
+    if fallback and fallback != asr_backend.name:
+        try:
+            asr_fallback = asr_backends.create_backend(config, name=fallback)
+        except ASRUnavailable as e:
+            logger.warning(f"ASR fallback '{fallback}' unavailable: {e}")
+
+    def warm():
+        global asr_backend, asr_fallback
+        for backend in (asr_backend, asr_fallback):
+            if backend:
+                try:
+                    backend.warm()
+                except ASRUnavailable as e:
+                    logger.error(f"ASR warm-up failed: {e}")
+                    backend.close()
+                    if backend is asr_backend:
+                        asr_backend = asr_fallback or asr_backends.GoogleBackend()
+                        asr_fallback = None
+                    else:
+                        asr_fallback = None
+    threading.Thread(target=warm, daemon=True).start()
+    logger.info(f"ASR backend: {asr_backend.name}" + (f" (fallback: {asr_fallback.name})" if asr_fallback else ""))
+
+def _transcribe(pcm, rate):
+    """
+    Runs the primary backend, falling back to the secondary if the primary cannot run.
+    """
+    if asr_backend is None:
+        _init_asr(current_config)
+    try:
+        return asr_backend.transcribe(pcm, rate)
+    except ASRUnavailable as e:
+        if asr_fallback is None:
+            raise
+        logger.warning(f"{e}; falling back to {asr_fallback.name}")
+        return asr_fallback.transcribe(pcm, rate)
+
+def use_capture_hub(hub):
+    """
+    Routes calibration and listening through the shared capture hub instead of
+    opening a separate sr.Microphone.
+    """
+    global capture_source, echo_gate
+    capture_source = hub.subscribe("recognizer").as_source(copy=True, preroll=LISTEN_PREROLL)
+    echo_gate = EchoGate(hub.rate, hub.rate * vad.FRAME_MS // 1000)
+
+def restore_noise_profile(hub):
+    """
+    Seeds the VAD and recognizer from the noise profile saved for this capture
+    device, instead of sitting through a calibration at boot. A background
+    refiner keeps the profile, and the live VAD, current; with no usable
+    profile it calibrates from the first second of audio in which ZADE is
+    not talking.
+    """
+    global profile_refiner
+    device = hub.source.identity()
+    profile = noise_profile.load_profile(device, hub.rate)
+    ep = _get_endpointer(hub.rate)
+    if profile:
+        noise_profile.apply_profile(ep.vad, profile)
+        recognizer.energy_threshold = profile["energy_threshold"]
+        logger.info(f"Loaded noise profile for {device} ({profile['noise_db']:.1f} dB floor)")
+
+    def on_update(fresh):
+        noise_profile.apply_profile(ep.vad, fresh)
+        recognizer.energy_threshold = fresh["energy_threshold"]
+
+    profile_refiner = noise_profile.ProfileRefiner(hub, device, profile, on_update=on_update,
+                                                   is_quiet=lambda: not is_speaking())
+    profile_refiner.start()
+
 def start_processing():
     """
     Starts the background threads for TTS generation and playback.
     """
-    global processing_started
+    global processing_started, synth_engine, speech_cache
     if processing_started:
         return
         
+    if current_config.get("tts_cache", True):
+        try:
+            speech_cache = tts_cache.TTSCache(max_bytes=int(current_config.get("tts_cache_mb", tts_cache.DEFAULT_MAX_MB) * 1024 * 1024))
+        except OSError as e:
+            logger.error(f"TTS cache unavailable: {e}")
+    global output
+    if current_config.get("output_engine", True):
+        try:
+            output = audio_output.OutputEngine(volume=current_config.get("speech_volume", 100) / 100).start()
+        except Exception as e:
+            output = None
+            logger.error(f"Audio output engine unavailable, playing through mpg123: {e}")
+    global _pipeline_slots
+    synth_engine = tts_engine.SynthesisEngine(current_config.get("tts_concurrency", tts_engine.DEFAULT_CONCURRENCY)).start()
+    global local_engine
+    router.deadline = current_config.get("tts_deadline", tts_router.DEADLINE)
+    synth_engine.monitor = router
+    if current_config.get("local_tts", True):
+        try:
+            local_engine = local_tts.LocalSynthesizer(current_config.get("piper_model"),
+                                                      current_config.get("local_voice", local_tts.DEFAULT_ESPEAK_VOICE)).start()
+        except Exception as e:
+            logger.warning(f"No offline TTS, speech depends on edge-tts: {e}")
+    _pipeline_slots = threading.Semaphore(synth_engine.concurrency + 2)
     threading.Thread(target=_generator_loop, daemon=True).start()
+    threading.Thread(target=_order_loop, daemon=True).start()
     threading.Thread(target=_playback_loop, daemon=True).start()
     processing_started = True
     logger.info("TTS Pipeline started.")
 
+def _voice_settings():
+    # Defaults
+    voice = current_config.get("voice_id", "en-US-ChristopherNeural") 
+    rate = current_config.get("speech_rate", "+20%") 
+    pitch = current_config.get("voice_pitch", "-5Hz") 
+    return voice, rate, pitch
+
 def _generator_loop():
     """
-    Consumes text from generation_queue, generates AI, puts file path in playback_queue.
+    Consumes text from generation_queue and starts synthesizing it right away,
+    without waiting for earlier sentences to finish. Cached phrases skip synthesis.
     """
     while True:
-        text = generation_queue.get()
-        if text is None: break # Sentinel
+        _pipeline_slots.acquire()
+        segment = generation_queue.get()
+        if segment is None: break # Sentinel
+        if not _is_live(segment):
+            generation_queue.task_done()
+            _pipeline_slots.release()
+            continue
+        text, job = segment["text"], dict(segment)
         
         try:
+            voice, rate, pitch = _voice_settings()
+            key = speech_cache.key(text, voice, rate, pitch) if speech_cache else None
+            cached = speech_cache.get(key) if speech_cache else None
+            
+            if cached:
+                future = concurrent.futures.Future()
+                future.set_result(True)
+                _synth_order.put(dict(job, file=cached, future=future, cached=True, hit=True))
+                continue
+            
+            # Urgent prompts never wait on the network; the rest go local while edge-tts is slow or failing
+            if local_engine is not None and router.choose(critical=segment["priority"] == PRIORITY_URGENT) == tts_router.LOCAL:
+                _synth_order.put(_submit_local(job))
+                continue
+            
+            if current_config.get("tts_streaming", True):
+                # Playback starts on the first chunk; the stream buffers ahead meanwhile
+                stream = synth_engine.submit_stream(text, voice, rate, pitch)
+                _synth_order.put(dict(job, stream=stream, key=key))
+                continue
+            
             # Unique filename to allow multiple files
-            filename = f"/tmp/speech_{uuid.uuid4().hex}.mp3"
+            filename = speech_cache.temp_path(key) if speech_cache else f"/tmp/speech_{uuid.uuid4().hex}.mp3"
+            future = synth_engine.submit(text, filename, voice, rate, pitch)
+            _synth_order.put(dict(job, file=filename, future=future, key=key))
+        except Exception as e:
+            logger.error(f"Generator loop error: {e}")
+            generation_queue.task_done()
+            _pipeline_slots.release()
+
+def _order_loop():
+    """
+    Hands finished sentences to playback_queue strictly in the order they were queued.
+    """
+    while True:
+        job = _synth_order.get()
+        if job is None: break
+        if "stream" in job:
+            # Streams go to the player straight away, still in queue order
+            playback_queue.put(job)
+            generation_queue.task_done()
+            continue
+        filename = job["file"]
+        cached = job.get("cached", False)
+        handed_off = False
+        
+        try:
+            try:
+                success = job["future"].result()
+            except concurrent.futures.CancelledError:
+                success = None
             
-            # Defaults
-            voice = current_config.get("voice_id", "en-US-ChristopherNeural") 
-            rate = current_config.get("speech_rate", "+20%") 
-            pitch = current_config.get("voice_pitch", "-5Hz") 
+            if success and job.get("key"):
+                # Keep it for next time, even if this playback was interrupted
+                filename = speech_cache.commit(job["key"], filename)
+                cached = True
             
-            # Generate
-            success = asyncio.run(_generate_audio(text, filename, voice, rate, pitch))
+            if success is False and local_engine is not None and not job.get("local") and _is_live(job):
+                if os.path.exists(filename):
+                    os.remove(filename)
+                job = _submit_local(job)
+                filename = job["file"]
+                success = job["future"].result()
             
-            if success:
-                playback_queue.put(filename)
+            if success and _is_live(job):
+                playback_queue.put(dict(job, file=filename, cached=cached, hit=job.get("hit", False),
+                                        reference=_decode_reference(filename)))
+                handed_off = True
             else:
-                logger.error(f"Failed to generate audio for: {text}")
-                
+                if success is False:
+                    logger.error(f"Failed to generate audio for: {job['text']}")
+                if not cached and os.path.exists(filename):
+                    os.remove(filename) # Failed, or interrupted while synthesizing
         except Exception as e:
-            logger.error(f"Generator loop error: {e}")
+            logger.error(f"Synthesis order loop error: {e}")
         finally:
+            if not handed_off:
+                _pipeline_slots.release()
             generation_queue.task_done()
 
+def _start_render(text, voice, rate, pitch):
+    """
+    Starts synthesizing text into the cache. Returns the future, or None if it is cached already.
+    """
+    key = speech_cache.key(text, voice, rate, pitch)
+    if key in speech_cache:
+        return None
+    filename = speech_cache.temp_path(key)
+    future = synth_engine.submit(text, filename, voice, rate, pitch)
+    future.add_done_callback(lambda f: _finish_warm(f, key, filename))
+    return future
+
+def _finish_warm(future, key, filename):
+    try:
+        if not future.cancelled() and future.result():
+            speech_cache.commit(key, filename)
+            return
+    except Exception as e:
+        logger.warning(f"Cache warm-up failed: {e}")
+    if os.path.exists(filename):
+        os.remove(filename)
+
+def _submit_local(job):
+    """
+    Queues a sentence on the offline engine; returns the job with its file and future.
+    """
+    filename = f"/tmp/speech_{uuid.uuid4().hex}.wav"
+    future = local_engine.submit(job["text"], filename, _voice_settings()[1])
+    return dict(job, file=filename, future=future, key=None, local=True)
+
+def start_prerender(predict):
+    """
+    Renders predict()'s (text, expires_at) phrases into the cache while nothing
+    else is being said, and evicts them once stale (see presynth.py).
+    """
+    global prerenderer
+    if speech_cache is None or synth_engine is None or prerenderer is not None:
+        return prerenderer
+    prerenderer = presynth.PreRenderer(predict, _render_phrase, _evict_phrase, _pipeline_idle).start()
+    return prerenderer
+
+def _synthesis_requests(text):
+    """
+    The texts queue_speak(text) may send to synthesis: its sentences merged the
+    way the scheduler merges them, and each sentence on its own.
+    """
+    segments = segmenter.split_sentences(text)
+    return list(dict.fromkeys(speech_scheduler.merge_fragments(segments) + segments))
+
+def _render_phrase(text):
+    voice, rate, pitch = _voice_settings()
+    for request in _synthesis_requests(text):
+        future = _start_render(request, voice, rate, pitch)
+        if future is not None:
+            return future
+    return None
+
+def _evict_phrase(text, live=()):
+    voice, rate, pitch = _voice_settings()
+    # Sentences shared with current phrases ("Good morning.") stay cached
+    needed = {request for phrase in live for request in _synthesis_requests(phrase)}
+    return any([speech_cache.discard(speech_cache.key(r, voice, rate, pitch))
+                for r in _synthesis_requests(text) if r not in needed])
+
+def _pipeline_idle():
+    # Nothing queued or playing, no synthesis in flight, and edge-tts answering in time
+    return not is_speaking() and synth_engine.pending == 0 and router.healthy()
+
+def _decode_reference(filename):
+    """
+    Decodes an MP3 to mono PCM at the capture rate, so the echo gate can
+    recognize it when the microphone picks it up. None without barge-in, and
+    with the output engine, which registers the PCM it actually plays.
+    """
+    if echo_gate is None or output is not None:
+        return None
+    try:
+        return audio_output.decode_file(filename, echo_gate.rate)
+    except Exception as e:
+        logger.warning(f"Could not decode echo reference: {e}")
+        return None
+
+def _record_ttfa(started, ready, mode, item):
+    _ttfa.append((started - ready, mode))
+    logger.info(f"Time to first audio {1000 * (started - ready):.0f} ms ({mode}): {item['text'][:40]}")
+    callback = _first_audio_callbacks.pop(item["utterance"], None)
+    if callback is not None:
+        try:
+            callback(started)
+        except Exception as e:
+            logger.error(f"First-audio callback failed: {e}")
+
+def _cache_stream(item):
+    """
+    Keeps a completely streamed sentence in the TTS cache.
+    """
+    stream = item["stream"]
+    if not item.get("key") or stream.error is not None:
+        return
+    try:
+        # The last chunk arrives just before the job settles; give it a moment
+        if stream.future.result(timeout=CACHE_WAIT):
+            filename = speech_cache.temp_path(item["key"])
+            with open(filename, "wb") as f:
+                f.write(stream.data)
+            speech_cache.commit(item["key"], filename)
+    except (concurrent.futures.CancelledError, concurrent.futures.TimeoutError):
+        pass
+    except Exception as e:
+        logger.warning(f"Could not cache streamed speech: {e}")
+
+def _first_chunk_timeout(stream):
+    """
+    How much longer a stream may take to start before the sentence goes to the
+    offline engine: twice the router's deadline, counted from submission.
+    """
+    if local_engine is None:
+        return STREAM_TIMEOUT
+    return max(0.05, 2 * router.deadline - (time.time() - stream.created_at))
+
+def _stream_failed(item, error):
+    if isinstance(error, queue.Empty):
+        # Gave up waiting: the router has to hear about it, the cancelled job will not report
+        item["stream"].cancel()
+        router.record(None, False)
+    if _is_live(item):
+        logger.warning(f"Streaming TTS failed before any audio ({type(error).__name__}: {error})")
+
+def _synthesize_fallback(item):
+    """
+    Synthesis for a sentence whose stream failed: offline when possible, else
+    edge-tts file mode. Returns the file, or None.
+    """
+    if local_engine is not None:
+        job = _submit_local(item)
+        filename, future = job["file"], job["future"]
+    else:
+        filename = f"/tmp/speech_{uuid.uuid4().hex}.mp3"
+        future = synth_engine.submit(item["text"], filename, *_voice_settings())
+    if future.result() and _is_live(item):
+        return filename
+    if os.path.exists(filename):
+        os.remove(filename)
+    return None
+
+# --- Playback on the persistent output engine ---------------------------------
+
+def _engine_write(playback, pcm):
+    """
+    Queues decoded PCM and registers it with the echo gate at its expected speaker time.
+    """
+    offset = playback.written
+    if not playback.write(pcm):
+        return
+    if echo_gate is not None:
+        echo_gate.add_reference(audio_output.resample(pcm, output.rate, echo_gate.rate), playback.time_at(offset))
+
+def _render_stream(item, playback):
+    """
+    Decodes a SpeechStream into playback as its chunks arrive. Returns False if
+    the stream failed before producing any audio.
+    """
+    stream = item["stream"]
+    decoder = audio_output.StreamDecoder(lambda pcm: _engine_write(playback, pcm), output.rate)
+    got_audio = False
+    try:
+        for chunk in stream.chunks(timeout=STREAM_TIMEOUT, first_timeout=_first_chunk_timeout(stream)):
+            if not _is_live(item) or playback.cancelled:
+                stream.cancel()
+                decoder.kill()
+                return True
+            decoder.feed(chunk)
+            got_audio = True
+    except concurrent.futures.CancelledError:
+        decoder.kill()
+        return True
+    except Exception as e:
+        if not got_audio:
+            decoder.kill()
+            _stream_failed(item, e)
+            return False
+        logger.error(f"Streaming TTS failed mid-sentence: {e}")
+    decoder.close()
+    _cache_stream(item)
+    return True
+
+def _play_on_engine(item, previous):
+    """
+    Decodes one sentence onto the output engine behind the previous one and
+    returns its Playback without waiting for it to be heard.
+    """
+    playback = output.open(tag=item["utterance"])
+    mode = "stream" if "stream" in item else _file_mode(item)
+
+    def on_start(p):
+        # Time to first audio counts from when the speaker was free for this sentence
+        ready = max(item["queued_at"], (previous.finished_at or 0) if previous else 0)
+        _record_ttfa(p.started_at, ready, mode, item)
+    playback.on_start = on_start
+
+    try:
+        if "stream" in item:
+            if not _render_stream(item, playback) and _is_live(item):
+                mode = "local" if local_engine is not None else "file"
+                filename = _synthesize_fallback(item)
+                if filename:
+                    _engine_write(playback, audio_output.decode_file(filename, output.rate))
+                    os.remove(filename)
+        else:
+            _engine_write(playback, audio_output.decode_file(item["file"], output.rate))
+    finally:
+        playback.close()
+    return playback
+
+def _file_mode(item):
+    return "cache" if item["hit"] else ("local" if item.get("local") else "file")
+
+# --- Playback through a player process (no output engine) ---------------------
+
+def _play_file(filename, reference, utterance=None):
+    """
+    Plays an MP3 (or offline engine WAV) file to the end (or until interrupted).
+    Returns when audio started.
+    """
+    global _player, _player_utterance
+    player = ["aplay", "-q"] if filename.endswith(".wav") else ["mpg123", "-q"]
+    with _player_lock:
+        with no_alsa_error():
+            _player = subprocess.Popen(player + [filename])
+        _player_utterance = utterance
+    started = time.time()
+    if echo_gate is not None and reference is not None:
+        echo_gate.add_reference(reference, started)
+    _player.wait()
+    with _player_lock:
+        _player = None
+    return started
+
+def _play_stream(item):
+    """
+    Feeds a SpeechStream into mpg123 as chunks arrive, so the sentence starts
+    playing on its first chunk. Returns when audio started, or None if the
+    stream failed before producing any (the caller then falls back to file mode).
+    """
+    global _player, _player_utterance
+    stream = item["stream"]
+    chunks = stream.chunks(timeout=STREAM_TIMEOUT, first_timeout=_first_chunk_timeout(stream))
+    try:
+        first = next(chunks)
+    except Exception as e:
+        _stream_failed(item, e)
+        return None
+
+    with _player_lock:
+        with no_alsa_error():
+            _player = subprocess.Popen(["mpg123", "-q", "-"], stdin=subprocess.PIPE)
+        _player_utterance = item["utterance"]
+    started = time.time()
+    reference = None
+    if echo_gate is not None:
+        reference = audio_output.StreamDecoder(
+            lambda pcm: echo_gate.add_reference(pcm, started + reference.samples / echo_gate.rate), echo_gate.rate)
+    try:
+        for chunk in itertools.chain([first], chunks):
+            if not _is_live(item):
+                stream.cancel()
+                break
+            _player.stdin.write(chunk)
+            _player.stdin.flush()
+            if reference:
+                reference.feed(chunk)
+        _player.stdin.close()
+    except (BrokenPipeError, concurrent.futures.CancelledError):
+        pass # Interrupted
+    except Exception as e:
+        logger.error(f"Streaming TTS failed mid-sentence: {e}")
+        stream.cancel()
+    finally:
+        if reference:
+            reference.close(timeout=2)
+        _player.wait()
+        with _player_lock:
+            _player = None
+
+    _cache_stream(item)
+    return started
+
+def _play_fallback(item):
+    filename = _synthesize_fallback(item)
+    if filename is None:
+        return None
+    try:
+        return _play_file(filename, _decode_reference(filename), item["utterance"])
+    finally:
+        os.remove(filename)
+
 def _playback_loop():
     """
-    Consumes file paths from playback_queue and plays them.
+    Consumes sentences from playback_queue and plays them.
     """
+    free_at = time.time()
+    previous = None
     while True:
-        filename = playback_queue.get()
-        if filename is None: break
+        item = playback_queue.get()
+        if item is None: break
         
         try:
-            with no_alsa_error():
-                os.system(f"mpg123 -q {filename}")
+            if _is_live(item):
+                if output is not None:
+                    playback = _play_on_engine(item, previous)
+                    # Keep one sentence queued behind the one being heard
+                    if previous is not None:
+                        previous.wait()
+                    previous = playback
+                else:
+                    # Time to first audio counts from when the player was free for this sentence
+                    ready = max(item["queued_at"], free_at)
+                    if "stream" in item:
+                        mode, started = "stream", _play_stream(item)
+                        if started is None and _is_live(item):
+                            mode, started = ("local" if local_engine is not None else "file"), _play_fallback(item)
+                    else:
+                        mode = _file_mode(item)
+                        started = _play_file(item["file"], item["reference"], item["utterance"])
+                    if started is not None:
+                        _record_ttfa(started, ready, mode, item)
+            else:
+                _discard(item)
             
-            # Cleanup
-            if os.path.exists(filename):
-                os.remove(filename)
+            # Cleanup (cached phrases stay for next time)
+            if "file" in item and not item.get("cached") and os.path.exists(item["file"]):
+                os.remove(item["file"])
                 
         except Exception as e:
             logger.error(f"Playback loop error: {e}")
         finally:
+            free_at = time.time()
             playback_queue.task_done()
+            _pipeline_slots.release()
+
+def speech_stats():
+    """
+    Time to first audio per playback mode (p50 / p90, ms), synthesis and cache counters.
+    """
+    stats = {}
+    for mode in ("stream", "file", "cache", "local"):
+        samples = sorted(t for t, m in _ttfa if m == mode)
+        if samples:
+            stats[f"ttfa_{mode}_p50_ms"] = 1000 * samples[len(samples) // 2]
+            stats[f"ttfa_{mode}_p90_ms"] = 1000 * samples[min(len(samples) - 1, int(0.9 * len(samples)))]
+    stats["scheduler"] = generation_queue.stats()
+    if synth_engine:
+        stats["synthesis"] = synth_engine.stats()
+    stats["routing"] = router.stats()
+    if local_engine:
+        stats["local"] = local_engine.stats()
+    if prerenderer:
+        stats["prerender"] = prerenderer.stats()
+    if output:
+        stats["output"] = output.stats()
+    if speech_cache:
+        stats["cache"] = speech_cache.stats()
+    return stats
+
+def is_speaking():
+    """
+    True while anything is queued, synthesizing or playing.
+    """
+    return (_player is not None or (output is not None and output.busy())
+            or generation_queue.unfinished_tasks > 0 or playback_queue.unfinished_tasks > 0)
+
+def _is_live(item):
+    """
+    False once the item was interrupted or its utterance cancelled.
+    """
+    return item["epoch"] == _speech_epoch and item["utterance"] not in _cancelled_utterances
+
+def _discard(item):
+    """
+    Releases what a dropped queue item holds: a stream to cancel or a temp file.
+    """
+    if "stream" in item:
+        item["stream"].cancel()
+    elif "file" in item and not item.get("cached") and os.path.exists(item["file"]):
+        os.remove(item["file"])
+
+def stop_speaking(reason="Speech stopped."):
+    """
+    Cancel-all: stops the current sentence and drops everything queued,
+    synthesizing or waiting to play.
+    """
+    global _speech_epoch
+    _speech_epoch += 1
+    _first_audio_callbacks.clear()
+    generation_queue.cancel()
+    while True:
+        try:
+            item = playback_queue.get_nowait()
+        except queue.Empty:
+            break
+        if item is not None:
+            _discard(item)
+        playback_queue.task_done()
+        _pipeline_slots.release()
+    # Abandon synthesis already in flight; _order_loop cleans up and settles the queue
+    for job in list(_synth_order.queue):
+        if job is not None:
+            (job["stream"] if "stream" in job else job["future"]).cancel()
+    if output is not None:
+        output.flush()
+        output.duck(False)
+    with _player_lock:
+        if _player is not None and _player.poll() is None:
+            _player.terminate()
+    if echo_gate is not None:
+        echo_gate.clear()
+    logger.info(reason)
+
+def interrupt_speech():
+    """
+    Barge-in: the user talked over ZADE, so everything queued is dropped.
+    """
+    stop_speaking("Speech interrupted by user.")
 
-def queue_speak(text):
+def queue_speak(text, utterance_id=None, priority=PRIORITY_NORMAL):
     """
-    Non-blocking speak. Adds text to the generation queue.
+    Non-blocking speak. Splits text into sentences (see segmenter.py) and adds
+    them to the speech scheduler, so the first one plays while the rest are
+    still synthesizing. PRIORITY_URGENT speech goes ahead of anything not yet
+    synthesizing. Returns the utterance id shared by all of them, for
+    cancel_utterance(); pass one in to append to an existing utterance.
     """
-    logger.info(f"Queued Speak: {text}")
+    utterance_id = utterance_id or uuid.uuid4().hex[:8]
+    if not text or not text.strip():
+        return utterance_id
+    logger.info(f"Queued Speak [{utterance_id}]: {text}")
     print(f">> {text}", flush=True)
-    generation_queue.put(text)
+    _enqueue(segmenter.split_sentences(text), utterance_id, priority, _speech_epoch)
+    return utterance_id
 
-def calibrate_mic():
+def _enqueue(sentences, utterance_id, priority, epoch):
+    queued_at = time.time()
+    for sentence in sentences:
+        generation_queue.put({"text": sentence, "utterance": utterance_id, "epoch": epoch,
+                              "priority": priority, "queued_at": queued_at})
+
+def speak_stream(pieces, priority=PRIORITY_NORMAL, on_first_audio=None, utterance_id=None):
     """
-    Run once at startup to adjust for ambient noise.
+    Speaks text while it is still being generated. pieces is an iterable of
+    text fragments (LLM tokens); each sentence is queued the moment it is
+    complete, so speech starts after the first sentence rather than the last.
+    Blocks until pieces is exhausted, or the utterance is cancelled or
+    interrupted (then stops consuming it). on_first_audio(time) is called when
+    the first sentence starts playing. utterance_id lets the caller cancel it
+    with cancel_utterance() before this returns. Returns the utterance id.
+    """
+    utterance_id = utterance_id or uuid.uuid4().hex[:8]
+    epoch = _speech_epoch
+    if on_first_audio is not None:
+        _first_audio_callbacks[utterance_id] = on_first_audio
+    buffer = segmenter.SentenceBuffer()
+    spoken = False
+    pieces = iter(pieces)
+    try:
+        for piece in pieces:
+            if epoch != _speech_epoch or utterance_id in _cancelled_utterances:
+                break
+            sentences = buffer.feed(piece)
+            if sentences:
+                _speak_sentences(sentences, utterance_id, priority, epoch)
+                spoken = True
+        else:
+            # pieces may have ended because the utterance was cancelled; no half sentence then
+            cancelled = epoch != _speech_epoch or utterance_id in _cancelled_utterances
+            sentences = [] if cancelled else buffer.flush()
+            if sentences:
+                _speak_sentences(sentences, utterance_id, priority, epoch)
+                spoken = True
+    finally:
+        close = getattr(pieces, "close", None)
+        if close is not None:
+            close()  # Ends generation early if we stopped consuming it
+        if not spoken:
+            _first_audio_callbacks.pop(utterance_id, None)
+    return utterance_id
+
+def speak_stream_async(pieces, priority=PRIORITY_NORMAL, on_first_audio=None, utterance_id=None):
+    """
+    speak_stream() on a worker thread, for callers that keep listening
+    meanwhile. Returns a Future of the utterance id. Without barge-in,
+    listen_for_input() waits until it has been spoken, so ZADE never hears itself.
+    """
+    global _streams_active
+    with _streams_idle:
+        _streams_active += 1
+    future = _stream_pool.submit(speak_stream, pieces, priority, on_first_audio, utterance_id)
+    future.add_done_callback(_stream_finished)
+    return future
+
+def _stream_finished(future):
+    global _streams_active
+    with _streams_idle:
+        _streams_active -= 1
+        _streams_idle.notify_all()
+
+def _speak_sentences(sentences, utterance_id, priority, epoch):
+    for sentence in sentences:
+        logger.info(f"Queued Speak [{utterance_id}]: {sentence}")
+        print(f">> {sentence}", flush=True)
+    _enqueue(sentences, utterance_id, priority, epoch)
+
+def cancel_utterance(utterance_id):
+    """
+    Drops every sentence of one utterance: queued, synthesizing or playing.
+    Other utterances keep their place in the queue.
+    """
+    _cancelled_utterances.append(utterance_id)
+    _first_audio_callbacks.pop(utterance_id, None)
+    generation_queue.cancel(utterance_id)
+    for job in list(_synth_order.queue):
+        if job is not None and job["utterance"] == utterance_id:
+            (job["stream"] if "stream" in job else job["future"]).cancel()
+    for item in list(playback_queue.queue):
+        if item is not None and item["utterance"] == utterance_id and "stream" in item:
+            item["stream"].cancel()
+    if output is not None:
+        output.flush(lambda playback: playback.tag == utterance_id)
+    with _player_lock:
+        if _player is not None and _player_utterance == utterance_id and _player.poll() is None:
+            _player.terminate()
+    logger.info(f"Cancelled utterance {utterance_id}")
+
+class _RecognizerSource(sr.AudioSource):
+    """
+    Presents an audio_source.AudioSource to speech_recognition, which expects
+    its own AudioSource type with a .stream exposing read(). A caller-supplied
+    source stays open across listens; a managed one (the hub feed) is opened and
+    closed around each use, unless handed_off to a thread still reading it,
+    which then closes it.
+    """
+
+    def __init__(self, source, managed=False):
+        self.source = source
+        self.managed = managed
+        self.SAMPLE_RATE = source.rate
+        self.SAMPLE_WIDTH = SAMPLE_WIDTH
+        self.CHUNK = source.chunk
+        self.stream = None
+        self.handed_off = False
+
+    def __enter__(self):
+        if not self.source.is_open:
+            self.source.open()
+        self.stream = self.source
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+        if self.managed and not self.handed_off:
+            self.source.close()
+
+def _resolve_source(source):
+    """
+    Returns the speech_recognition source to use: the given AudioSource, the
+    capture hub feed, or the shared microphone.
     """
     global microphone
+    if source is not None:
+        return _RecognizerSource(source)
+    if capture_source is not None:
+        return _RecognizerSource(capture_source, managed=True)
+    if microphone is None:
+        microphone = sr.Microphone()
+    return microphone
+
+def _vad_enabled():
+    return current_config.get("vad_endpointing", True)
+
+def _barge_in_enabled(source):
+    return (source is None and capture_source is not None and echo_gate is not None
+            and _vad_enabled() and current_config.get("barge_in", True))
+
+def _get_endpointer(rate):
+    global endpointer
+    if endpointer is None or endpointer.rate != rate:
+        hangover = current_config.get("vad_hangover_ms", vad.HANGOVER_MS)
+        endpointer = vad.Endpointer(rate, hangover_ms=hangover)
+    return endpointer
+
+def _read_seconds(source, seconds):
+    """
+    Reads roughly the given duration from an AudioSource as int16 samples.
+    """
+    chunks = []
+    needed = int(seconds * source.rate)
+    while needed > 0:
+        data = source.read(min(source.chunk, needed))
+        if not data:
+            break
+        chunk = np.frombuffer(data, dtype=np.int16)
+        chunks.append(chunk)
+        needed -= chunk.size
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+
+def calibrate_mic(source=None):
+    """
+    Run once at startup to adjust for ambient noise.
+    Accepts an optional AudioSource (e.g. a WAV replay) instead of the live mic.
+    """
     logger.info("Calibrating microphone for ambient noise... (Please be silent)")
     with no_alsa_error():
-        if microphone is None:
-            microphone = sr.Microphone()
-            
-        with microphone as source:
+        with _resolve_source(source) as source:
             # Better calibration
-            recognizer.adjust_for_ambient_noise(source, duration=1.0)
-            recognizer.dynamic_energy_threshold = True
-            recognizer.energy_threshold = 300 # Base starting point
-            # Breathing room
-            recognizer.pause_threshold = 0.8
-            recognizer.non_speaking_duration = 0.4
+            if isinstance(source, _RecognizerSource) and _vad_enabled():
+                # The VAD does the endpointing, so calibrate its floor instead
+                noise = _read_seconds(source.source, 1.0)
+                _get_endpointer(source.SAMPLE_RATE).vad.calibrate(noise)
+            else:
+                recognizer.adjust_for_ambient_noise(source, duration=1.0)
+                recognizer.energy_threshold = noise_profile.MIN_ENERGY_THRESHOLD # Base starting point
     logger.info("Calibration complete.")
 
-async def _generate_audio(text, output_file, voice, rate, pitch):
-    """
-    Async helper to generate audio using edge-tts.
-    """
-    try:
-        communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch)
-        await communicate.save(output_file)
-        return True
-    except Exception as e:
-        logger.error(f"EdgeTTS generation failed: {e}")
-        return False
-
-def speak(text):
+def speak(text, priority=PRIORITY_NORMAL):
     """
     Blocking speak. Uses the pipeline but waits for completion to maintain compatibility.
     """
-    queue_speak(text)
+    queue_speak(text, priority=priority)
     # Ideally we wouldn't block here if we want full async, 
     # but for "Chat Mode" we usually want to wait until finished before listening again.
     # For now, let's just queue it. 
@@ -168,41 +991,49 @@ def wait_for_completion():
     if processing_started:
         generation_queue.join()
         playback_queue.join()
+        if output is not None:
+            output.drain()
 
-def listen_for_input():
+def listen_for_input(source=None):
     """
-    Listens for any speech using the pre-calibrated microphone.
+    Listens for any speech using the pre-calibrated microphone,
+    or the given AudioSource when replaying a recording.
     """
-    global microphone
-    
     # Ensure mic is initialized if calibrate wasn't called
-    if microphone is None:
+    if source is None and capture_source is None and microphone is None:
         calibrate_mic()
 
-    # Wait for playback queue to empty before listening (prevent listening to self)
-    if processing_started:
-        playback_queue.join() 
-        # Note: join() blocks until queue is empty. 
-        # Ideally we check if it's empty, but join ensures we don't listen while speaking.
+    # A fast-path command may still be reading the tail of its utterance
+    _drain_done.wait(timeout=15)
+
+    # Without echo gating, wait for speech to finish before listening (prevent listening to self),
+    # including replies still being streamed in. With it, keep listening while ZADE talks;
+    # user speech interrupts playback.
+    if processing_started and not _barge_in_enabled(source):
+        with _streams_idle:
+            _streams_idle.wait_for(lambda: _streams_active == 0)
+        wait_for_completion()
     
     with no_alsa_error():
         # Reuse existing microphone instance to skip init overhead
-        with microphone as source:
+        with _resolve_source(source) as source:
             try:
-                # Optimized for a balance of speed and reliability
-                audio = recognizer.listen(source, timeout=10, phrase_time_limit=15)
-                # Brief volume check for UI (not real-time enough in blocking listen, but better than nothing)
-                global vocal_level
-                import audioop
-                vocal_level = audioop.rms(audio.get_raw_data(), 2) / 1000.0
+                text = None
+                if isinstance(source, _RecognizerSource) and _vad_enabled():
+                    audio, text = _listen_vad(source)
+                    if audio is None:
+                        return None
+                else:
+                    # Optimized for a balance of speed and reliability
+                    audio = recognizer.listen(source, timeout=10, phrase_time_limit=15)
                 try:
-                    text = recognizer.recognize_google(audio).lower()
-                    print(f"[DEBUG] Recognized: {text}", flush=True)
-                    return text
-                            
-                except sr.UnknownValueError:
-                    pass
-                except sr.RequestError as e:
+                    if text is None:
+                        text = _transcribe(audio.get_raw_data(), audio.sample_rate)
+                    if text:
+                        text = text.lower()
+                        print(f"[DEBUG] Recognized: {text}", flush=True)
+                        return text
+                except ASRUnavailable as e:
                     print(f"[DEBUG] API unavailable: {e}", flush=True)
             except sr.WaitTimeoutError:
                  pass
@@ -211,6 +1042,99 @@ def listen_for_input():
             
     return None
 
+def _listen_vad(source):
+    """
+    Endpoints one utterance with the local VAD and wraps it for the recognizer.
+    Hands off as soon as the hangover elapses instead of waiting out pause_threshold.
+    With a streaming backend the audio is decoded while the user speaks, so the
+    final transcript is ready right after the endpoint, and a command word at
+    the start of the utterance is dispatched from the partials straight away.
+    Returns (sr.AudioData or None, transcript or None).
+    """
+    rate = source.SAMPLE_RATE
+    ep = _get_endpointer(rate)
+    streaming = asr_backend is not None and asr_backend.streaming
+    fast_path = streaming and current_config.get("keyword_fast_path", True)
+    stream = None
+    spotter.reset()
+    ep.echo_gate = echo_gate if _barge_in_enabled(None) and source.source is capture_source else None
+
+    onset = None       # samples seen when the utterance opened
+    ducked = False
+
+    def on_speech(samples):
+        nonlocal stream, onset, ducked
+        if onset is None:
+            onset = ep.samples_seen
+            if ep.echo_gate is not None and is_speaking():
+                # The echo gate already ruled out self-hearing: the user is talking over ZADE.
+                # Turn ZADE down at once, and cut it off if they keep going.
+                if output is not None:
+                    output.duck(True)
+                    ducked = True
+                else:
+                    interrupt_speech()
+        if ducked and ep.last_speech - onset >= BARGE_IN_CONFIRM * rate:
+            interrupt_speech()
+            ducked = False
+        if not streaming:
+            return False
+        if stream is None:
+            stream = asr_backend.start_stream(rate)
+        partial = stream.feed(samples.tobytes())
+        if partial:
+            logger.debug(f"Partial: {partial}")
+            return fast_path and spotter.update(partial, stream.words) is not None
+        return False
+
+    segment, stats = vad.listen_segment(source.source, timeout=10, phrase_time_limit=15,
+                                        endpointer=ep, on_speech=on_speech)
+    if ducked:
+        # Too short to be a real interruption (a cough, "mm-hm"): carry on at full volume
+        output.duck(False)
+    if segment is None:
+        if stream:
+            stream.cancel()
+        return None, None
+
+    if stats["stopped_early"]:
+        # Dispatch now; finish hearing the utterance in the background so its
+        # tail is not taken as the next command, and to measure the win
+        _drain_done.clear()
+        source.handed_off = True  # Still being read; the drain closes it
+        threading.Thread(target=_drain_utterance, args=(source.source, ep, stream, source.managed),
+                         name="keyword-drain", daemon=True).start()
+        return sr.AudioData(segment.tobytes(), rate, SAMPLE_WIDTH), spotter.fired
+
+    logger.info(f"Endpointed {stats['speech_seconds']:.2f}s utterance, "
+                f"{stats['endpoint_delay'] * 1000:.0f} ms after speech ended")
+
+    text = None
+    if stream:
+        try:
+            text = stream.finish(timeout=5)
+        except Exception as e:
+            logger.error(f"Streaming ASR failed, decoding whole utterance: {e}")
+    return sr.AudioData(segment.tobytes(), rate, SAMPLE_WIDTH), text
+
+def _drain_utterance(source, ep, stream, close):
+    """
+    Reads the rest of an utterance whose command already fired, then records
+    how long the full transcript would have kept the user waiting. Closes
+    source afterwards if close (listen_for_input left that to us).
+    """
+    try:
+        vad.listen_segment(source, timeout=10, phrase_time_limit=15, endpointer=ep,
+                           on_speech=lambda samples: stream.feed(samples.tobytes()) and False,
+                           resume=True)
+        spotter.record_final(stream.finish(timeout=5))
+    except Exception as e:
+        logger.error(f"Keyword drain failed: {e}")
+    finally:
+        if close:
+            source.close()
+        _drain_done.set()
+
 def listen_for_commands(commands=["ignite"]):
     """
     Deprecated: Use listen_for_input and parse manually.